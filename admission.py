@@ -0,0 +1,165 @@
+"""
+Admission control: per-worker call limit + capacity shared by all workers.
+
+gunicorn runs several workers and Vonage's answer webhook and the /ws
+socket can land on different ones, so the global count lives in a small
+SQLite file on local disk that every worker on the host opens.
+
+  /webhooks/answer  reserve(call_id)  -> False means answer with the busy NCCO
+  /ws accept        admit(call_id)    -> False means this worker is full
+  call teardown     release(call_id)
+
+Rows carry an expiry, so slots of crashed workers or calls that never
+opened their WebSocket free themselves.
+
+    MAX_CALLS_PER_WORKER   concurrent calls one worker accepts (default 50)
+    MAX_CALLS_TOTAL        concurrent calls on this host (default per-worker x WEB_CONCURRENCY)
+    CAPACITY_DB            path of the shared SQLite file
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from calllog import log
+
+
+MAX_CALLS_PER_WORKER = int(os.getenv("MAX_CALLS_PER_WORKER", "50"))
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+MAX_CALLS_TOTAL = int(os.getenv("MAX_CALLS_TOTAL", str(MAX_CALLS_PER_WORKER * WORKERS)))
+CAPACITY_DB = os.getenv(
+    "CAPACITY_DB", os.path.join(tempfile.gettempdir(), "mos-craciun-capacity.sqlite3")
+)
+
+RESERVE_SECONDS = 30     # answer webhook -> /ws connect
+CALL_TTL_SECONDS = 360   # call_timer caps calls at 5 min, plus margin
+
+
+# ----------------------------------------------------------
+# Shared store (SQLite, one file per host)
+# ----------------------------------------------------------
+
+class CapacityStore:
+
+    def __init__(self, path: str = CAPACITY_DB, limit: int = MAX_CALLS_TOTAL):
+        self.path = path
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS slots ("
+            " call_id TEXT PRIMARY KEY, pid INTEGER, expires REAL)"
+        )
+
+    def _purge(self, now: float) -> None:
+        self._db.execute("DELETE FROM slots WHERE expires < ?", (now,))
+
+    def reserve(self, call_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._purge(now)
+                exists = self._db.execute(
+                    "SELECT 1 FROM slots WHERE call_id = ?", (call_id,)
+                ).fetchone()
+                (used,) = self._db.execute("SELECT COUNT(*) FROM slots").fetchone()
+                if not exists and used >= self.limit:
+                    self._db.execute("COMMIT")
+                    return False
+                self._db.execute(
+                    "INSERT OR REPLACE INTO slots VALUES (?, ?, ?)",
+                    (call_id, os.getpid(), now + RESERVE_SECONDS),
+                )
+                self._db.execute("COMMIT")
+                return True
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def activate(self, call_id: str) -> None:
+        # apelul a ajuns pe /ws: slotul trăiește cât apelul
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO slots VALUES (?, ?, ?)",
+                (call_id, os.getpid(), time.time() + CALL_TTL_SECONDS),
+            )
+
+    def release(self, call_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM slots WHERE call_id = ?", (call_id,))
+
+    def count(self) -> int:
+        with self._lock:
+            self._purge(time.time())
+            (used,) = self._db.execute("SELECT COUNT(*) FROM slots").fetchone()
+            return used
+
+
+# ----------------------------------------------------------
+# Per-worker admission
+# ----------------------------------------------------------
+
+class Admission:
+
+    def __init__(self, store: CapacityStore = None, per_worker: int = MAX_CALLS_PER_WORKER):
+        self.store = store
+        self.per_worker = per_worker
+        self.active = 0
+        self.rejected_busy = 0    # answer webhook: host full
+        self.rejected_worker = 0  # /ws: this worker full
+
+    async def _store_call(self, method: str, *args):
+        if self.store is None:
+            return True
+        try:
+            return await asyncio.to_thread(getattr(self.store, method), *args)
+        except Exception as e:
+            # store indisponibil: nu blocăm apelurile din cauza lui
+            log.warning("capacity_store_error", error=str(e))
+            return True
+
+    async def reserve(self, call_id: str) -> bool:
+        ok = await self._store_call("reserve", call_id)
+        if not ok:
+            self.rejected_busy += 1
+        return ok
+
+    async def admit(self, call_id: str) -> bool:
+        if self.active >= self.per_worker:
+            self.rejected_worker += 1
+            # eliberăm rezervarea făcută de answer webhook
+            await self._store_call("release", call_id)
+            return False
+        self.active += 1
+        await self._store_call("activate", call_id)
+        return True
+
+    async def release(self, call_id: str) -> None:
+        self.active = max(0, self.active - 1)
+        await self._store_call("release", call_id)
+
+    def stats(self) -> dict:
+        out = {
+            "active_worker": self.active,
+            "max_per_worker": self.per_worker,
+            "rejected_busy": self.rejected_busy,
+            "rejected_worker": self.rejected_worker,
+        }
+        if self.store is not None:
+            out["max_total"] = self.store.limit
+        return out
+
+
+def open_admission() -> Admission:
+    try:
+        store = CapacityStore()
+    except Exception as e:
+        log.warning("capacity_store_disabled", error=str(e))
+        store = None
+    return Admission(store)
@@ -0,0 +1,214 @@
+"""
+Streaming gain control: a slow AGC followed by a look-ahead soft limiter.
+
+Replaces the fixed SANTA_GAIN multiply + hard clip on Santa's voice, and
+optionally evens out quiet children before their audio reaches the VAD
+and OpenAI. One GainControl per call and direction; its state is the
+current gain and the last few ms of (gained) input.
+
+- AGC: the RMS of each chunk moves the gain toward target_rms / rms, with
+  a faster time constant going down (attack) than up (release). Chunks
+  under `gate_rms` (pauses, line noise) leave the gain alone, so silence
+  is never pumped up. The gain is ramped linearly across the chunk.
+- Limiter: works on 1 ms blocks. A block's gain keeps the peaks of the
+  last `hold_ms` and of the next block under `ceiling`; inside a block the
+  gain moves linearly to the next block's value, and the output is
+  delayed by three blocks (3 ms) so that value is known in time. The gain
+  is already down when a loud syllable arrives and stays down for about
+  a pitch period, so peaks are neither clipped nor distorted.
+
+Whole chunks are processed with a fixed number of numpy passes into
+preallocated float32 scratch (block and window maxima with
+ufunc.reduceat); nothing loops per sample or per block in Python.
+
+    SANTA_AGC_TARGET_RMS  Santa's target speech level (default 3500)
+    SANTA_AGC_MAX_GAIN    most the AGC may boost Santa (default 2.0)
+    INBOUND_AGC           1 enables AGC on the child's audio (default off)
+    INBOUND_AGC_TARGET_RMS / INBOUND_AGC_MAX_GAIN / INBOUND_AGC_GATE
+                          child's target level (2500), max boost (4.0),
+                          quietest chunk that counts as speech (120)
+"""
+
+import math
+import os
+
+import numpy as np
+
+from audio_dsp import INT16_MAX, PCM16, samples
+from resampler import VONAGE_RATE
+
+
+SANTA_AGC_TARGET_RMS = float(os.getenv("SANTA_AGC_TARGET_RMS", "3500"))
+SANTA_AGC_MAX_GAIN = float(os.getenv("SANTA_AGC_MAX_GAIN", "2.0"))
+
+INBOUND_AGC = os.getenv("INBOUND_AGC", "0") == "1"
+INBOUND_AGC_TARGET_RMS = float(os.getenv("INBOUND_AGC_TARGET_RMS", "2500"))
+INBOUND_AGC_MAX_GAIN = float(os.getenv("INBOUND_AGC_MAX_GAIN", "4.0"))
+INBOUND_AGC_GATE = float(os.getenv("INBOUND_AGC_GATE", "120"))
+
+CEILING = 0.89 * INT16_MAX  # ~ -1 dBFS
+
+
+class GainControl:
+
+    __slots__ = (
+        "target_rms", "min_gain", "max_gain", "gain", "gate_rms", "attack", "release",
+        "ceiling", "rate", "block", "hold", "lookahead", "_t", "_start",
+        "_x", "_abs", "_peaks", "_starts", "_windows", "_pairs", "_wm", "_dg", "_curve", "_frac", "_ramp", "_out", "_i16",
+    )
+
+    def __init__(self, target_rms: float, min_gain: float = 0.5, max_gain: float = 2.0,
+                 gain: float = 1.0, gate_rms: float = 300.0, attack_ms: float = 300.0,
+                 release_ms: float = 1500.0, ceiling: float = CEILING, block_ms: float = 1.0,
+                 hold_ms: float = 8.0, rate: int = VONAGE_RATE, max_samples: int = 2400):
+        self.target_rms = target_rms
+        self.min_gain = min_gain
+        self.max_gain = max_gain
+        self.gain = gain
+        self.gate_rms = gate_rms
+        self.attack = attack_ms / 1000
+        self.release = release_ms / 1000
+        self.ceiling = ceiling
+        self.rate = rate
+
+        # limitatorul lucrează pe blocuri: vârful fiecărui bloc, câștig interpolat între blocuri
+        self.block = B = max(1, int(rate * block_ms / 1000))
+        self.hold = max(1, -(-int(rate * hold_ms / 1000) // B))  # în blocuri
+        # câștigul unui bloc depinde de următorul, interpolarea de încă unul
+        self.lookahead = 3 * B
+        self._t = 0                                    # eșantioane primite până acum
+        self._start = (-self.lookahead // B - self.hold) * B  # indexul absolut al lui _x[0]
+        self._x = None
+        self._alloc(max_samples)
+
+    def _alloc(self, n: int) -> None:
+        B = self.block
+        old, keep = self._x, self._t - self._start
+        m = (self.hold + 4) * B + n
+        blocks = m // B + 1
+        self._x = np.zeros(m, dtype=np.float32)
+        if old is not None:
+            self._x[:keep] = old[:keep]
+        self._abs = np.empty(m, dtype=np.float32)
+        self._peaks = np.empty(blocks, dtype=np.float32)
+        self._starts = np.arange(0, blocks * B, B, dtype=np.intp)
+        w = self.hold + 2
+        self._windows = np.empty(2 * blocks, dtype=np.intp)
+        self._windows[0::2] = np.arange(blocks)
+        self._windows[1::2] = np.arange(blocks) + w
+        self._pairs = np.empty(2 * blocks, dtype=np.float32)
+        self._wm = np.empty(blocks, dtype=np.float32)
+        self._dg = np.empty(blocks, dtype=np.float32)
+        self._curve = np.empty((blocks, B), dtype=np.float32)
+        self._frac = np.arange(B, dtype=np.float32) / B
+        self._ramp = np.arange(1, n + 1, dtype=np.float32)
+        self._out = np.empty(n, dtype=np.float32)
+        self._i16 = np.empty(n, dtype=PCM16)
+
+    # ---------------- processing ----------------
+
+    def process_inplace(self, s: np.ndarray, adapt: bool = True) -> None:
+        """Gain + limit int16 samples in place; the output lags the input by `lookahead` samples."""
+        n = s.shape[0]
+        if not n:
+            return
+        if n > self._out.shape[0]:
+            self._alloc(n)
+        B, h, D = self.block, self.hold, self.lookahead
+        hist = self._t - self._start
+        m = hist + n
+        x = self._x[:m]
+        chunk = x[hist:]
+        chunk[:] = s
+
+        # AGC: câștigul urmărește nivelul vorbirii, rampă liniară pe bucată
+        g0 = self.gain
+        if adapt:
+            level = math.sqrt(float(np.dot(chunk, chunk)) / n)
+            if level >= self.gate_rms:
+                target = min(self.max_gain, max(self.min_gain, self.target_rms / level))
+                tau = self.attack if target < g0 else self.release
+                self.gain = g0 + (target - g0) * (1.0 - math.exp(-n / (self.rate * tau)))
+        g1 = self.gain
+        if g1 == g0:
+            chunk *= g0
+        else:
+            ramp = self._out[:n]
+            np.multiply(self._ramp[:n], (g1 - g0) / n, out=ramp)
+            ramp += g0
+            chunk *= ramp
+
+        # limitator: vârful fiecărui bloc, apoi maximul pe hold în urmă + un bloc înainte
+        nb = m // B
+        a = self._abs[: nb * B]
+        np.abs(x[: nb * B], out=a)
+        peaks = self._peaks[:nb]
+        np.maximum.reduceat(a, self._starts[:nb], out=peaks)
+        # reduceat pe perechi (început, sfârșit) = maxim pe ferestre suprapuse
+        nw = nb - h - 1
+        pairs = self._pairs[: 2 * nw - 1]
+        np.maximum.reduceat(peaks, self._windows[: 2 * nw - 1], out=pairs)
+        wm = self._wm[:nw]
+        np.maximum(pairs[::2], self.ceiling, out=wm)
+        np.divide(self.ceiling, wm, out=wm)
+
+        # ieșirea începe cu D eșantioane în urmă, în blocul `h` al bufferului;
+        # în fiecare bloc câștigul merge liniar de la valoarea lui la a următorului
+        r0 = hist - D
+        off = r0 - h * B
+        nk = (off + n - 1) // B + 1
+        dg = self._dg[:nk]
+        np.subtract(wm[1 : nk + 1], wm[:nk], out=dg)
+        curve = self._curve[:nk]
+        np.multiply(dg[:, None], self._frac, out=curve)
+        curve += wm[:nk, None]
+        out = self._out[:n]
+        np.multiply(x[r0 : r0 + n], curve.reshape(-1)[off : off + n], out=out)
+        s[:] = out
+
+        # istoricul: de la blocul de unde începe fereastra următoarei bucăți
+        t = self._t + n
+        start = ((t - D) // B - h) * B
+        keep = t - start
+        self._x[:keep] = x[m - keep :]
+        self._t, self._start = t, start
+
+    def process(self, pcm, adapt: bool = True) -> bytes:
+        """Same as process_inplace for an immutable PCM buffer; returns new PCM bytes."""
+        s = samples(pcm)
+        n = s.shape[0]
+        if not n:
+            return b""
+        if n > self._out.shape[0]:
+            self._alloc(n)
+        buf = self._i16[:n]
+        buf[:] = s
+        self.process_inplace(buf, adapt)
+        return buf.tobytes()
+
+    def flush(self) -> np.ndarray:
+        """The samples still held back by the look-ahead (end of a response)."""
+        tail = np.zeros(self.lookahead, dtype=PCM16)
+        self.process_inplace(tail, adapt=False)
+        return tail
+
+    def reset(self) -> None:
+        """Drop the held-back audio (barge-in); the gain is kept."""
+        self._x[: self._t - self._start] = 0.0
+
+
+# ----------------------------------------------------------
+# Per-leg presets
+# ----------------------------------------------------------
+
+def santa_agc(gain: float = 1.35) -> GainControl:
+    # pornește de la câștigul fix de dinainte; vocea modelului e deja uniformă
+    return GainControl(SANTA_AGC_TARGET_RMS, min_gain=0.8, max_gain=SANTA_AGC_MAX_GAIN,
+                       gain=gain, gate_rms=300.0, max_samples=1600)
+
+
+def child_agc() -> GainControl:
+    # nu atenuăm copilul; îl ridicăm doar când vorbește (poarta lasă zgomotul liniei în pace)
+    return GainControl(INBOUND_AGC_TARGET_RMS, min_gain=1.0, max_gain=INBOUND_AGC_MAX_GAIN,
+                       gain=1.0, gate_rms=INBOUND_AGC_GATE, attack_ms=200.0, release_ms=2000.0,
+                       max_samples=320)
@@ -0,0 +1,182 @@
+"""
+Background ambience under Santa's voice (audio/background.wav).
+
+The WAV's data chunk is memory-mapped read-only once per process, so all
+calls share the same pages and no call copies the file. Each call gets an
+AmbienceMixer with its own loop cursor; the outbound pacer asks it for one
+20 ms frame per tick, with or without voice, so the line never goes dead.
+While Santa speaks the bed is ducked, with a short gain ramp per frame.
+
+    AMBIENCE_WAV     path to a mono 16-bit 16 kHz WAV (default audio/background.wav)
+    AMBIENCE_LEVEL   linear bed level during silence (0 disables), default 0.12
+    AMBIENCE_DUCK    linear bed level while Santa speaks, default 0.04
+    COMFORT_NOISE_RMS  level of the generated noise used instead of the bed
+                       when there is none (Realtime reconnect), default 60
+"""
+
+import os
+import random
+import struct
+
+import numpy as np
+
+from calllog import log
+from audio_dsp import INT16_MAX, INT16_MIN, PCM16
+from pacer import FRAME_BYTES
+from resampler import VONAGE_RATE
+
+
+AMBIENCE_WAV = os.getenv(
+    "AMBIENCE_WAV",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio", "background.wav"),
+)
+AMBIENCE_LEVEL = float(os.getenv("AMBIENCE_LEVEL", "0.12"))
+AMBIENCE_DUCK = float(os.getenv("AMBIENCE_DUCK", "0.04"))
+COMFORT_NOISE_RMS = float(os.getenv("COMFORT_NOISE_RMS", "60"))
+
+FRAME_SAMPLES = FRAME_BYTES // 2
+
+
+# ----------------------------------------------------------
+# Shared bed (one per process)
+# ----------------------------------------------------------
+
+def _find_data_chunk(path: str):
+    """Return (offset, n_samples) of the PCM data in a mono 16-bit 16 kHz WAV."""
+    with open(path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"{path}: not a WAV file")
+        fmt_ok = False
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path}: no data chunk")
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = f.read(size)
+                tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+                if (tag, channels, rate, bits) != (1, 1, VONAGE_RATE, 16):
+                    raise ValueError(f"{path}: expected PCM mono 16-bit {VONAGE_RATE} Hz")
+                fmt_ok = True
+            elif chunk_id == b"data":
+                if not fmt_ok:
+                    raise ValueError(f"{path}: data before fmt chunk")
+                return f.tell(), size // 2
+            else:
+                f.seek(size + (size & 1), 1)
+
+
+class AmbienceBed:
+
+    def __init__(self, path: str = AMBIENCE_WAV):
+        offset, n = _find_data_chunk(path)
+        if n < FRAME_SAMPLES:
+            raise ValueError(f"{path}: too short for a loop")
+        self.path = path
+        self.samples = np.memmap(path, dtype=PCM16, mode="r", offset=offset, shape=(n,))
+
+    def __len__(self) -> int:
+        return self.samples.shape[0]
+
+
+class NoiseBed:
+    """Generated soft (1/f) noise, looped like a bed when there is no ambience WAV."""
+
+    def __init__(self, seconds: float = 2.0, rms: float = COMFORT_NOISE_RMS):
+        n = int(seconds * VONAGE_RATE)
+        rng = np.random.default_rng(7)
+        # spectru modelat în frecvență: bucla se închide fără click
+        spectrum = np.fft.rfft(rng.standard_normal(n))
+        f = np.arange(len(spectrum), dtype=np.float64)
+        f[0] = 1.0
+        spectrum /= np.sqrt(f)
+        spectrum[0] = 0.0
+        noise = np.fft.irfft(spectrum, n)
+        noise *= rms / max(float(np.sqrt(np.mean(noise ** 2))), 1e-9)
+        self.path = None
+        self.samples = np.clip(noise, INT16_MIN, INT16_MAX).astype(PCM16)
+
+    def __len__(self) -> int:
+        return self.samples.shape[0]
+
+
+_noise_bed = None
+
+
+def comfort_mixer():
+    """A mixer of generated noise, for calls whose line would otherwise go dead."""
+    global _noise_bed
+    if _noise_bed is None:
+        _noise_bed = NoiseBed()
+    return AmbienceMixer(_noise_bed, level=1.0, duck=1.0)
+
+
+def load_bed(path: str = AMBIENCE_WAV):
+    if AMBIENCE_LEVEL <= 0:
+        return None
+    try:
+        bed = AmbienceBed(path)
+    except Exception as e:
+        log.warning("ambience_disabled", error=str(e))
+        return None
+    log.info("ambience_loaded", seconds=round(len(bed) / VONAGE_RATE, 1), path=path)
+    return bed
+
+
+# ----------------------------------------------------------
+# Per-call mixer
+# ----------------------------------------------------------
+
+_RAMP = (np.arange(1, FRAME_SAMPLES + 1, dtype=np.float32) / FRAME_SAMPLES)
+
+
+class AmbienceMixer:
+
+    __slots__ = ("bed", "level", "duck", "gain", "pos", "_mix", "_gains", "_out")
+
+    def __init__(self, bed: AmbienceBed, level: float = AMBIENCE_LEVEL,
+                 duck: float = AMBIENCE_DUCK):
+        self.bed = bed
+        self.level = level
+        self.duck = duck
+        self.gain = level
+        # fiecare apel pornește din alt punct al buclei
+        self.pos = random.randrange(len(bed))
+        self._mix = np.empty(FRAME_SAMPLES, dtype=np.float32)
+        self._gains = np.empty(FRAME_SAMPLES, dtype=np.float32)
+        self._out = np.empty(FRAME_SAMPLES, dtype=PCM16)
+
+    def _bed_into(self, dst: np.ndarray) -> None:
+        src = self.bed.samples
+        n = dst.shape[0]
+        end = self.pos + n
+        if end <= src.shape[0]:
+            dst[:] = src[self.pos:end]
+            self.pos = end
+        else:
+            head = src.shape[0] - self.pos
+            dst[:head] = src[self.pos:]
+            dst[head:] = src[: n - head]
+            self.pos = n - head
+
+    def mix(self, voice) -> bytes:
+        """One outbound frame: `voice` (640 bytes or None) over the ducked bed."""
+        target = self.duck if voice is not None else self.level
+        # duck rapid, revenire lentă
+        step = 0.5 if target < self.gain else 0.1
+        g0, g1 = self.gain, self.gain + (target - self.gain) * step
+        self.gain = g1
+
+        mix, gains = self._mix, self._gains
+        self._bed_into(mix)
+        np.multiply(_RAMP, g1 - g0, out=gains)
+        gains += g0
+        mix *= gains
+
+        if voice is not None:
+            mix += np.frombuffer(voice, dtype=PCM16, count=FRAME_SAMPLES)
+
+        np.clip(mix, INT16_MIN, INT16_MAX, out=mix)
+        self._out[:] = mix
+        return self._out.tobytes()
@@ -1,118 +1,41 @@
 import os
 import json
-import base64
 import asyncio
+import contextvars
+import signal
 import time
-import struct
+import uuid
+from collections import deque
 
 from fastapi import FastAPI, Request, WebSocket
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 import websockets
 
-
-# ----------------------------------------------------------
-# PROMPT – Moș Crăciun RO/EN cu memorie pe durata apelului
-# ----------------------------------------------------------
-
-SANTA_PROMPT = """
-You are "Moș Crăciun / Santa Claus", a warm, fast-speaking, kind grandfather.
-You speak ONLY Romanian and English.
-
-START OF CALL (ALWAYS THE SAME)
-- You ALWAYS start the call IN ROMANIAN with EXACTLY:
-  "Ho-ho-ho! Bună drag copil, sunt Moș Crăciun! Ce faci, puișor?"
-- After saying this sentence, you MUST STOP and stay silent.
-- Do NOT add anything else after this first sentence.
-- Wait for the child to speak next.
-
-ANSWER STYLE (VERY IMPORTANT)
-- Your answers must be VERY SHORT and DIRECT.
-- Maximum 1–2 short sentences each time you speak.
-- Always answer EXACTLY to what the child just said.
-- Do NOT change the topic.
-- Do NOT add extra stories, explanations or side comments.
-- Do NOT repeat the same ideas.
-- If the child asks about a car, speak only about that car.
-- If the child asks about school, speak only about school.
-- Keep everything simple, concrete and on-topic.
-
-VOICE & NATURAL STYLE
-- Speak a bit FASTER than a normal storyteller.
-- Sound like a real human grandfather: natural rhythm, small pauses, not robotic.
-- Use simple words and short phrases.
-- Use "Ho-ho-ho!" only sometimes, at the start of a short answer, not every time.
-- Never speak like a salesperson or technical agent.
-
-LANGUAGE BEHAVIOR
-- After the first Romanian greeting, detect the child’s language:
-  - If the child mostly uses Romanian → answer ONLY in Romanian.
-  - If the child mostly uses English → answer ONLY in English.
-- Do NOT mix Romanian and English in the same answer.
-- NEVER speak any other language.
-- Do not randomly switch languages. Switch only if the child clearly changes.
-
-INTERRUPTIONS (VERY IMPORTANT)
-- The system may CUT your audio when the child starts talking (barge-in).
-- If that happens, treat it as the child interrupting you on purpose.
-- Your NEXT answer after an interruption should:
-  - Be very short.
-  - Acknowledge the interruption kindly:
-    - (RO) You can start with something like:
-      "Te ascult, puișor, vrei să-mi spui altceva?"
-    - (EN) Or:
-      "I’m listening, my friend, do you want to tell me something else?"
-  - Then follow ONLY the NEW idea from the child, not your old sentence.
-
-CHILD SPEECH
-- The child might:
-  - Pronounce words incorrectly.
-  - Stutter, hesitate or repeat sounds.
-  - Change topic suddenly.
-  - Be very quiet or very loud.
-- Always be extremely tolerant.
-- If you don’t understand, DO NOT say “I don’t understand”.
-  Instead:
-  - (RO) "Nu am auzit bine, poți repeta?"
-  - (EN) "I didn’t hear well, can you say it again?"
-
-WHEN THE CHILD IS QUIET
-- Sometimes the child will be silent for a few seconds.
-- If there is a pause and the child says nothing:
-  - Gently take the initiative with ONE very short question:
-    - (RO) For example: "Puișor, la ce cadou te gândești acum?"
-    - (EN) For example: "My friend, what present are you thinking about now?"
-  - Then wait again for the child.
-- Do NOT start long monologues. Just one short question, then silence.
-
-TOPICS
-- Christmas, gifts, family, kindness, school, friends, good behavior.
-- Keep everything positive, kind and safe.
-- Never talk about violence, scary things, adult topics.
-
-MEMORY DURING THIS CALL
-- Remember and reuse during THIS call:
-  - The child’s name.
-  - Their gift wishes.
-  - Their favorite toys, colors, hobbies.
-  - Family members they mention.
-- Use this naturally, but briefly:
-  - (RO) "Dragă [nume]..."
-  - (EN) "My dear [name]..."
-- Do NOT overuse this. Just sometimes, to feel personal.
-
-ENDING
-- Around 4 minutes into the call:
-  - In the child’s language, say very briefly that you must leave soon
-    to feed the reindeer and prepare presents.
-  - Ask if they want to tell you one more thing.
-- Around 5 minutes:
-  - Say a very short and warm goodbye:
-    - (RO) "Noapte bună, [nume], și Crăciun fericit! Ho-ho-ho!"
-    - (EN) "Good night, [name], and Merry Christmas! Ho-ho-ho!"
-  - Then stop speaking completely.
-"""
+from admission import open_admission
+from ambience import AmbienceMixer, comfort_mixer, load_bed
+from agc import INBOUND_AGC, child_agc, santa_agc
+from audio_dsp import samples
+from call_memory import RESUME_SUMMARY, CallMemory
+import calllog
+from calllog import log
+from callstate import (
+    CLOSED, CLOSING, CONNECTING, GREETING, LISTENING, SANTA_SPEAKING, STATE_NAMES, TRANSITIONS, WRAP_UP,
+    CallRegistry,
+)
+import metrics
+from pacer import OutboundPacer
+from personas import PersonaRegistry
+from realtime_codec import INPUT_COMMIT, RESPONSE_CANCEL, RESPONSE_CREATE, RealtimeWriter, decode_event, loads
+from realtime_pool import RealtimePool
+from recorder import RECORD_CALLS, Recorder
+from scheduler import timers
+from usage import CallUsage, UsageLedger
+from resampler import OPENAI_RATE, VONAGE_RATE, Resampler
+from response_cache import MAX_ANSWER_BYTES, RESPONSE_CACHE, ResponseCache, cache_key
+from vad import SPEECH_END, SPEECH_START, make_vad
+from vonage_events import VonageEvents
 
 
 # ----------------------------------------------------------
@@ -131,29 +54,40 @@ app.add_middleware(
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 WS_URL = os.getenv("WS_URL")
 
-OPENAI_REALTIME_URL = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview"
+OPENAI_REALTIME_URL = os.getenv(
+    "OPENAI_REALTIME_URL",
+    "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview",
+)
 
+# câștigul de pornire al AGC-ului pentru vocea Moșului (PCM16)
+SANTA_GAIN = 1.35
 
-# ----------------------------------------------------------
-# Audio Gain PCM16
-# ----------------------------------------------------------
+# mesaj pre-înregistrat pentru "Moșul e ocupat" (opțional, altfel TTS Vonage)
+BUSY_AUDIO_URL = os.getenv("BUSY_AUDIO_URL")
+BUSY_TEXT = (
+    "Ho-ho-ho! Moș Crăciun vorbește acum cu alți copii. "
+    "Te rog să suni din nou în câteva minute!"
+)
 
-def apply_gain(pcm_bytes: bytes, gain: float = 1.35) -> bytes:
-    if not pcm_bytes:
-        return pcm_bytes
-    num_samples = len(pcm_bytes) // 2
-    samples = struct.unpack("<" + "h" * num_samples, pcm_bytes)
+# limită de apeluri per worker + capacitate comună pe host
+admission = open_admission()
 
-    boosted = []
-    for s in samples:
-        v = int(s * gain)
-        if v > 32767:
-            v = 32767
-        if v < -32768:
-            v = -32768
-        boosted.append(v)
+# drain la SIGTERM: cât așteptăm apelurile în curs / cât durează "la revedere"
+DRAIN_SECONDS = float(os.getenv("DRAIN_SECONDS", "45"))
+DRAIN_GOODBYE_SECONDS = float(os.getenv("DRAIN_GOODBYE_SECONDS", "20"))
 
-    return struct.pack("<" + "h" * len(boosted), *boosted)
+# cine închide turul copilului: "server" (server_vad) sau "local" (VAD-ul nostru + commit)
+TURN_DETECTION = os.getenv("TURN_DETECTION", "server")
+LOCAL_TURNS = TURN_DETECTION == "local"
+# liniștea după vorbire care închide turul; copiii fac pauze lungi în mijlocul frazei
+TURN_HANGOVER_MS = int(os.getenv("TURN_HANGOVER_MS", "600"))
+# audio trimis și dinaintea începutului detectat al vorbirii
+TURN_PREROLL_MS = int(os.getenv("TURN_PREROLL_MS", "300"))
+
+# socket Realtime căzut în timpul apelului: cât încercăm să-l înlocuim (backoff exponențial)
+REALTIME_RESUME_SECONDS = float(os.getenv("REALTIME_RESUME_SECONDS", "15"))
+REALTIME_RESUME_BACKOFF = float(os.getenv("REALTIME_RESUME_BACKOFF", "0.25"))
+REALTIME_RESUME_BACKOFF_MAX = 2.0
 
 
 # ----------------------------------------------------------
@@ -162,21 +96,79 @@ def apply_gain(pcm_bytes: bytes, gain: float = 1.35) -> bytes:
 
 @app.get("/")
 async def root():
-    return {"status": "ok", "msg": "Mos Craciun AI – RO/EN 🎅"}
+    return {
+        "status": "draining" if drain_started is not None else "ok",
+        "msg": "Mos Craciun AI – RO/EN 🎅",
+        "drain": drain_status(),
+        "realtime_pool": realtime_pool.stats(),
+        "capacity": admission.stats(),
+        "timers": timers.stats(),
+        "personas": personas.stats(),
+        "response_cache": response_cache.stats() if response_cache is not None else None,
+        "recorder": recorder.stats() if recorder is not None else None,
+        "vonage_events": vonage_events.stats(),
+        "usage": usage_ledger.stats(),
+        "calls": calls.stats(),
+        "log_dropped": calllog.dropped(),
+    }
+
+
+@app.get("/calls")
+async def list_calls():
+    return calls.snapshot()
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 # ----------------------------------------------------------
 # NCCO
 # ----------------------------------------------------------
 
+async def webhook_params(request: Request) -> dict:
+    if request.method == "GET":
+        return dict(request.query_params)
+    try:
+        return await request.json()
+    except Exception:
+        return {}
+
+
+def busy_ncco():
+    if BUSY_AUDIO_URL:
+        return [{"action": "stream", "streamUrl": [BUSY_AUDIO_URL]}]
+    return [{"action": "talk", "text": BUSY_TEXT, "language": "ro-RO"}]
+
+
 @app.api_route("/webhooks/answer", methods=["GET", "POST"])
 async def ncco(request: Request):
 
+    params = await webhook_params(request)
+    call_id = params.get("uuid") or params.get("conversation_uuid") or uuid.uuid4().hex
+
+    # worker-ul se oprește → nu mai primim apeluri noi
+    if drain_started is not None:
+        log.warning("call_rejected_draining", call_id=call_id)
+        return JSONResponse(content=busy_ncco())
+
+    # capacitate epuizată → mesaj scurt "Moșul e ocupat", fără WebSocket
+    if not await admission.reserve(call_id):
+        log.warning("call_rejected_busy", call_id=call_id)
+        return JSONResponse(content=busy_ncco())
+
     if not WS_URL:
         host = request.headers.get("host", "")
         uri = f"wss://{host}/ws"
     else:
         uri = WS_URL
+    sep = "&" if "?" in uri else "?"
+    uri = f"{uri}{sep}call_id={call_id}"
+    if params.get("conversation_uuid"):
+        uri += f"&conversation_uuid={params['conversation_uuid']}"
+    # persona după numărul format de copil
+    uri += f"&persona={personas.for_number(params.get('to')).name}"
 
     ncco = [
         {
@@ -185,7 +177,7 @@ async def ncco(request: Request):
                 {
                     "type": "websocket",
                     "uri": uri,
-                    "content-type": "audio/l16;rate=16000",
+                    "content-type": f"audio/l16;rate={VONAGE_RATE}",
                 }
             ],
         }
@@ -196,13 +188,15 @@ async def ncco(request: Request):
 
 @app.api_route("/webhooks/event", methods=["GET", "POST"])
 async def event(request: Request):
-    try:
-        if request.method == "GET":
-            print("Vonage Event:", dict(request.query_params))
-        else:
-            print("Vonage Event:", await request.json())
-    except Exception as e:
-        print("Error parsing event:", e)
+    # doar coadă; scrierea și logul le face consumatorul, în loturi. Vonage primește mereu 200
+    if request.method == "GET":
+        params = dict(request.query_params)
+    else:
+        try:
+            params = loads(await request.body())
+        except ValueError:
+            params = None
+    vonage_events.submit(params)
     return PlainTextResponse("OK")
 
 
@@ -210,10 +204,11 @@ async def event(request: Request):
 # Connect to OpenAI
 # ----------------------------------------------------------
 
-async def connect_openai():
+async def connect_openai(persona=None):
     if not OPENAI_API_KEY:
         raise Exception("OPENAI_API_KEY not set")
 
+    persona = persona or personas.default
     headers = [
         ("Authorization", f"Bearer {OPENAI_API_KEY}"),
         ("OpenAI-Beta", "realtime=v1"),
@@ -221,41 +216,129 @@ async def connect_openai():
 
     ws = await websockets.connect(OPENAI_REALTIME_URL, extra_headers=headers)
 
-    # Sesiune cu voce subțire și prompt detaliat
-    await ws.send(
-        json.dumps(
-            {
-                "type": "session.update",
-                "session": {
-                    "instructions": SANTA_PROMPT,
-                    "modalities": ["audio", "text"],
-                    "voice": "coral",  # mai subțire, caldă
-                    "input_audio_format": "pcm16",
-                    "output_audio_format": "pcm16",
-                    "turn_detection": {"type": "server_vad"},
-                },
-            }
-        )
-    )
+    # session.update deja serializat; cheia spune cu ce persona e configurat socketul
+    await ws.send(persona.session_update)
+    ws.session_key = persona.session_key
 
-    # Moșul începe cu mesajul fix în română, apoi așteaptă copilul
-    await ws.send(
-        json.dumps(
-            {
-                "type": "response.create",
-                "response": {
-                    "modalities": ["audio", "text"],
-                    "instructions": (
-                        "Say ONLY this exact sentence in Romanian and nothing else:\n"
-                        "Ho-ho-ho! Bună drag copil, sunt Moș Crăciun! Ce faci, puișor?\n"
-                        "Then stop speaking and wait silently for the child."
-                    ),
-                },
-            }
+    return ws
+
+
+# socketuri Realtime deja configurate (persona implicită), gata pentru apelul următor
+realtime_pool = RealtimePool(connect_openai)
+
+# ambianța de fundal: memmap read-only, partajat de toate apelurile
+ambience_bed = load_bed()
+
+# apelurile active din acest worker, după call_id
+calls = CallRegistry()
+
+# prompturi + setări de sesiune per persona, precompilate (reload la modificare)
+personas = PersonaRegistry(
+    # transcrierea copilului: cache, înregistrare, rezumatul pentru reconectare
+    transcribe=RESPONSE_CACHE or RECORD_CALLS or RESUME_SUMMARY,
+    # cu cache: decidem noi, după transcriere, dacă întrebăm modelul
+    create_response=not RESPONSE_CACHE,
+    local_turns=LOCAL_TURNS,
+)
+greetings_rendering = set()
+
+# răspunsuri scurte deja redate pentru întrebările frecvente (opțional)
+response_cache = ResponseCache() if RESPONSE_CACHE else None
+
+# înregistrarea apelurilor (WAV stereo + transcrieri), scrisă de un fir separat
+recorder = Recorder() if RECORD_CALLS else None
+
+
+def link_call(call_id: str):
+    session = calls.get(call_id)
+    if session is None:
+        return None
+    return STATE_NAMES[session.state], session.close_reason
+
+
+# evenimentele Vonage: coadă + scriere în loturi (SQLite), legate de apelurile live
+vonage_events = VonageEvents(link=link_call)
+
+# audio / tokeni / cost pe apelurile terminate în acest worker
+usage_ledger = UsageLedger()
+
+
+async def render_greeting(persona):
+    try:
+        await persona.greeting.render(
+            lambda: connect_openai(persona), persona.greeting_create, gain=SANTA_GAIN
         )
-    )
+    except Exception:
+        log.exception("greeting_render_failed", persona=persona.name)
+    finally:
+        greetings_rendering.discard(persona.greeting.path)
 
-    return ws
+
+def prepare_greetings():
+    # salutul fiecărei persona: din fișier, altfel randat o dată în fundal
+    # (personas cu același salut au același GreetingCache)
+    for persona in personas:
+        greeting = persona.greeting
+        if greeting.ready or greeting.path in greetings_rendering:
+            continue
+        if not greeting.load(gain=SANTA_GAIN) and OPENAI_API_KEY:
+            greetings_rendering.add(greeting.path)
+            asyncio.create_task(render_greeting(persona))
+
+
+@app.on_event("startup")
+async def start_realtime_pool():
+    if OPENAI_API_KEY:
+        realtime_pool.start()
+
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    asyncio.create_task(metrics.loop_lag_monitor())
+
+
+@app.on_event("startup")
+async def start_recorder():
+    if recorder is not None:
+        recorder.start()
+
+
+@app.on_event("startup")
+async def start_vonage_events():
+    vonage_events.start()
+
+
+@app.on_event("startup")
+async def load_personas():
+    prepare_greetings()
+    personas.start(on_reload=prepare_greetings)
+
+
+@app.on_event("shutdown")
+async def close_calls():
+    if calls.close_all("shutdown"):
+        await calls.wait_empty(timeout=5.0)
+
+
+@app.on_event("shutdown")
+async def stop_realtime_pool():
+    await realtime_pool.stop()
+
+
+@app.on_event("shutdown")
+async def stop_recorder():
+    if recorder is not None:
+        await asyncio.to_thread(recorder.stop)
+
+
+@app.on_event("shutdown")
+async def stop_vonage_events():
+    await vonage_events.stop()
+
+
+@app.on_event("shutdown")
+async def flush_logs():
+    calllog.shutdown()
 
 
 # ----------------------------------------------------------
@@ -263,14 +346,152 @@ async def connect_openai():
 # ----------------------------------------------------------
 
 class CallSession:
-    def __init__(self):
+
+    __slots__ = (
+        "call_id", "persona", "context", "vonage_ws", "openai_ws", "state", "close_reason", "tasks", "_closed",
+        "start", "start_mono", "first_audio_time", "last_child_audio_time",
+        "wrapping_up", "silence_timer", "wrap_up_timer", "hangup_timer",
+        "santa_agc", "child_agc", "upsampler", "downsampler", "pacer", "vad", "writer", "recording",
+        "current_response_id", "cancelled_response_id", "speech_end_mono", "barge_in_mono",
+        "cache_question", "cache_rid", "cache_pcm", "cache_text", "cache_served", "playback_timer",
+        "turn_open", "turn_timer", "preroll", "memory", "reconnects", "usage",
+        "response_active", "pending_create",
+    )
+
+    def __init__(self, vonage_ws: WebSocket, call_id: str, persona=None):
+        self.call_id = call_id
+        # persona aleasă la answer; rămâne aceeași chiar dacă fișierul se reîncarcă
+        self.persona = persona or personas.default
+        # contextul apelului (call_id în loguri) pentru cod rulat din afara lui
+        self.context = contextvars.copy_context()
+        self.vonage_ws = vonage_ws
+        self.openai_ws = None
+        self.state = CONNECTING
+        self.close_reason = None
+        # task-urile apelului (picioarele, pacer, writer) – anulate la teardown
+        self.tasks = []
+        self._closed = asyncio.Event()
         self.start = time.time()
+        self.start_mono = time.monotonic()
+        self.first_audio_time = None  # time-to-first-audio (s)
+        # pentru tăcere: ultima dată când am auzit copilul (sau Moșul a terminat)
+        self.last_child_audio_time = time.monotonic()
+        # după wrap-up (4 minute, drain, buget) ascultarea continuă în WRAP_UP
+        self.wrapping_up = False
+        # termene pe schedulerul comun (setate în run_call)
+        self.silence_timer = None
+        self.wrap_up_timer = None
+        self.hangup_timer = None
+        # AGC + limitator cu look-ahead pe vocea Moșului; opțional și pe copil
+        self.santa_agc = santa_agc(SANTA_GAIN)
+        self.child_agc = child_agc() if INBOUND_AGC else None
+        # Vonage l16 16 kHz <-> Realtime pcm16 24 kHz
+        self.upsampler = Resampler(VONAGE_RATE, OPENAI_RATE)
+        self.downsampler = Resampler(OPENAI_RATE, VONAGE_RATE)
+        # audio Moș -> Vonage în cadre exacte de 20 ms
+        mixer = AmbienceMixer(ambience_bed) if ambience_bed is not None else None
+        # înregistrare opțională: copilul la intrare, ce trimite pacer-ul la ieșire
+        self.recording = recorder.open(call_id) if recorder is not None else None
+        self.pacer = OutboundPacer(
+            vonage_ws.send_bytes, mixer=mixer, on_sent=metrics.frame_out,
+            tap=self.recording.santa if self.recording is not None else None,
+        )
+        # un singur răspuns activ la model: alt response.create așteaptă response.done
         self.response_active = False
-        self.closing_phase = False
-        self.hangup = False
-        self.ws_closed = False
-        # pentru tăcere: ultima dată când am auzit copilul
-        self.last_child_audio_time = time.time()
+        self.pending_create = None
+        # răspunsul anulat la barge-in: delta-urile lui întârziate se aruncă
+        self.current_response_id = None
+        self.cancelled_response_id = None
+        # VAD pentru copil: barge-in + tăcere
+        self.vad = make_vad()
+        # singurul task care scrie pe socketul OpenAI (setat în run_call)
+        self.writer = None
+        # pentru metrici: sfârșitul vorbirii copilului / momentul barge-in
+        self.speech_end_mono = None
+        self.barge_in_mono = None
+        # cache de răspunsuri: întrebarea al cărei răspuns îl strângem acum
+        self.cache_question = None
+        self.cache_rid = None
+        self.cache_pcm = bytearray()
+        self.cache_text = None
+        self.cache_served = set()  # același răspuns din cache doar o dată pe apel
+        # Moșul a terminat de generat, dar audio-ul încă se redă din pacer
+        self.playback_timer = None
+        # turn-uri locale: audio trimis doar cât copilul vorbește (+ pre-roll)
+        self.turn_open = False
+        self.turn_timer = None
+        self.preroll = deque(maxlen=max(1, TURN_PREROLL_MS // 20))
+        # nume, dorințe, limbă, ultimele replici: rezumatul pentru o sesiune Realtime nouă
+        self.memory = CallMemory()
+        self.reconnects = 0
+        # audio, răspunsuri, tokeni, cost estimat – pentru bugete și ledger
+        self.usage = CallUsage()
+
+    @property
+    def santa_speaking(self) -> bool:
+        return self.state == SANTA_SPEAKING
+
+    @property
+    def closing(self) -> bool:
+        return self.state >= CLOSING
+
+    def listen(self) -> None:
+        """Santa is done: back to LISTENING, or WRAP_UP once the call is wrapping up."""
+        self.to(WRAP_UP if self.wrapping_up else LISTENING)
+
+    def to(self, state: int) -> bool:
+        """Move to `state` if the transition is allowed; False otherwise."""
+        if state == self.state:
+            return True
+        if state not in TRANSITIONS[self.state]:
+            log.debug("state_refused", state=STATE_NAMES[self.state], to=STATE_NAMES[state])
+            return False
+        self.state = state
+        return True
+
+    # ---------------- teardown (un singur drum, idempotent) ----------------
+
+    def close(self, reason: str) -> None:
+        if self.state >= CLOSING:
+            return
+        self.state = CLOSING
+        self.close_reason = reason
+        timers.cancel(self.silence_timer)
+        timers.cancel(self.wrap_up_timer)
+        timers.cancel(self.hangup_timer)
+        timers.cancel(self.playback_timer)
+        timers.cancel(self.turn_timer)
+        self.pacer.close()
+        if self.writer is not None:
+            self.writer.close()
+        if self.recording is not None:
+            self.recording.close(reason)
+        self.tasks.append(asyncio.create_task(self._teardown()))
+
+    async def _teardown(self) -> None:
+        try:
+            for ws in (self.openai_ws, self.vonage_ws):
+                if ws is None:
+                    continue
+                try:
+                    await ws.close()
+                except Exception:
+                    pass
+
+            # pacer și writer se opresc singuri după close(); restul îl anulăm
+            current = asyncio.current_task()
+            pending = [t for t in self.tasks if t is not current and not t.done()]
+            if pending:
+                _, stuck = await asyncio.wait(pending, timeout=2.0)
+                for t in stuck:
+                    t.cancel()
+        finally:
+            self.state = CLOSED
+            self._closed.set()
+            calls.remove(self)
+
+    async def wait_closed(self) -> None:
+        await self._closed.wait()
 
 
 # ----------------------------------------------------------
@@ -279,63 +500,65 @@ class CallSession:
 
 async def vonage_to_openai(openai_ws, vonage_ws: WebSocket, session: CallSession):
 
-    # prag foarte mic pentru întrerupere
-    AMP_BARGE_IN = 300
-    AMP_SPEECH = 150  # pentru a considera că e vorbire reală
-
     try:
         while True:
             msg = await vonage_ws.receive()
 
             if msg["type"] == "websocket.disconnect":
-                print("Vonage WS disconnected.")
+                log.info("vonage_disconnected")
                 break
 
             audio = msg.get("bytes")
             if not audio or len(audio) < 2:
                 continue
 
-            num_samples = len(audio) // 2
-            samples = struct.unpack("<" + "h" * num_samples, audio)
-            max_amp = max(abs(s) for s in samples)
-
-            # copilul face zgomot / vorbește → actualizăm ultima activitate
-            if max_amp > AMP_SPEECH:
-                session.last_child_audio_time = time.time()
-
-            # barge-in foarte rapid: la zgomot mic, dacă Moșul vorbește
-            if max_amp > AMP_BARGE_IN and session.response_active:
-                print("BARGE-IN: copilul întrerupe, anulăm răspunsul curent.")
-                try:
-                    await openai_ws.send(json.dumps({"type": "response.cancel"}))
-                except Exception as e:
-                    print("Error sending response.cancel:", e)
-
-            # trimitem audio copil -> OpenAI
-            await openai_ws.send(
-                json.dumps(
-                    {
-                        "type": "input_audio_buffer.append",
-                        "audio": base64.b64encode(audio).decode(),
-                    }
-                )
-            )
+            metrics.FRAMES_IN.value += 1
+            metrics.BYTES_IN.value += len(audio)
+            session.usage.in_bytes += len(audio)
+            if session.recording is not None:
+                session.recording.child(audio)
+            if session.child_agc is not None:
+                # ecoul Moșului nu trebuie să miște câștigul copilului
+                audio = session.child_agc.process(audio, adapt=not session.santa_speaking)
+
+            vad_event = session.vad.process(audio, santa_speaking=session.santa_speaking)
+
+            # copilul vorbește → actualizăm ultima activitate
+            if session.vad.speaking or vad_event == SPEECH_END:
+                session.last_child_audio_time = time.monotonic()
+            if vad_event == SPEECH_END:
+                # VAD-ul anunță sfârșitul după hangover; copilul a tăcut de atunci
+                hangover_ms = session.vad.hangover_frames * session.vad.frame_ms
+                session.speech_end_mono = time.monotonic() - hangover_ms / 1000
+
+            # barge-in: început de vorbire confirmat de VAD, dacă Moșul vorbește
+            if vad_event == SPEECH_START and session.santa_speaking:
+                metrics.BARGE_INS.inc()
+                dropped = session.pacer.flush()
+                session.santa_agc.reset()
+                log.info("barge_in", dropped_frames=dropped)
+                if session.recording is not None:
+                    session.recording.event("barge_in", dropped_frames=dropped)
+                if session.playback_timer is not None:
+                    # doar coada locală (răspuns terminat sau din cache): nimic de anulat la model
+                    end_playback(session)
+                else:
+                    session.cancelled_response_id = session.current_response_id
+                    session.barge_in_mono = time.monotonic()
+                    session.writer.send(RESPONSE_CANCEL)
+
+            # trimitem audio copil -> OpenAI (resamplat la 24 kHz, în loturi)
+            pcm_24k = session.upsampler.process(audio)
+            if LOCAL_TURNS:
+                on_local_turn_audio(session, vad_event, pcm_24k)
+            else:
+                session.writer.push_audio(pcm_24k)
 
     except Exception as e:
-        print("Error V->O:", e)
+        log.warning("vonage_to_openai_error", error=str(e))
 
     finally:
-        session.hangup = True
-        if not session.ws_closed:
-            session.ws_closed = True
-            try:
-                await openai_ws.close()
-            except Exception:
-                pass
-            try:
-                await vonage_ws.close()
-            except Exception:
-                pass
+        session.close("vonage_disconnected")
 
 
 # ----------------------------------------------------------
@@ -345,161 +568,568 @@ async def vonage_to_openai(openai_ws, vonage_ws: WebSocket, session: CallSession
 async def openai_to_vonage(openai_ws, vonage_ws: WebSocket, session: CallSession):
 
     try:
-        async for raw in openai_ws:
+        while True:
+            try:
+                await relay_realtime_events(openai_ws, session)
+            except websockets.ConnectionClosed:
+                pass
+            # socketul Realtime a căzut: apelul continuă pe unul nou, dacă se poate
+            if session.closing:
+                break
+            openai_ws = await resume_openai(session)
+            if openai_ws is None:
+                break
+
+    except Exception as e:
+        log.warning("openai_to_vonage_error", error=str(e))
+
+    finally:
+        session.close("openai_closed")
+
+
+async def relay_realtime_events(openai_ws, session: CallSession):
+    """Handle server events until the socket closes (raises ConnectionClosed on errors)."""
+    async for raw in openai_ws:
+        try:
+            ev = decode_event(raw)
+        except Exception as e:
+            log.sampled("openai_parse_error", every=100, error=str(e))
+            continue
+
+        t = ev.type
+
+        if t == "response.created":
+            session.response_active = True
+            timers.cancel(session.playback_timer)
+            session.playback_timer = None
+            session.to(SANTA_SPEAKING)
+
+        if t == "response.done":
+            # un singur eveniment de final; cum s-a terminat spune response.status
+            response = ev.get("response") or {}
+            status = response.get("status")
+            if status != "cancelled" and session.pacer.queued_ms > 0:
+                # modelul trimite mai repede decât timp real: Moșul vorbește până se golește coada
+                start_playback_tail(session)
+            else:
+                session.listen()
+                session.last_child_audio_time = time.monotonic()
+
+            if status == "cancelled" and session.barge_in_mono is not None:
+                metrics.BARGE_IN_REACTION.observe(time.monotonic() - session.barge_in_mono)
+                session.barge_in_mono = None
+
+            if session.cache_rid is not None and response.get("id") == session.cache_rid:
+                store_cached_answer(session, ok=(status == "completed"))
+
+            session.usage.response_done(response)
+            session.response_active = False
+            if session.usage.exceeded is None:
+                check_budget(session)
+            if session.pending_create is not None and not session.closing:
+                create, session.pending_create = session.pending_create, None
+                session.writer.send(create)
+
+        if t == "conversation.item.input_audio_transcription.completed":
+            session.memory.child(ev.get("transcript"))
+            if session.recording is not None:
+                session.recording.event("child_transcript", text=ev.get("transcript"))
+            if response_cache is not None:
+                on_child_transcript(session, ev.get("transcript") or "")
+
+        if t == "conversation.item.input_audio_transcription.failed":
+            log.warning("child_transcription_failed", error=ev.get("error"))
+            if session.recording is not None:
+                session.recording.event("child_transcript_failed")
+            if response_cache is not None:
+                # create_response e oprit: fără transcriere răspunsul îl cerem noi, fără cache
+                ask_model(session)
+
+        if t == "response.audio_transcript.done":
+            session.memory.santa(ev.get("transcript"))
+            if session.recording is not None:
+                session.recording.event("santa_transcript", text=ev.get("transcript"), response_id=ev.response_id)
+            if ev.response_id == session.cache_rid:
+                session.cache_text = ev.get("transcript")
+
+        if t == "response.audio.delta":
+            # și audio-ul anulat la barge-in a fost generat (și plătit)
+            session.usage.out_bytes += len(ev.audio)
+            rid = ev.response_id
+            if rid is not None and rid == session.cancelled_response_id:
+                continue
+            if rid != session.current_response_id and session.speech_end_mono is not None:
+                # primul audio al unui răspuns nou după ce copilul a tăcut
+                turn_latency = time.monotonic() - session.speech_end_mono
+                metrics.TURN_LATENCY.observe(turn_latency)
+                if response_cache is not None:
+                    response_cache.observe_model_latency(turn_latency)
+                session.speech_end_mono = None
+            session.current_response_id = rid
+            if session.first_audio_time is None:
+                session.first_audio_time = time.monotonic() - session.start_mono
+                metrics.TIME_TO_GREETING.observe(session.first_audio_time)
+                log.info("first_audio", ttfa_ms=round(session.first_audio_time * 1000), source="model")
+            pcm = samples(ev.audio)
+            pcm_16k = session.downsampler.process_array(pcm)
+            session.santa_agc.process_inplace(pcm_16k)
+            session.pacer.push(pcm_16k)
+
+            if session.cache_question is not None:
+                if session.cache_rid is None:
+                    session.cache_rid = rid
+                if rid == session.cache_rid:
+                    session.cache_pcm += pcm_16k.tobytes()
+                    if len(session.cache_pcm) > MAX_ANSWER_BYTES:
+                        # prea lung pentru cache
+                        session.cache_question = None
+
+        if t == "response.audio.done":
+            if ev.response_id is None or ev.response_id != session.cancelled_response_id:
+                # ultimele ms rămase în look-ahead-ul limitatorului
+                session.pacer.push(session.santa_agc.flush())
+            session.pacer.end_of_audio()
+
+        if t == "error":
+            metrics.OPENAI_ERRORS.inc()
+            log.error("openai_error", event_data=ev.data)
+
+
+# ----------------------------------------------------------
+# Reconectare Realtime (socket căzut în mijlocul apelului)
+# ----------------------------------------------------------
+
+def abandon_response(session: CallSession):
+    """The response in flight died with the socket. Returns the event that asks for it again, or None."""
+    # salutul modelului nu a ajuns întreg → îl cerem din nou
+    retry = session.persona.greeting_create if session.state == GREETING else None
+    if session.speech_end_mono is not None or (session.santa_speaking and session.playback_timer is None):
+        # copilul așteaptă un răspuns care nu mai vine de pe socketul vechi
+        retry = RESPONSE_CREATE
+    if session.pending_create is not None:
+        # promptul amânat (wrap-up, la revedere) trece înaintea reluării răspunsului
+        retry, session.pending_create = session.pending_create, None
+    session.response_active = False
+    store_cached_answer(session, ok=False)
+    session.current_response_id = None
+    session.cancelled_response_id = None
+    session.barge_in_mono = None
+
+    if session.santa_speaking and session.playback_timer is None:
+        # ce a apucat să sosească se redă până la capăt
+        session.pacer.end_of_audio()
+        if session.pacer.queued_ms > 0:
+            start_playback_tail(session)
+        else:
+            end_playback(session)
+    elif session.state == GREETING:
+        session.listen()
+    return retry
+
+
+def resume_item(summary: str) -> str:
+    return json.dumps({
+        "type": "conversation.item.create",
+        "item": {
+            "type": "message",
+            "role": "system",
+            "content": [{"type": "input_text", "text": summary}],
+        },
+    })
+
+
+async def restore_session(session: CallSession, ws):
+    # socket din pool: persona implicită; apoi ce știm din conversația de până acum
+    if getattr(ws, "session_key", None) != session.persona.session_key:
+        await ws.send(session.persona.session_update)
+        ws.session_key = session.persona.session_key
+    summary = session.memory.summary()
+    if summary:
+        await ws.send(resume_item(summary))
+
+
+async def resume_openai(session: CallSession):
+    """Replace the dropped Realtime socket; the child hears comfort audio meanwhile. None = give up."""
+    t0 = time.monotonic()
+    metrics.REALTIME_DISCONNECTS.inc()
+    log.warning("openai_disconnected", state=STATE_NAMES[session.state],
+                code=getattr(session.openai_ws, "close_code", None))
+    if session.recording is not None:
+        session.recording.event("realtime_disconnected")
+
+    session.writer.detach()
+    retry = abandon_response(session)
+    # fără ambianță linia ar amuți: zgomot de confort până revine modelul
+    comfort = session.pacer.mixer is None
+    if comfort:
+        session.pacer.set_mixer(comfort_mixer())
+
+    deadline = t0 + REALTIME_RESUME_SECONDS
+    delay = REALTIME_RESUME_BACKOFF
+    attempt = 0
+    try:
+        while not session.closing:
+            attempt += 1
+            ws = None
             try:
-                data = json.loads(raw)
+                ws, warm = await asyncio.wait_for(
+                    realtime_pool.acquire(), max(0.1, deadline - time.monotonic())
+                )
+                await restore_session(session, ws)
             except Exception as e:
-                print("Error parsing OpenAI msg:", e)
+                log.warning("openai_reconnect_failed", attempt=attempt, error=str(e) or type(e).__name__)
+                if ws is not None:
+                    asyncio.create_task(ws.close())
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, REALTIME_RESUME_BACKOFF_MAX)
                 continue
 
-            t = data.get("type")
+            if session.closing:
+                asyncio.create_task(ws.close())
+                return None
+
+            session.openai_ws = ws
+            session.writer.attach(ws.send)
+            if retry is not None:
+                session.writer.send(retry)
+            session.reconnects += 1
+            recovery = time.monotonic() - t0
+            metrics.REALTIME_RECONNECTS.inc()
+            metrics.REALTIME_RECOVERY.observe(recovery)
+            log.info("openai_reconnected", attempt=attempt, warm=warm, recovery_ms=round(recovery * 1000),
+                     summary=bool(session.memory.turns), retry=retry is not None)
+            if session.recording is not None:
+                session.recording.event("realtime_reconnected", recovery_ms=round(recovery * 1000))
+            return ws
+    finally:
+        if comfort:
+            session.pacer.set_mixer(None)
 
-            if t == "response.started":
-                session.response_active = True
+    if not session.closing:
+        metrics.REALTIME_RESUME_FAILURES.inc()
+        log.error("openai_resume_failed", attempts=attempt, seconds=round(time.monotonic() - t0, 1))
+        session.close("openai_resume_failed")
+    return None
 
-            if t in ("response.completed", "response.canceled", "response.failed"):
-                session.response_active = False
 
-                # pregătim următorul răspuns (următorul turn al copilului)
-                if not session.hangup:
-                    await openai_ws.send(
-                        json.dumps(
-                            {
-                                "type": "response.create",
-                                "response": {"modalities": ["audio", "text"]},
-                            }
-                        )
-                    )
+# ----------------------------------------------------------
+# Sfârșitul redării (Moșul tace abia când se golește coada pacer-ului)
+# ----------------------------------------------------------
 
-            if t == "response.audio.delta":
-                pcm = base64.b64decode(data["delta"])
-                boosted = apply_gain(pcm, gain=1.35)
-                await vonage_ws.send_bytes(boosted)
+def start_playback_tail(session: CallSession):
+    timers.cancel(session.playback_timer)
+    session.playback_timer = timers.call_later(
+        session.pacer.queued_ms / 1000, end_playback, session
+    )
 
-            if t == "error":
-                print("OpenAI ERROR:", data)
 
-    except Exception as e:
-        print("Error O->V:", e)
+def end_playback(session: CallSession):
+    timers.cancel(session.playback_timer)
+    session.playback_timer = None
+    if session.santa_speaking:
+        session.listen()
+        session.last_child_audio_time = time.monotonic()
 
-    finally:
-        session.hangup = True
-        if not session.ws_closed:
-            session.ws_closed = True
-            try:
-                await openai_ws.close()
-            except Exception:
-                pass
-            try:
-                await vonage_ws.close()
-            except Exception:
-                pass
+
+# ----------------------------------------------------------
+# Turn-uri locale (TURN_DETECTION=local): VAD-ul nostru închide turul
+# ----------------------------------------------------------
+
+def on_local_turn_audio(session: CallSession, vad_event, pcm_24k: bytes):
+    if vad_event == SPEECH_START:
+        # copilul a continuat → turul rămâne deschis
+        timers.cancel(session.turn_timer)
+        session.turn_timer = None
+        if not session.turn_open:
+            session.turn_open = True
+            for chunk in session.preroll:
+                session.writer.push_audio(chunk)
+            session.preroll.clear()
+
+    if session.turn_open:
+        session.writer.push_audio(pcm_24k)
+    else:
+        session.preroll.append(pcm_24k)
+
+    if vad_event == SPEECH_END and session.turn_open:
+        # VAD-ul a așteptat deja hangover-ul lui; restul până la TURN_HANGOVER_MS
+        vad_hangover_ms = session.vad.hangover_frames * session.vad.frame_ms
+        delay = max(0, TURN_HANGOVER_MS - vad_hangover_ms) / 1000
+        session.turn_timer = timers.call_later(delay, end_local_turn, session)
+
+
+def end_local_turn(session: CallSession):
+    session.turn_timer = None
+    if session.closing or not session.turn_open:
+        return
+    session.turn_open = False
+    metrics.LOCAL_TURNS.inc()
+    # după audio-ul turului: commit + un singur response.create
+    session.writer.send_after_audio(INPUT_COMMIT)
+    # cu cache, răspunsul se cere la transcrierea turului
+    if response_cache is None:
+        session.writer.send_after_audio(RESPONSE_CREATE)
 
 
 # ----------------------------------------------------------
-# Watcher pentru tăcere – Moșul preia inițiativa
+# Cache de răspunsuri pentru întrebările frecvente
 # ----------------------------------------------------------
 
-async def silence_watcher(openai_ws, session: CallSession):
-    SILENCE_SECONDS = 7  # după ~7s de liniște, Moșul pune o întrebare scurtă
+def on_child_transcript(session: CallSession, transcript: str):
+    # răspunsurile din cache sunt per persona (voce + prompt)
+    key = cache_key(transcript, session.persona.session_key)
+    store = False
+    if key is not None and key not in session.cache_served:
+        entry = response_cache.get(key)
+        if entry is not None:
+            play_cached_answer(session, key, entry)
+            return
+        metrics.RESPONSE_CACHE_MISSES.inc()
+        # cache_served primește cheia doar când răspunsul chiar se redă din cache
+        store = response_cache.seen(key)
 
-    try:
-        while not session.ws_closed and not session.hangup:
-            await asyncio.sleep(1)
+    # miss: întrebăm modelul și, dacă merită, îi păstrăm răspunsul
+    ask_model(session, key if store else None)
 
-            # dacă Moșul vorbește, nu intervenim
-            if session.response_active:
-                continue
 
-            now = time.time()
-            if now - session.last_child_audio_time > SILENCE_SECONDS:
-                print("SILENCE: copilul e liniștit, Moșul pune o întrebare scurtă.")
-                session.last_child_audio_time = now  # reset ca să nu repete imediat
-
-                await openai_ws.send(
-                    json.dumps(
-                        {
-                            "type": "input_text",
-                            "text": (
-                                "The child has been quiet for a few seconds. "
-                                "As Santa, ask ONE very short, simple question "
-                                "to gently keep the conversation going, using "
-                                "the language you have been using (RO or EN). "
-                                "Keep it strictly on-topic and very brief."
-                            ),
-                        }
-                    )
-                )
-                await openai_ws.send(
-                    json.dumps(
-                        {
-                            "type": "response.create",
-                            "response": {"modalities": ["audio", "text"]},
-                        }
-                    )
-                )
+def ask_model(session: CallSession, key=None):
+    """Request a model response for the child's turn; `key`: cache its answer under it."""
+    session.cache_question = key
+    session.cache_rid = None
+    session.cache_pcm = bytearray()
+    session.cache_text = None
+    if not session.closing:
+        request_response(session, RESPONSE_CREATE)
 
-    except Exception as e:
-        print("Error in silence_watcher:", e)
+
+def request_response(session: CallSession, create: str):
+    """Send a response.create now, or once the response in flight is done."""
+    if session.response_active:
+        session.pending_create = create
+    else:
+        session.writer.send(create)
+
+
+def play_cached_answer(session: CallSession, key, entry):
+    now = time.monotonic()
+    session.cache_served.add(key)
+    for frame in entry.frames:
+        session.pacer.push(frame)
+    session.pacer.end_of_audio()
+    session.to(SANTA_SPEAKING)
+    start_playback_tail(session)
+
+    saved = 0.0
+    if session.speech_end_mono is not None:
+        latency = now - session.speech_end_mono
+        metrics.TURN_LATENCY.observe(latency)
+        saved = response_cache.observe_hit_latency(latency)
+        session.speech_end_mono = None
+    metrics.RESPONSE_CACHE_HITS.inc()
+    metrics.RESPONSE_CACHE_SAVED.inc(saved)
+    log.info("response_cache_hit", question=key[0], lang=key[1], saved_ms=round(saved * 1000))
+    session.memory.santa(entry.text)
+    if session.recording is not None:
+        session.recording.event("santa_transcript", text=entry.text, source="cache")
+
+    # modelul nu a generat răspunsul: îi spunem ce a zis Moșul
+    session.writer.send(
+        json.dumps(
+            {
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [{"type": "text", "text": entry.text}],
+                },
+            }
+        )
+    )
+
+
+def store_cached_answer(session: CallSession, ok: bool):
+    key, pcm, text = session.cache_question, session.cache_pcm, session.cache_text
+    session.cache_question = None
+    session.cache_rid = None
+    session.cache_pcm = bytearray()
+    session.cache_text = None
+    # doar răspunsuri întregi (fără barge-in), cu text pentru model
+    if ok and text and response_cache.put(key, pcm, text):
+        log.info("response_cache_store", question=key[0], lang=key[1], seconds=round(len(pcm) / 2 / VONAGE_RATE, 1))
 
 
 # ----------------------------------------------------------
-# Timer 4 + 5 minute
+# Termene per apel (tăcere, 4 + 5 minute) pe schedulerul comun
 # ----------------------------------------------------------
 
-async def call_timer(openai_ws, vonage_ws: WebSocket, session: CallSession):
+SILENCE_SECONDS = 7  # după ~7s de liniște, Moșul pune o întrebare scurtă
+WRAP_UP_SECONDS = 240
+HANGUP_SECONDS = 300
 
-    try:
-        # după 4 minute – anunțăm că pleacă în curând
-        await asyncio.sleep(240)
 
-        if session.ws_closed:
-            return
+def arm_call_timers(session: CallSession):
+    t0 = session.start_mono
+    session.silence_timer = timers.call_at(
+        session.last_child_audio_time + SILENCE_SECONDS, on_silence, session
+    )
+    session.wrap_up_timer = timers.call_at(t0 + WRAP_UP_SECONDS, on_wrap_up, session)
+    session.hangup_timer = timers.call_at(t0 + HANGUP_SECONDS, on_call_timeout, session)
+    # apel conectat după SIGTERM (answer primit înainte) → direct la revedere
+    if drain_started is not None:
+        say_goodbye(session)
 
-        session.closing_phase = True
-        print("CALL TIMER: începe faza de încheiere (4 minute).")
 
-        await openai_ws.send(
-            json.dumps(
-                {
-                    "type": "input_text",
-                    "text": (
-                        "Around 4 minutes have passed. As Santa, tell the child "
-                        "very briefly that you must leave soon to feed the "
-                        "reindeer and prepare gifts, and ask if they want to "
-                        "tell you one more thing. Use RO or EN based on the "
-                        "language you have been using. Keep it very short."
-                    ),
-                }
-            )
-        )
-        await openai_ws.send(
-            json.dumps(
-                {
-                    "type": "response.create",
-                    "response": {"modalities": ["audio", "text"]},
-                }
-            )
-        )
+def on_silence(session: CallSession):
+    if session.closing:
+        return
 
-        # încă 60 secunde până la 5 minute
-        await asyncio.sleep(60)
+    now = time.monotonic()
+    deadline = session.last_child_audio_time + SILENCE_SECONDS
+    # copilul (sau Moșul) a vorbit între timp → doar mutăm termenul
+    if now < deadline:
+        session.silence_timer = timers.call_at(deadline, on_silence, session)
+        return
 
-        if not session.ws_closed:
-            print("CALL TIMER: 5 minute – închidem apelul.")
-            session.hangup = True
-            session.ws_closed = True
-            try:
-                await openai_ws.close()
-            except Exception:
-                pass
-            try:
-                await vonage_ws.close()
-            except Exception:
-                pass
+    # dacă Moșul sau copilul vorbește, nu intervenim; sfârșitul lor repornește termenul
+    if session.santa_speaking or session.vad.speaking:
+        session.silence_timer = timers.call_at(now + SILENCE_SECONDS, on_silence, session)
+        return
 
-    except Exception as e:
-        print("Error in call_timer:", e)
+    log.info("silence_prompt")
+    if session.recording is not None:
+        session.recording.event("silence_prompt")
+    metrics.SILENCE_PROMPTS.inc()
+    session.last_child_audio_time = now  # reset ca să nu repete imediat
+    session.silence_timer = timers.call_at(now + SILENCE_SECONDS, on_silence, session)
+
+    request_response(session, session.persona.silence_prompt)
+
+
+def on_wrap_up(session: CallSession):
+    # după 4 minute – anunțăm că pleacă în curând
+    if session.closing:
+        return
+
+    # dacă Moșul vorbește acum, trece în WRAP_UP când termină (listen)
+    session.wrapping_up = True
+    if not session.santa_speaking:
+        session.to(WRAP_UP)
+    metrics.WRAP_UPS.inc()
+    log.info("call_wrap_up")
+
+    request_response(session, session.persona.wrap_up_prompt)
+
+
+def on_call_timeout(session: CallSession, reason: str = "timeout"):
+    # 5 minute (sau sfârșitul drain-ului / al bugetului) – închidem apelul
+    if session.closing:
+        return
+
+    log.info("call_timeout", reason=reason)
+    if reason == "drain":
+        metrics.DRAINED_CALLS.inc()
+    elif reason == "timeout":
+        metrics.TIMEOUTS.inc()
+    session.close(reason)
+
+
+def check_budget(session: CallSession):
+    # apelul a consumat cât avea voie: același "la revedere" scurt ca la drain
+    kind = session.usage.over_budget()
+    if kind is None:
+        return
+    session.usage.exceeded = kind
+    metrics.BUDGET_STOPS.inc()
+    log.info("call_budget_exceeded", budget=kind, usage=session.usage.stats())
+    if session.recording is not None:
+        session.recording.event("budget_exceeded", budget=kind)
+    say_goodbye(session, reason="budget")
+
+
+# ----------------------------------------------------------
+# Drain la SIGTERM – restart fără apeluri tăiate la mijloc
+# ----------------------------------------------------------
+
+drain_started = None  # time.monotonic() la primul SIGTERM
+drain_task = None
+
+
+def drain_status():
+    if drain_started is None:
+        return None
+    return {
+        "since_s": round(time.monotonic() - drain_started, 1),
+        "deadline_s": DRAIN_SECONDS,
+        "calls_left": len(calls),
+    }
+
+
+def say_goodbye(session: CallSession, reason: str = "drain"):
+    # wrap-up accelerat: un "la revedere" scurt, apoi închidem
+    if session.closing or session.writer is None:
+        return
+
+    session.wrapping_up = True
+    if not session.santa_speaking:
+        session.to(WRAP_UP)
+    timers.cancel(session.wrap_up_timer)
+    timers.cancel(session.hangup_timer)
+    session.hangup_timer = timers.call_later(
+        DRAIN_GOODBYE_SECONDS, on_call_timeout, session, reason
+    )
+
+    request_response(session, session.persona.goodbye_prompt)
+
+
+async def drain_calls(forward_sigterm):
+    log.info("drain_started", calls=len(calls), deadline_s=DRAIN_SECONDS)
+    for session in calls:
+        session.context.run(say_goodbye, session)
+
+    drained = await calls.wait_empty(timeout=DRAIN_SECONDS)
+    log.info("drain_finished", drained=drained, calls_left=len(calls))
+    forward_sigterm()
+
+
+@app.on_event("startup")
+async def install_drain_handler():
+    # rulează după ce uvicorn și-a pus handlerul de SIGTERM: îl amânăm până
+    # la golirea registrului (sau DRAIN_SECONDS), apoi i-l trimitem
+    loop = asyncio.get_running_loop()
+    try:
+        original = signal.getsignal(signal.SIGTERM)
+    except ValueError:
+        return
+
+    if original is None:
+        original = signal.SIG_DFL
+
+    def forward_sigterm():
+        signal.signal(signal.SIGTERM, original)
+        signal.raise_signal(signal.SIGTERM)
+
+    def start_drain():
+        global drain_task
+        drain_task = asyncio.create_task(drain_calls(forward_sigterm))
+
+    def on_sigterm(sig, frame):
+        global drain_started
+        if drain_started is not None:
+            # al doilea SIGTERM: nu mai așteptăm
+            forward_sigterm()
+            return
+        drain_started = time.monotonic()
+        # semnalul poate întrerupe codul unui apel: drain-ul pornește cu context curat
+        loop.call_soon_threadsafe(start_drain, context=contextvars.Context())
+
+    try:
+        signal.signal(signal.SIGTERM, on_sigterm)
+    except ValueError:
+        # nu suntem în thread-ul principal (ex. TestClient)
+        pass
 
 
 # ----------------------------------------------------------
@@ -508,24 +1138,88 @@ async def call_timer(openai_ws, vonage_ws: WebSocket, session: CallSession):
 
 @app.websocket("/ws")
 async def ws_handler(ws: WebSocket):
-    await ws.accept()
-    print("Vonage WebSocket connected.")
+    call_id = ws.query_params.get("call_id") or uuid.uuid4().hex
+    # toate task-urile apelului moștenesc ID-urile de corelare
+    calllog.call_id_var.set(call_id)
+    calllog.conversation_var.set(ws.query_params.get("conversation_uuid"))
 
-    session = CallSession()
+    if not await admission.admit(call_id):
+        log.warning("call_rejected_worker_full")
+        await ws.close()
+        return
 
+    metrics.CALLS.inc()
+    metrics.ACTIVE_CALLS.inc()
     try:
-        oai_ws = await connect_openai()
+        await ws.accept()
+        log.info("vonage_connected")
+        await run_call(ws, call_id, personas.get(ws.query_params.get("persona")))
+    finally:
+        metrics.ACTIVE_CALLS.dec()
+        await admission.release(call_id)
+
+
+async def run_call(ws: WebSocket, call_id: str, persona=None):
+    session = CallSession(ws, call_id, persona)
+    persona = session.persona
+    calls.add(session)
+    session.tasks.append(asyncio.create_task(session.pacer.run()))
+
+    # salutul din cache pornește imediat, cât timp ne conectăm la OpenAI
+    cached_greeting = persona.greeting.ready
+    if cached_greeting:
+        session.to(GREETING)
+        for frame in persona.greeting.frames:
+            session.pacer.push(frame)
+        # Moșul vorbește cât se redă salutul: barge-in, marja de ecou, tăcerea de după
+        session.to(SANTA_SPEAKING)
+        start_playback_tail(session)
+        session.first_audio_time = time.monotonic() - session.start_mono
+        metrics.TIME_TO_GREETING.observe(session.first_audio_time)
+        log.info("first_audio", ttfa_ms=round(session.first_audio_time * 1000), source="cached_greeting")
+        session.memory.santa(persona.greeting_text)
+
+    try:
+        session.openai_ws, warm = await realtime_pool.acquire()
+        oai_ws = session.openai_ws
+        # socket din pool configurat cu altă persona (sau înainte de un reload)
+        if getattr(oai_ws, "session_key", None) != persona.session_key:
+            await oai_ws.send(persona.session_update)
+            oai_ws.session_key = persona.session_key
+        if cached_greeting:
+            # salutul a fost deja redat din cache → îl punem în conversație ca spus de Moș
+            await oai_ws.send(persona.greeting_item)
+        else:
+            # Moșul începe cu mesajul fix, apoi așteaptă copilul
+            await oai_ws.send(persona.greeting_create)
+            session.to(GREETING)
+        log.info("openai_session", warm=warm, persona=persona.name)
     except Exception as e:
-        print("Failed to connect to OpenAI:", e)
-        await ws.close()
+        metrics.OPENAI_ERRORS.inc()
+        log.error("openai_connect_failed", error=str(e))
+        session.close("openai_connect_failed")
+        await session.wait_closed()
         return
 
-    timer = asyncio.create_task(call_timer(oai_ws, ws, session))
-    silence = asyncio.create_task(silence_watcher(oai_ws, session))
+    session.writer = RealtimeWriter(oai_ws.send)
+    session.tasks += [
+        asyncio.create_task(session.writer.run()),
+        asyncio.create_task(vonage_to_openai(oai_ws, ws, session)),
+        asyncio.create_task(openai_to_vonage(oai_ws, ws, session)),
+    ]
+
+    arm_call_timers(session)
+
+    # oricare picior se termină → close() → teardown închide tot restul
+    await session.wait_closed()
+    vonage_events.call_ended(call_id, session.close_reason)
+    usage_ledger.add(session.usage)
 
-    await asyncio.gather(
-        vonage_to_openai(oai_ws, ws, session),
-        openai_to_vonage(oai_ws, ws, session),
-        timer,
-        silence,
+    log.info(
+        "call_ended",
+        reason=session.close_reason,
+        reconnects=session.reconnects,
+        usage=session.usage.stats(),
+        pacer=session.pacer.stats(),
+        writer=session.writer.stats(),
     )
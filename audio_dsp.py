@@ -0,0 +1,76 @@
+"""
+Vectorized PCM16 helpers for the audio hot path.
+
+All functions work on little-endian signed 16-bit mono PCM, the format
+used by both the Vonage (l16) and the OpenAI Realtime (pcm16) legs.
+Frames are viewed with numpy.frombuffer, so no per-sample Python objects
+are created. Gain and limiting live in agc.py.
+"""
+
+import numpy as np
+
+
+PCM16 = np.dtype("<i2")
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+
+
+# ----------------------------------------------------------
+# Views
+# ----------------------------------------------------------
+
+def samples(buf) -> np.ndarray:
+    """int16 view over a PCM buffer (no copy). Odd trailing byte is ignored."""
+    if isinstance(buf, np.ndarray):
+        return buf
+    n = len(buf) // 2
+    return np.frombuffer(buf, dtype=PCM16, count=n)
+
+
+# ----------------------------------------------------------
+# Per-call DSP state
+# ----------------------------------------------------------
+
+class FrameDSP:
+    """
+    Holds the float32 scratch buffer reused for every frame of one call,
+    so RMS never allocates on the hot path.
+    """
+
+    __slots__ = ("_scratch",)
+
+    def __init__(self, max_samples: int = 4800):
+        self._scratch = np.empty(max_samples, dtype=np.float32)
+
+    def scratch(self, n: int) -> np.ndarray:
+        if n > self._scratch.shape[0]:
+            self._scratch = np.empty(n, dtype=np.float32)
+        return self._scratch[:n]
+
+    def rms(self, buf) -> float:
+        s = samples(buf)
+        if not s.size:
+            return 0.0
+        f = self.scratch(s.size)
+        f[:] = s
+        return float(np.sqrt(np.dot(f, f) / s.size))
+
+
+# ----------------------------------------------------------
+# Stateless helpers
+# ----------------------------------------------------------
+
+def peak(buf) -> int:
+    """Max absolute sample value. Avoids np.abs, which wraps -32768."""
+    s = samples(buf)
+    if not s.size:
+        return 0
+    return max(int(s.max()), -int(s.min()))
+
+
+_default_dsp = FrameDSP()
+
+
+def rms(buf) -> float:
+    return _default_dsp.rms(buf)
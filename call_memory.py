@@ -0,0 +1,120 @@
+"""
+What Santa should remember about a call if its Realtime session is lost.
+
+The Realtime conversation lives on OpenAI's side; when the socket drops
+mid-call a new session starts empty. CallMemory keeps, from the child
+and Santa transcripts already flowing through the bridge, the few facts
+that make a resumed call feel continuous: the child's name, the wishes
+they mentioned, the language they speak and the last few exchanges.
+summary() renders them as one short system message for the new session.
+
+Extraction is a handful of regexes over Romanian and English phrasing,
+run once per transcript; nothing here is on the audio path.
+
+    RESUME_SUMMARY   1 turns on input transcription (whisper-1) for every
+                     call so the summary has the child's side: name,
+                     wishes, language. Transcription is billed per minute
+                     of child audio on all calls, for a path only taken on
+                     reconnects, so it is off by default; Santa's side is
+                     always known, and RESPONSE_CACHE / RECORD_CALLS turn
+                     transcription on anyway.
+"""
+
+import os
+import re
+from collections import deque
+
+from response_cache import detect_language, fold
+
+
+RESUME_SUMMARY = os.getenv("RESUME_SUMMARY", "0") == "1"
+
+MAX_WISHES = 5
+MAX_TURNS = 6          # replici păstrate pentru rezumat
+MAX_TURN_CHARS = 160
+MAX_SUMMARY_CHARS = 1200
+
+_LANGUAGES = {"ro": "Romanian", "en": "English"}
+
+# pe text fără diacritice (fold), deci "mă numesc" -> "ma numesc"
+_NAME = re.compile(
+    r"\b(?:ma numesc|ma cheama|numele meu (?:e|este)|my name is|my name s|call me|i m called)"
+    r"\s+([a-z][a-z-]{1,20})"
+)
+_WISH = re.compile(
+    r"\b(?:imi doresc|mi as dori|as vrea|vreau|as dori|i want|i wish for|i wish|i d like|i would like"
+    r"|i m hoping for|can i have|can you bring me|poti sa imi aduci|sa imi aduci)\s+(.{3,80})"
+)
+# dorința se oprește la motiv; enumerările se despart
+_WISH_END = re.compile(r"\s+(?:dar|but|pentru ca|because|fiindca|ca sa)\b.*")
+_WISH_SPLIT = re.compile(r"\s+(?:si|and|sau|or)\s+")
+_SENTENCES = re.compile(r"[.!?;]+")
+_NOT_NAMES = {"bine", "fine", "good", "okay", "ok", "aici", "here"}
+
+
+class CallMemory:
+
+    __slots__ = ("name", "wishes", "turns", "_lang")
+
+    def __init__(self):
+        self.name = None
+        self.wishes = []
+        self.turns = deque(maxlen=MAX_TURNS)
+        self._lang = {"ro": 0, "en": 0}
+
+    # ---------------- transcripts ----------------
+
+    def child(self, text: str) -> None:
+        text = (text or "").strip()
+        if not text:
+            return
+        self.turns.append(("Child", text[:MAX_TURN_CHARS]))
+        self._lang[detect_language(text)] += 1
+
+        for sentence in _SENTENCES.split(text):
+            folded = " ".join(fold(sentence).split())
+            m = _NAME.search(folded)
+            if m and m.group(1) not in _NOT_NAMES:
+                self.name = m.group(1).capitalize()
+            m = _WISH.search(folded)
+            if m:
+                for wish in _WISH_SPLIT.split(_WISH_END.sub("", m.group(1))):
+                    self._wish(wish.strip())
+
+    def _wish(self, wish: str) -> None:
+        if len(wish) >= 3 and wish not in self.wishes:
+            self.wishes.append(wish)
+            del self.wishes[:-MAX_WISHES]
+
+    def santa(self, text: str) -> None:
+        text = (text or "").strip()
+        if text:
+            self.turns.append(("Santa", text[:MAX_TURN_CHARS]))
+
+    @property
+    def language(self):
+        ro, en = self._lang["ro"], self._lang["en"]
+        if not ro and not en:
+            return None
+        return "en" if en > ro else "ro"
+
+    # ---------------- summary ----------------
+
+    def summary(self) -> str:
+        """Short context for a fresh Realtime session, or "" if nothing is known yet."""
+        if not self.turns:
+            return ""
+        parts = [
+            "The call was briefly interrupted by a technical problem and has resumed. "
+            "Continue the same conversation naturally; do not greet the child again "
+            "and do not mention the interruption unless the child does."
+        ]
+        if self.name:
+            parts.append(f"The child's name is {self.name}.")
+        if self.language:
+            parts.append(f"The child speaks {_LANGUAGES[self.language]}.")
+        if self.wishes:
+            parts.append("Wishes mentioned so far: " + "; ".join(self.wishes) + ".")
+        parts.append("Last exchanges:")
+        parts += [f"{who}: {text}" for who, text in self.turns]
+        return "\n".join(parts)[:MAX_SUMMARY_CHARS]
@@ -0,0 +1,158 @@
+"""
+Structured (JSON lines) logging that never blocks the event loop.
+
+The event loop only builds a LogRecord and puts it on a bounded queue; a
+QueueListener thread formats it as JSON and writes stdout. If the queue
+is full the record is dropped and counted instead of waiting.
+
+Every record carries the call correlation IDs from context variables set
+in ws_handler (Vonage call leg uuid + conversation_uuid); asyncio tasks
+inherit them, so lines from any coroutine of a call are tagged.
+
+    from calllog import log
+    log.info("barge_in", dropped_frames=12)
+    log.sampled("frame_late", every=100, lateness_ms=31.5)
+
+    LOG_LEVEL   DEBUG / INFO / WARNING / ERROR (default INFO)
+"""
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+call_id_var = contextvars.ContextVar("call_id", default=None)
+conversation_var = contextvars.ContextVar("conversation_uuid", default=None)
+
+
+# ----------------------------------------------------------
+# Handler / formatter
+# ----------------------------------------------------------
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Skips the default format-in-caller step and never waits on a full queue."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        record.call_id = call_id_var.get()
+        record.conversation_uuid = conversation_var.get()
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            type(self).dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record) -> str:
+        out = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "event": record.getMessage(),
+        }
+        if getattr(record, "call_id", None):
+            out["call_id"] = record.call_id
+        if getattr(record, "conversation_uuid", None):
+            out["conversation_uuid"] = record.conversation_uuid
+        fields = getattr(record, "fields", None)
+        if fields:
+            out.update(fields)
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+# ----------------------------------------------------------
+# Logger facade
+# ----------------------------------------------------------
+
+class CallLogger:
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+        self._sample_counts = {}
+
+    def _log(self, level: int, event: str, fields: dict, exc_info=None) -> None:
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, extra={"fields": fields}, exc_info=exc_info)
+
+    def debug(self, event: str, **fields) -> None:
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields) -> None:
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields) -> None:
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields) -> None:
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event: str, **fields) -> None:
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+    def sampled(self, event: str, every: int, level: int = logging.INFO, **fields) -> None:
+        """Log 1 of every `every` occurrences of `event` (per worker)."""
+        n = self._sample_counts.get(event, 0)
+        self._sample_counts[event] = n + 1
+        if n % every == 0:
+            fields["sample_every"] = every
+            fields["occurrences"] = n + 1
+            self._log(level, event, fields)
+
+
+# ----------------------------------------------------------
+# Setup (one listener thread per process)
+# ----------------------------------------------------------
+
+_listener = None
+
+
+def setup() -> None:
+    global _listener
+    if _listener is not None:
+        return
+
+    q = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(JsonFormatter())
+
+    logger = logging.getLogger("santa")
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    logger.addHandler(_NonBlockingQueueHandler(q))
+
+    _listener = logging.handlers.QueueListener(q, out, respect_handler_level=False)
+    _listener.start()
+
+
+def shutdown(timeout: float = 2.0) -> None:
+    """Flush pending records (listener.stop joins the writer thread)."""
+    global _listener
+    if _listener is None:
+        return
+    deadline = time.monotonic() + timeout
+    while not _listener.queue.empty() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    _listener.stop()
+    _listener = None
+
+
+def dropped() -> int:
+    return _NonBlockingQueueHandler.dropped
+
+
+setup()
+log = CallLogger(logging.getLogger("santa"))
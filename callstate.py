@@ -0,0 +1,116 @@
+"""
+Call lifecycle states and the per-worker registry of live calls.
+
+A call moves through
+
+    CONNECTING -> GREETING -> LISTENING <-> SANTA_SPEAKING
+                                  |               |
+                                  +-> WRAP_UP <---+
+    (any) -> CLOSING -> CLOSED
+
+WRAP_UP is the listening state of a call that is wrapping up: Santa's
+turns still pass through SANTA_SPEAKING and come back to WRAP_UP. A
+wrap-up that starts while Santa speaks takes effect when he is done.
+
+States are small ints so "is the call going away" is one comparison
+(state >= CLOSING). Transitions not listed in TRANSITIONS are refused,
+which keeps late events (a response.created racing a hangup) from
+reviving a closing call.
+
+The registry indexes live sessions by call id, for /calls and for
+closing every call at worker shutdown.
+"""
+
+import asyncio
+import time
+
+
+CONNECTING = 0
+GREETING = 1
+LISTENING = 2
+SANTA_SPEAKING = 3
+WRAP_UP = 4
+CLOSING = 5
+CLOSED = 6
+
+STATE_NAMES = (
+    "connecting",
+    "greeting",
+    "listening",
+    "santa_speaking",
+    "wrap_up",
+    "closing",
+    "closed",
+)
+
+TRANSITIONS = {
+    CONNECTING: (GREETING, CLOSING),
+    GREETING: (LISTENING, SANTA_SPEAKING, WRAP_UP, CLOSING),
+    LISTENING: (SANTA_SPEAKING, WRAP_UP, CLOSING),
+    SANTA_SPEAKING: (LISTENING, WRAP_UP, CLOSING),
+    WRAP_UP: (SANTA_SPEAKING, LISTENING, CLOSING),
+    CLOSING: (CLOSED,),
+    CLOSED: (),
+}
+
+
+class CallRegistry:
+
+    def __init__(self):
+        self._calls = {}  # call_id -> session
+        self._empty = asyncio.Event()
+        self._empty.set()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __iter__(self):
+        return iter(list(self._calls.values()))
+
+    def get(self, call_id: str):
+        return self._calls.get(call_id)
+
+    def add(self, session) -> None:
+        self._calls[session.call_id] = session
+        self._empty.clear()
+
+    def remove(self, session) -> None:
+        if self._calls.get(session.call_id) is session:
+            del self._calls[session.call_id]
+        if not self._calls:
+            self._empty.set()
+
+    def close_all(self, reason: str) -> int:
+        n = 0
+        for session in self:
+            if session.state < CLOSING:
+                session.close(reason)
+                n += 1
+        return n
+
+    async def wait_empty(self, timeout: float = None) -> bool:
+        try:
+            await asyncio.wait_for(self._empty.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def snapshot(self) -> list:
+        now = time.monotonic()
+        return [
+            {
+                "call_id": s.call_id,
+                "state": STATE_NAMES[s.state],
+                "age_s": round(now - s.start_mono, 1),
+                "tokens": s.usage.tokens,
+                "cost_usd": round(s.usage.cost, 4),
+            }
+            for s in self
+        ]
+
+    def stats(self) -> dict:
+        by_state = {}
+        for s in self._calls.values():
+            name = STATE_NAMES[s.state]
+            by_state[name] = by_state.get(name, 0) + 1
+        return {"live": len(self._calls), "by_state": by_state}
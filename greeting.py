@@ -0,0 +1,139 @@
+"""
+Pre-rendered greeting audio.
+
+Every call of a persona starts with the same sentence, so it is rendered
+once by the Realtime model (or loaded from GREETING_DIR), kept in memory
+as ready-to-send 20 ms frames and pushed to Vonage as soon as the call's
+WebSocket is accepted, while the Realtime session is still connecting.
+The file name carries a hash of the voice and text (see personas.py), so
+editing the greeting renders a new one instead of replaying the old.
+"""
+
+import base64
+import json
+import os
+import wave
+
+from calllog import log
+from agc import santa_agc
+from audio_dsp import samples
+from pacer import FRAME_BYTES
+from resampler import OPENAI_RATE, VONAGE_RATE, Resampler
+
+
+GREETING_DIR = os.getenv(
+    "GREETING_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio"),
+)
+
+
+def greeting_path(key: str) -> str:
+    return os.path.join(GREETING_DIR, f"greeting-{key}.wav")
+
+
+def greeting_instructions(text: str, language: str = "Romanian") -> str:
+    return (
+        f"Say ONLY this exact sentence in {language} and nothing else:\n"
+        f"{text}\n"
+        "Then stop speaking and wait silently for the child."
+    )
+
+
+def greeting_item_event(text: str) -> dict:
+    """conversation.item.create telling the model it already said the greeting."""
+    return {
+        "type": "conversation.item.create",
+        "item": {
+            "type": "message",
+            "role": "assistant",
+            "content": [{"type": "text", "text": text}],
+        },
+    }
+
+
+class GreetingCache:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.frames = None  # list[bytes], 640 bytes each, gain applied
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.frames)
+
+    @property
+    def duration(self) -> float:
+        return len(self.frames or ()) * FRAME_BYTES / 2 / VONAGE_RATE
+
+    def _set_pcm(self, pcm: bytes, gain: float) -> None:
+        # același AGC + limitator ca vocea live, pe bucăți de 100 ms
+        agc = santa_agc(gain)
+        buf = bytearray(pcm)
+        s = samples(buf)
+        for i in range(0, len(s), 1600):
+            agc.process_inplace(s[i : i + 1600])
+        del s  # bytearray-ul nu se poate extinde cât are view-uri
+        buf += agc.flush().tobytes()
+        if len(buf) % FRAME_BYTES:
+            buf += bytes(FRAME_BYTES - len(buf) % FRAME_BYTES)
+        self.frames = [bytes(buf[i : i + FRAME_BYTES]) for i in range(0, len(buf), FRAME_BYTES)]
+
+    def load(self, gain: float = 1.0) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with wave.open(self.path, "rb") as w:
+                if (w.getnchannels(), w.getsampwidth(), w.getframerate()) != (1, 2, VONAGE_RATE):
+                    log.warning("greeting_wav_format", path=self.path, expected="mono 16-bit 16 kHz")
+                    return False
+                pcm = w.readframes(w.getnframes())
+        except Exception as e:
+            log.warning("greeting_load_error", path=self.path, error=str(e))
+            return False
+        self._set_pcm(pcm, gain)
+        log.info("greeting_loaded", seconds=round(self.duration, 1), path=self.path)
+        return True
+
+    def save(self, pcm_16k: bytes) -> None:
+        # scriem atomic: mai mulți workeri pot randa în același timp
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with wave.open(tmp, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(VONAGE_RATE)
+            w.writeframes(pcm_16k)
+        os.replace(tmp, self.path)
+
+    async def render(self, connect, create_event: str, gain: float = 1.0) -> bool:
+        """Ask the model for the greeting once (create_event: its response.create), keep and save the audio."""
+        ws = await connect()
+        pcm = bytearray()
+        try:
+            await ws.send(create_event)
+            async for raw in ws:
+                data = json.loads(raw)
+                t = data.get("type")
+                if t == "response.audio.delta":
+                    pcm += base64.b64decode(data["delta"])
+                elif t == "response.done":
+                    break
+                elif t == "error":
+                    log.error("greeting_render_error", event_data=data)
+                    return False
+        finally:
+            try:
+                await ws.close()
+            except Exception:
+                pass
+
+        if not pcm:
+            return False
+
+        pcm_16k = Resampler(OPENAI_RATE, VONAGE_RATE, max_frame=len(pcm) // 2).process(bytes(pcm))
+        try:
+            self.save(pcm_16k)
+        except Exception as e:
+            log.warning("greeting_save_error", path=self.path, error=str(e))
+        self._set_pcm(pcm_16k, gain)
+        log.info("greeting_rendered", seconds=round(self.duration, 1))
+        return True
@@ -0,0 +1,177 @@
+"""
+In-process metrics registry with Prometheus text exposition (/metrics).
+
+Each worker keeps its own numbers; updates are plain attribute writes on
+the event loop thread (no locks, no allocation), and the text format is
+only built when /metrics is scraped. Series carry a `worker` label with
+the pid so scrapes of different gunicorn workers can be told apart.
+"""
+
+import asyncio
+import os
+import time
+from bisect import bisect_left
+
+
+WORKER = str(os.getpid())
+
+_REGISTRY = []
+
+
+# ----------------------------------------------------------
+# Metric types
+# ----------------------------------------------------------
+
+class Counter:
+    __slots__ = ("name", "help", "value")
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+        _REGISTRY.append(self)
+
+    def inc(self, n=1) -> None:
+        self.value += n
+
+    def samples(self):
+        yield self.name, "", self.value
+
+
+class Gauge(Counter):
+    __slots__ = ()
+    kind = "gauge"
+
+    def dec(self, n=1) -> None:
+        self.value -= n
+
+    def set(self, v) -> None:
+        self.value = v
+
+
+class Histogram:
+    __slots__ = ("name", "help", "buckets", "counts", "sum", "count")
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        _REGISTRY.append(self)
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def samples(self):
+        acc = 0
+        for le, c in zip(self.buckets, self.counts):
+            acc += c
+            yield f"{self.name}_bucket", f'le="{le}"', acc
+        yield f"{self.name}_bucket", 'le="+Inf"', self.count
+        yield f"{self.name}_sum", "", self.sum
+        yield f"{self.name}_count", "", self.count
+
+
+def render() -> str:
+    lines = []
+    for m in _REGISTRY:
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        for name, labels, value in m.samples():
+            labels = f'worker="{WORKER}",{labels}' if labels else f'worker="{WORKER}"'
+            lines.append(f"{name}{{{labels}}} {value}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+# ----------------------------------------------------------
+# Santa call metrics
+# ----------------------------------------------------------
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+ACTIVE_CALLS = Gauge("santa_active_calls", "Calls currently connected on /ws")
+CALLS = Counter("santa_calls_total", "Calls accepted on /ws")
+TIME_TO_GREETING = Histogram(
+    "santa_time_to_greeting_seconds",
+    "WebSocket accept to first greeting audio queued",
+    LATENCY_BUCKETS,
+)
+TURN_LATENCY = Histogram(
+    "santa_turn_latency_seconds",
+    "Child speech end (VAD) to first response.audio.delta",
+    LATENCY_BUCKETS,
+)
+BARGE_INS = Counter("santa_barge_ins_total", "Responses cancelled because the child spoke")
+BARGE_IN_REACTION = Histogram(
+    "santa_barge_in_reaction_seconds",
+    "Barge-in detected to response cancellation acknowledged",
+    LATENCY_BUCKETS,
+)
+SILENCE_PROMPTS = Counter("santa_silence_prompts_total", "Silence watcher prompts sent")
+WRAP_UPS = Counter("santa_wrap_ups_total", "Calls that reached the 4 minute wrap-up")
+TIMEOUTS = Counter("santa_call_timeouts_total", "Calls hung up by the 5 minute timer")
+DRAINED_CALLS = Counter("santa_drained_calls_total", "Calls ended early by a worker drain (SIGTERM)")
+FRAMES_IN = Counter("santa_frames_in_total", "Audio frames received from Vonage")
+BYTES_IN = Counter("santa_bytes_in_total", "Audio bytes received from Vonage")
+FRAMES_OUT = Counter("santa_frames_out_total", "Audio frames sent to Vonage")
+BYTES_OUT = Counter("santa_bytes_out_total", "Audio bytes sent to Vonage")
+OPENAI_ERRORS = Counter("santa_openai_errors_total", "Realtime error events and failed connects")
+REALTIME_DISCONNECTS = Counter("santa_realtime_disconnects_total", "Realtime sockets lost in the middle of a call")
+REALTIME_RECONNECTS = Counter("santa_realtime_reconnects_total", "Calls resumed on a new Realtime socket")
+REALTIME_RESUME_FAILURES = Counter(
+    "santa_realtime_resume_failures_total", "Calls hung up because the Realtime socket could not be replaced"
+)
+REALTIME_RECOVERY = Histogram(
+    "santa_realtime_recovery_seconds",
+    "Realtime socket lost to the call resumed on a new one",
+    LATENCY_BUCKETS,
+)
+RESPONSE_CACHE_HITS = Counter("santa_response_cache_hits_total", "Child turns answered from the response cache")
+RESPONSE_CACHE_MISSES = Counter("santa_response_cache_misses_total", "Cacheable child turns sent to the model")
+VONAGE_EVENTS = Counter("santa_vonage_events_total", "Vonage event webhooks processed")
+VONAGE_EVENTS_DROPPED = Counter("santa_vonage_events_dropped_total", "Vonage event webhooks dropped on a full queue")
+VONAGE_CALL_DURATION = Histogram(
+    "santa_vonage_call_duration_seconds",
+    "Call duration reported by Vonage on the completed event",
+    (10, 30, 60, 120, 180, 240, 300, 360, 600),
+)
+REALTIME_INPUT_TOKENS = Counter("santa_realtime_input_tokens_total", "Realtime input tokens billed (response.done usage)")
+REALTIME_OUTPUT_TOKENS = Counter("santa_realtime_output_tokens_total", "Realtime output tokens billed (response.done usage)")
+REALTIME_COST = Counter("santa_realtime_cost_usd_total", "Estimated Realtime cost in USD")
+CALL_COST = Histogram(
+    "santa_call_cost_usd",
+    "Estimated Realtime cost of a call in USD",
+    (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0),
+)
+BUDGET_STOPS = Counter("santa_call_budget_stops_total", "Calls wrapped up early for exceeding a budget")
+LOCAL_TURNS = Counter("santa_local_turns_total", "Child turns committed by the local turn manager")
+RESPONSE_CACHE_SAVED = Counter(
+    "santa_response_cache_saved_seconds_total",
+    "Turn latency saved by cache hits vs the average model turn",
+)
+LOOP_LAG = Histogram(
+    "santa_event_loop_lag_seconds",
+    "How late the event loop wakes a periodic timer",
+    LAG_BUCKETS,
+)
+
+
+def frame_out(nbytes: int) -> None:
+    FRAMES_OUT.value += 1
+    BYTES_OUT.value += nbytes
+
+
+async def loop_lag_monitor(interval: float = 0.25) -> None:
+    clock = time.monotonic
+    while True:
+        t0 = clock()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, clock() - t0 - interval))
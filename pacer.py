@@ -0,0 +1,187 @@
+"""
+Outbound jitter buffer + 20 ms frame pacer (OpenAI -> Vonage).
+
+Realtime deltas arrive in bursts of arbitrary size. The pacer re-chunks
+them into exact 640-byte frames (20 ms of l16 @ 16 kHz) and sends one
+frame per tick on the monotonic clock. flush() drops everything queued,
+so audio from a cancelled response never reaches the phone.
+
+With a mixer (see ambience.py) the pacer never idles: every tick sends
+mixer.mix(voice_frame_or_None), so comfort audio fills the silences.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from calllog import log
+
+
+FRAME_MS = 20
+FRAME_BYTES = 640  # 20 ms @ 16 kHz, 16-bit mono
+FRAME_SECONDS = FRAME_MS / 1000
+
+
+class OutboundPacer:
+
+    def __init__(self, send, prebuffer_frames: int = 2, late_ms: float = 10.0,
+                 mixer=None, max_queue_frames: int = 1500, on_sent=None, tap=None):
+        # send: async callable(bytes), e.g. vonage_ws.send_bytes
+        self._send = send
+        # on_sent: callable(nbytes) after each frame, e.g. metrics.frame_out
+        self._on_sent = on_sent
+        # tap: callable(frame) with each frame sent, e.g. CallRecording.santa
+        self._tap = tap
+        self.mixer = mixer
+        self._playing = False
+        # coadă limitată (implicit 30 s): la depășire se aruncă cel mai vechi cadru
+        self._frames = deque(maxlen=max_queue_frames)
+        self._partial = bytearray()
+        self._ready = asyncio.Event()
+        self.prebuffer_frames = prebuffer_frames
+        self.late_seconds = late_ms / 1000
+        self.closed = False
+
+        # contoare pentru latență de redare
+        self.frames_sent = 0
+        self.comfort_frames = 0
+        self.frames_late = 0
+        self.frames_dropped = 0
+        self.frames_overflow = 0
+        self.max_queue_depth = 0
+        self.max_lateness = 0.0
+
+    # ---------------- producer side ----------------
+
+    def push(self, pcm) -> None:
+        """Queue PCM16 @ 16 kHz of any length; complete frames become playable."""
+        if self.closed:
+            return
+        # memoryview: acceptă bytes, bytearray sau ndarray int16 fără conversie
+        self._partial += memoryview(pcm).cast("B")
+        n = len(self._partial) - len(self._partial) % FRAME_BYTES
+        if not n:
+            return
+        frames = self._frames
+        mv = memoryview(self._partial)
+        for off in range(0, n, FRAME_BYTES):
+            if len(frames) == frames.maxlen:
+                self.frames_overflow += 1
+            frames.append(bytes(mv[off : off + FRAME_BYTES]))
+        mv.release()
+        if len(frames) > self.max_queue_depth:
+            self.max_queue_depth = len(frames)
+        del self._partial[:n]
+        self._ready.set()
+
+    def set_mixer(self, mixer) -> None:
+        """Swap the comfort mixer; None lets the pacer idle between bursts again."""
+        self.mixer = mixer
+        self._ready.set()
+
+    def end_of_audio(self) -> None:
+        """Pad the trailing partial frame with silence so it gets played too."""
+        if self._partial:
+            self._partial += bytes(FRAME_BYTES - len(self._partial))
+            self.push(b"")
+
+    def flush(self) -> int:
+        """Barge-in: drop all queued audio immediately. Returns frames dropped."""
+        dropped = len(self._frames) + (1 if self._partial else 0)
+        self._frames.clear()
+        self._partial.clear()
+        self._playing = False
+        self.frames_dropped += dropped
+        return dropped
+
+    def close(self) -> None:
+        self.closed = True
+        self.flush()
+        self._ready.set()
+
+    # ---------------- stats ----------------
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._frames)
+
+    @property
+    def queued_ms(self) -> int:
+        return len(self._frames) * FRAME_MS
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "queued_ms": self.queued_ms,
+            "frames_sent": self.frames_sent,
+            "comfort_frames": self.comfort_frames,
+            "frames_late": self.frames_late,
+            "frames_dropped": self.frames_dropped,
+            "frames_overflow": self.frames_overflow,
+            "max_queue_depth": self.max_queue_depth,
+            "max_lateness_ms": round(self.max_lateness * 1000, 1),
+        }
+
+    # ---------------- consumer loop ----------------
+
+    def _next_voice(self, held: int):
+        """Pop the next voice frame, holding back until the prebuffer fills."""
+        if not self._frames:
+            self._playing = False
+            return None, 0
+        if (self._playing or len(self._frames) >= self.prebuffer_frames
+                or held >= self.prebuffer_frames):
+            self._playing = True
+            return self._frames.popleft(), 0
+        return None, held + 1
+
+    async def run(self) -> None:
+        clock = time.monotonic
+        deadline = None
+        held = 0  # ticks spent waiting for the jitter prebuffer
+
+        try:
+            while not self.closed:
+                if not self._frames and self.mixer is None:
+                    # idle: clock restarts with the next burst
+                    deadline = None
+                    self._playing = False
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+
+                now = clock()
+                if deadline is None:
+                    deadline = now
+
+                lateness = now - deadline
+                if lateness > self.late_seconds:
+                    self.frames_late += 1
+                    if lateness > self.max_lateness:
+                        self.max_lateness = lateness
+                    if lateness > FRAME_SECONDS:
+                        # prea în urmă: resincronizăm în loc să trimitem în rafală
+                        deadline = now
+
+                voice, held = self._next_voice(held)
+                frame = voice if self.mixer is None else self.mixer.mix(voice)
+                if frame is not None:
+                    await self._send(frame)
+                    self.frames_sent += 1
+                    if self._on_sent is not None:
+                        self._on_sent(len(frame))
+                    if self._tap is not None:
+                        self._tap(frame)
+                    if voice is None:
+                        self.comfort_frames += 1
+
+                deadline += FRAME_SECONDS
+                delay = deadline - clock()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+        except Exception as e:
+            log.warning("pacer_error", error=str(e))
+
+        finally:
+            self.closed = True
@@ -0,0 +1,233 @@
+"""
+Persona registry: Santa's prompts and Realtime session settings.
+
+prompts/personas.json lists the personas (prompt file, voice, modalities,
+turn detection, greeting, silence / wrap-up / goodbye instructions), the
+default one and which dialed numbers get which persona. On load every
+persona is compiled into ready-to-send JSON strings (session.update, the
+greeting conversation item and four response.create events: greeting,
+silence, wrap-up, goodbye), so a call only picks strings and never
+serializes the multi-KB prompt. A response's instructions replace the
+session's for that response, so the three prompts carry the persona
+prompt with their own instruction appended.
+
+The answer webhook picks the persona by the dialed number ("to") and
+passes its name on the /ws URI. Each worker checks the mtimes of the
+file and of its prompt files every PERSONAS_RELOAD_SECONDS and reloads
+in place: new calls get the new personas, calls in progress keep the one
+they started with. A broken file is logged and the previous personas stay.
+
+    PERSONAS_FILE             default prompts/personas.json
+    PERSONAS_RELOAD_SECONDS   how often to check for changes (default 5, 0 = never)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+
+from calllog import log
+from greeting import GreetingCache, greeting_instructions, greeting_item_event, greeting_path
+
+
+PERSONAS_FILE = os.getenv(
+    "PERSONAS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts", "personas.json"),
+)
+PERSONAS_RELOAD_SECONDS = float(os.getenv("PERSONAS_RELOAD_SECONDS", "5"))
+
+# formatul audio e fixat de bridge, nu de persona
+AUDIO_FORMATS = {"input_audio_format": "pcm16", "output_audio_format": "pcm16"}
+
+_REQUIRED = ("voice", "modalities", "greeting", "silence", "wrap_up", "goodbye")
+_DIGITS = re.compile(r"\D+")
+
+
+def normalize_number(number) -> str:
+    return _DIGITS.sub("", str(number or ""))
+
+
+def _response_create(modalities, instructions: str) -> str:
+    return json.dumps({
+        "type": "response.create",
+        "response": {"modalities": modalities, "instructions": instructions},
+    })
+
+
+class Persona:
+    """One compiled persona. Immutable once built; a reload builds new ones."""
+
+    __slots__ = (
+        "name", "voice", "greeting_text", "session_key", "session_update",
+        "greeting_create", "greeting_item", "silence_prompt", "wrap_up_prompt",
+        "goodbye_prompt", "greeting",
+    )
+
+    def __init__(self, name: str, spec: dict, prompt: str, transcribe: bool, create_response: bool,
+                 local_turns: bool = False):
+        self.name = name
+        self.voice = spec["voice"]
+        self.greeting_text = spec["greeting"]
+
+        # turn-uri detectate local: serverul nu mai segmentează (commit explicit)
+        turn_detection = None if local_turns else spec.get("turn_detection")
+        if turn_detection and not create_response:
+            turn_detection = dict(turn_detection, create_response=False)
+        config = {
+            "instructions": prompt,
+            "modalities": spec["modalities"],
+            "voice": self.voice,
+            **AUDIO_FORMATS,
+            "turn_detection": turn_detection,
+        }
+        if transcribe:
+            config["input_audio_transcription"] = {"model": "whisper-1"}
+
+        self.session_update = json.dumps({"type": "session.update", "session": config})
+        # identifică configurația trimisă pe un socket (pool, reload)
+        self.session_key = hashlib.sha1(self.session_update.encode()).hexdigest()[:12]
+
+        instructions = greeting_instructions(self.greeting_text, spec.get("greeting_language", "Romanian"))
+        self.greeting_create = _response_create(spec["modalities"], instructions)
+        self.greeting_item = json.dumps(greeting_item_event(self.greeting_text))
+        self.silence_prompt = _response_create(spec["modalities"], f"{prompt}\n\n{spec['silence']}")
+        self.wrap_up_prompt = _response_create(spec["modalities"], f"{prompt}\n\n{spec['wrap_up']}")
+        self.goodbye_prompt = _response_create(spec["modalities"], f"{prompt}\n\n{spec['goodbye']}")
+
+        # salutul redat depinde doar de voce + text; cache-ul e atribuit de registru
+        key = hashlib.sha1(f"{self.voice}\n{instructions}".encode()).hexdigest()[:12]
+        self.greeting = greeting_path(key)
+
+
+class PersonaRegistry:
+
+    def __init__(self, path: str = PERSONAS_FILE, transcribe: bool = False, create_response: bool = True,
+                 local_turns: bool = False):
+        self.path = path
+        self.transcribe = transcribe
+        self.create_response = create_response
+        self.local_turns = local_turns
+        self._personas = {}
+        self._numbers = {}
+        self._default = None
+        self._greetings = {}  # path -> GreetingCache, comun personas cu același salut
+        self._files = [path]  # fișierul de config + prompturile lui
+        self._stamp = None
+        self._task = None
+
+        self.loaded_at = None
+        self.reloads = 0
+        self.errors = 0
+
+        self.load()
+
+    # ---------------- lookup ----------------
+
+    @property
+    def default(self) -> Persona:
+        return self._personas[self._default]
+
+    def get(self, name) -> Persona:
+        return self._personas.get(name) or self.default
+
+    def for_number(self, number) -> Persona:
+        name = self._numbers.get(normalize_number(number))
+        return self._personas[name] if name else self.default
+
+    def __iter__(self):
+        return iter(list(self._personas.values()))
+
+    # ---------------- load / reload ----------------
+
+    def load(self) -> None:
+        """Compile the file; raises on errors (the current personas are untouched)."""
+        with open(self.path, encoding="utf-8") as f:
+            cfg = json.load(f)
+
+        base = os.path.dirname(self.path)
+        files = [self.path]
+        defaults = cfg.get("defaults", {})
+        personas = {}
+        greetings = {}
+        for name, own in cfg["personas"].items():
+            spec = {**defaults, **own}
+            missing = [k for k in _REQUIRED if k not in spec]
+            if missing:
+                raise ValueError(f"persona {name}: missing {', '.join(missing)}")
+            if "prompt_file" in spec:
+                files.append(os.path.join(base, spec["prompt_file"]))
+                with open(files[-1], encoding="utf-8") as f:
+                    prompt = f.read().strip()
+            else:
+                prompt = spec["prompt"].strip()
+            persona = Persona(name, spec, prompt, self.transcribe, self.create_response, self.local_turns)
+            # același salut → același audio, deja încărcat dacă exista înainte de reload
+            path = persona.greeting
+            if path not in greetings:
+                greetings[path] = self._greetings.get(path) or GreetingCache(path)
+            persona.greeting = greetings[path]
+            personas[name] = persona
+
+        default = cfg.get("default") or next(iter(personas))
+        if default not in personas:
+            raise ValueError(f"default persona {default!r} is not defined")
+        numbers = {}
+        for number, name in cfg.get("numbers", {}).items():
+            if name not in personas:
+                raise ValueError(f"number {number}: unknown persona {name!r}")
+            numbers[normalize_number(number)] = name
+
+        self._personas, self._numbers, self._default = personas, numbers, default
+        self._greetings = greetings
+        self._files = files
+        self._stamp = self._file_stamp()
+        self.loaded_at = time.time()
+
+    def _file_stamp(self) -> tuple:
+        stamp = []
+        for path in self._files:
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def reload_if_changed(self) -> bool:
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return False
+        try:
+            self.load()
+        except Exception as e:
+            self.errors += 1
+            self._stamp = stamp  # nu reîncercăm aceleași fișiere stricate
+            log.warning("personas_reload_failed", path=self.path, error=str(e))
+            return False
+        self.reloads += 1
+        log.info("personas_reloaded", personas=list(self._personas), default=self._default)
+        return True
+
+    async def watch(self, on_reload=None, interval: float = PERSONAS_RELOAD_SECONDS) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            if self.reload_if_changed() and on_reload is not None:
+                on_reload()
+
+    def start(self, on_reload=None) -> None:
+        if PERSONAS_RELOAD_SECONDS > 0 and self._task is None:
+            self._task = asyncio.create_task(self.watch(on_reload))
+
+    def stats(self) -> dict:
+        return {
+            "default": self._default,
+            "personas": {
+                p.name: {"session": p.session_key, "greeting_ready": p.greeting.ready}
+                for p in self
+            },
+            "numbers": len(self._numbers),
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "errors": self.errors,
+        }
@@ -0,0 +1,257 @@
+"""
+Fast encoding / decoding of OpenAI Realtime events for the audio hot path.
+
+- input_audio_buffer.append is built from a pre-serialized template:
+  one base64 pass and one string concat, no dict, no json.dumps.
+- response.audio.delta is recognized by scanning the raw text for the
+  "type" / "response_id" / "delta" fields; the (large) payload is never
+  parsed as JSON. Every other event goes through the regular parser.
+- orjson is used for the non-audio events when installed.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+from collections import deque
+
+from calllog import log
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+# ----------------------------------------------------------
+# JSON (orjson when available)
+# ----------------------------------------------------------
+
+if orjson is not None:
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    loads = orjson.loads
+else:
+    def dumps(obj) -> str:
+        return json.dumps(obj)
+
+    loads = json.loads
+
+
+# ----------------------------------------------------------
+# Encoding
+# ----------------------------------------------------------
+
+_APPEND_HEAD = '{"type":"input_audio_buffer.append","audio":"'
+_APPEND_TAIL = '"}'
+
+# mesaje fixe, serializate o singură dată
+RESPONSE_CANCEL = dumps({"type": "response.cancel"})
+RESPONSE_CREATE = dumps({"type": "response.create", "response": {"modalities": ["audio", "text"]}})
+INPUT_COMMIT = dumps({"type": "input_audio_buffer.commit"})
+
+
+def encode_append(pcm) -> str:
+    """input_audio_buffer.append for raw PCM16 (bytes-like)."""
+    # base64 is JSON-safe, no escaping needed
+    return _APPEND_HEAD + base64.b64encode(pcm).decode("ascii") + _APPEND_TAIL
+
+
+# ----------------------------------------------------------
+# Decoding
+# ----------------------------------------------------------
+
+AUDIO_DELTA = "response.audio.delta"
+
+_TYPE_KEY = '"type":"'
+_DELTA_KEY = '"delta":"'
+_RID_KEY = '"response_id":"'
+
+
+def _field(raw: str, key: str):
+    i = raw.find(key)
+    if i < 0:
+        return None
+    i += len(key)
+    j = raw.find('"', i)
+    if j < 0:
+        return None
+    return raw[i:j]
+
+
+class Event:
+    """Decoded event: audio deltas keep only what the hot path needs."""
+
+    __slots__ = ("type", "audio", "response_id", "data")
+
+    def __init__(self, type, audio=None, response_id=None, data=None):
+        self.type = type
+        self.audio = audio
+        self.response_id = response_id
+        self.data = data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default) if self.data is not None else default
+
+
+def decode_event(raw) -> Event:
+    """Parse one Realtime server event. Raises ValueError on malformed JSON."""
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode()
+
+    t = _field(raw, _TYPE_KEY)
+    if t == AUDIO_DELTA:
+        rid = _field(raw, _RID_KEY)
+        delta = _field(raw, _DELTA_KEY)
+        if delta is not None:
+            return Event(t, audio=binascii.a2b_base64(delta), response_id=rid)
+
+    data = loads(raw)
+    t = data.get("type")
+    if t == AUDIO_DELTA:
+        return Event(t, audio=base64.b64decode(data.get("delta", "")),
+                     response_id=data.get("response_id"), data=data)
+    return Event(t, response_id=data.get("response_id"), data=data)
+
+
+# ----------------------------------------------------------
+# Writer task (Vonage -> OpenAI leg)
+# ----------------------------------------------------------
+
+class RealtimeWriter:
+    """
+    The only task that sends on the Realtime socket. Readers never await
+    it: they push audio or control events and return immediately.
+
+    - control events (response.create / cancel, input_text...) go first,
+      in order, from a bounded queue;
+    - events queued with send_after_audio (input_audio_buffer.commit and
+      the response.create of that turn) go right after the audio pushed
+      before them;
+    - audio frames are coalesced: whatever accumulated while the previous
+      send was blocked goes out as one input_audio_buffer.append;
+    - past `max_audio_bytes` of pending audio the oldest is dropped, so a
+      congested socket costs a gap, not seconds of extra lag;
+    - a failed send detaches the writer instead of ending it: events keep
+      queueing (audio within the same cap) until attach() gives it the
+      socket that replaced the dropped one.
+    """
+
+    def __init__(self, send, max_audio_bytes: int = 48000, max_control: int = 64):
+        # send: async callable(str), e.g. openai_ws.send
+        self._send = send
+        self.max_audio_bytes = max_audio_bytes  # 1 s @ 24 kHz
+        self._audio = bytearray()
+        self._control = deque(maxlen=max_control)
+        self._after_audio = deque(maxlen=max_control)
+        self._ready = asyncio.Event()
+        self.closed = False
+
+        self.frames_in = 0
+        self.appends_sent = 0
+        self.bytes_sent = 0
+        self.bytes_dropped = 0
+        self.max_audio_pending = 0
+        self.control_sent = 0
+        self.control_dropped = 0
+        self.send_errors = 0
+
+    @property
+    def attached(self) -> bool:
+        return self._send is not None
+
+    def attach(self, send) -> None:
+        """Resume sending on a new socket (after a Realtime reconnect)."""
+        self._send = send
+        self._ready.set()
+
+    def detach(self) -> None:
+        self._send = None
+
+    def push_audio(self, pcm) -> None:
+        if self.closed:
+            return
+        self._audio += pcm
+        self.frames_in += 1
+        overflow = len(self._audio) - self.max_audio_bytes
+        if overflow > 0:
+            # prea mult în urmă: păstrăm audio cel mai recent
+            overflow += overflow & 1
+            del self._audio[:overflow]
+            self.bytes_dropped += overflow
+        if len(self._audio) > self.max_audio_pending:
+            self.max_audio_pending = len(self._audio)
+        self._ready.set()
+
+    def send(self, message: str) -> None:
+        """Queue a control event (already serialized)."""
+        if self.closed:
+            return
+        if len(self._control) == self._control.maxlen:
+            self.control_dropped += 1
+        self._control.append(message)
+        self._ready.set()
+
+    def send_after_audio(self, message: str) -> None:
+        """Queue an event that must follow the audio pushed so far (e.g. a commit)."""
+        if self.closed:
+            return
+        if len(self._after_audio) == self._after_audio.maxlen:
+            self.control_dropped += 1
+        self._after_audio.append(message)
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    def stats(self) -> dict:
+        return {
+            "frames_in": self.frames_in,
+            "appends_sent": self.appends_sent,
+            "coalesced_frames": max(0, self.frames_in - self.appends_sent),
+            "bytes_sent": self.bytes_sent,
+            "bytes_dropped": self.bytes_dropped,
+            "audio_pending_bytes": len(self._audio),
+            "max_audio_pending_bytes": self.max_audio_pending,
+            "control_depth": len(self._control) + len(self._after_audio),
+            "control_sent": self.control_sent,
+            "control_dropped": self.control_dropped,
+            "send_errors": self.send_errors,
+        }
+
+    async def run(self) -> None:
+        try:
+            while not self.closed:
+                send = self._send
+                if send is None or (not self._control and not self._audio and not self._after_audio):
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+
+                try:
+                    while self._control and not self.closed:
+                        await send(self._control[0])
+                        self._control.popleft()
+                        self.control_sent += 1
+
+                    if self._audio and not self.closed:
+                        pcm = bytes(self._audio)
+                        self._audio.clear()
+                        await send(encode_append(pcm))
+                        self.appends_sent += 1
+                        self.bytes_sent += len(pcm)
+
+                    while self._after_audio and not self.closed:
+                        await send(self._after_audio[0])
+                        self._after_audio.popleft()
+                        self.control_sent += 1
+                except Exception as e:
+                    # socket căzut: așteptăm attach() cu unul nou (sau close())
+                    self.send_errors += 1
+                    log.warning("realtime_writer_error", error=str(e))
+                    if self._send is send:
+                        self._send = None
+        finally:
+            self.closed = True
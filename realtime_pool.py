@@ -0,0 +1,137 @@
+"""
+Pool of pre-warmed OpenAI Realtime sockets.
+
+Each pooled socket has already done the TLS + WebSocket handshake and the
+session.update (prompt, voice, formats), so a new call only has to send the
+greeting response.create. Sockets are replaced in the background after
+each acquire and evicted before the server would time them out.
+
+    REALTIME_POOL_SIZE       warm sockets kept per worker (0 disables)
+    REALTIME_POOL_MAX_AGE    seconds a socket may sit idle in the pool
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+
+from calllog import log
+
+
+REALTIME_POOL_SIZE = int(os.getenv("REALTIME_POOL_SIZE", "2"))
+REALTIME_POOL_MAX_AGE = float(os.getenv("REALTIME_POOL_MAX_AGE", "600"))
+
+
+def _is_open(ws) -> bool:
+    return getattr(ws, "open", True)
+
+
+async def _close_quietly(ws) -> None:
+    try:
+        await ws.close()
+    except Exception:
+        pass
+
+
+class RealtimePool:
+
+    def __init__(self, connect, size: int = REALTIME_POOL_SIZE,
+                 max_age: float = REALTIME_POOL_MAX_AGE, retry_delay: float = 5.0):
+        # connect: coroutine function returning a configured Realtime socket
+        self._connect = connect
+        self.size = size
+        self.max_age = max_age
+        self.retry_delay = retry_delay
+        self._idle = deque()  # (ws, warmed_at)
+        self._wake = asyncio.Event()
+        self._task = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.connect_errors = 0
+
+    # ---------------- lifecycle ----------------
+
+    def start(self) -> None:
+        if self.size > 0 and self._task is None:
+            self._task = asyncio.create_task(self._maintain())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._idle:
+            ws, _ = self._idle.popleft()
+            await _close_quietly(ws)
+
+    # ---------------- acquire ----------------
+
+    async def acquire(self):
+        """Return (ws, from_pool). Falls back to a fresh connect on a miss."""
+        now = time.monotonic()
+        while self._idle:
+            ws, warmed_at = self._idle.popleft()
+            if _is_open(ws) and now - warmed_at < self.max_age:
+                self.hits += 1
+                self._wake.set()
+                return ws, True
+            self.evicted += 1
+            asyncio.create_task(_close_quietly(ws))
+
+        self.misses += 1
+        self._wake.set()
+        return await self._connect(), False
+
+    # ---------------- background refill / eviction ----------------
+
+    def _evict_stale(self) -> None:
+        now = time.monotonic()
+        keep = deque()
+        for ws, warmed_at in self._idle:
+            if _is_open(ws) and now - warmed_at < self.max_age:
+                keep.append((ws, warmed_at))
+            else:
+                self.evicted += 1
+                asyncio.create_task(_close_quietly(ws))
+        self._idle = keep
+
+    async def _maintain(self) -> None:
+        while True:
+            self._evict_stale()
+
+            while len(self._idle) < self.size:
+                try:
+                    ws = await self._connect()
+                except Exception as e:
+                    self.connect_errors += 1
+                    log.warning("realtime_pool_connect_failed", error=str(e))
+                    await asyncio.sleep(self.retry_delay)
+                    break
+                self._idle.append((ws, time.monotonic()))
+
+            # verificăm din nou când expiră cel mai vechi socket sau la acquire
+            if self._idle:
+                oldest = self._idle[0][1]
+                timeout = max(1.0, oldest + self.max_age - time.monotonic())
+            else:
+                timeout = self.retry_delay
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "connect_errors": self.connect_errors,
+        }
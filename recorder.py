@@ -0,0 +1,307 @@
+"""
+Optional per-call recording: a stereo WAV (left = child as received from
+Vonage, right = what was sent to the phone, Santa + ambience) and a JSONL
+of transcripts and call events next to it.
+
+The event loop only enqueues (recording, kind, monotonic time, payload)
+tuples; frames are passed as memoryviews of immutable bytes, never
+copied. One writer thread per worker places each frame into the call's
+preallocated stereo buffer at its arrival time, writes whole blocks to
+disk and closes the files when the call ends. A full queue drops the
+item and counts it instead of blocking the call.
+
+Files go to RECORD_DIR/<day>/<time>_<call_id>.{wav,jsonl}. The writer
+thread deletes recordings older than RECORD_RETENTION_HOURS and the
+oldest ones while the directory is above RECORD_MAX_GB.
+
+    RECORD_CALLS            1 enables recording (default off)
+    RECORD_DIR              output directory (default recordings)
+    RECORD_RETENTION_HOURS  age limit (default 72)
+    RECORD_MAX_GB           total size limit (default 5)
+"""
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+import wave
+
+import numpy as np
+
+from calllog import conversation_var, log
+from resampler import VONAGE_RATE
+
+
+RECORD_CALLS = os.getenv("RECORD_CALLS", "0") == "1"
+RECORD_DIR = os.getenv("RECORD_DIR", "recordings")
+RECORD_RETENTION_HOURS = float(os.getenv("RECORD_RETENTION_HOURS", "72"))
+RECORD_MAX_GB = float(os.getenv("RECORD_MAX_GB", "5"))
+RECORD_QUEUE_SIZE = int(os.getenv("RECORD_QUEUE_SIZE", "20000"))
+
+CHILD = 0
+SANTA = 1
+_EVENT = 2
+_CLOSE = 3
+
+BUFFER_SECONDS = 4     # buffer stereo per apel
+BLOCK_SECONDS = 1      # cât scriem pe disc o dată
+LAG_SECONDS = 1        # un canal rămas în urmă atât e considerat tăcere
+JITTER_SECONDS = 0.06  # sosiri mai devreme/târziu de atât nu lasă goluri
+
+SWEEP_SECONDS = 600
+
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+
+class CallRecording:
+    """Enqueue side, used on the event loop. File state belongs to the writer thread."""
+
+    __slots__ = (
+        "call_id", "t0", "_put", "closing",
+        "path", "_wav", "_jsonl", "_buf", "_base", "_pos",
+    )
+
+    def __init__(self, call_id: str, path: str, put):
+        self.call_id = call_id
+        self.t0 = time.monotonic()
+        self._put = put
+        self.closing = False
+
+        # starea de mai jos e folosită doar de firul de scriere
+        self.path = path
+        self._wav = None
+        self._jsonl = None
+        self._buf = None
+        self._base = 0       # primul eșantion din buffer (nescris încă pe disc)
+        self._pos = [0, 0]   # următorul eșantion pe fiecare canal
+
+    # ---------------- event loop side ----------------
+
+    def child(self, frame) -> None:
+        if not self.closing:
+            self._put((self, CHILD, time.monotonic(), memoryview(frame)))
+
+    def santa(self, frame) -> None:
+        if not self.closing:
+            self._put((self, SANTA, time.monotonic(), memoryview(frame)))
+
+    def event(self, name: str, **fields) -> None:
+        if not self.closing:
+            fields["event"] = name
+            self._put((self, _EVENT, time.monotonic(), fields))
+
+    def close(self, reason: str) -> None:
+        if not self.closing:
+            self.event("call_closed", reason=reason)
+            self.closing = True
+            self._put((self, _CLOSE, time.monotonic(), None))
+
+
+class Recorder:
+
+    def __init__(self, root: str = RECORD_DIR, retention_hours: float = RECORD_RETENTION_HOURS,
+                 max_gb: float = RECORD_MAX_GB, queue_size: int = RECORD_QUEUE_SIZE):
+        self.root = root
+        self.retention = retention_hours * 3600
+        self.max_bytes = int(max_gb * 1024 ** 3)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._open = set()  # doar în firul de scriere
+
+        self.recordings = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.errors = 0
+        self.deleted = 0
+
+    # ---------------- lifecycle ----------------
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Finish every open recording (header + last block) and join the thread."""
+        if self._thread is None:
+            return
+        self._queue.put((None, None, None, None))
+        self._thread.join(timeout)
+        self._thread = None
+
+    # ---------------- event loop side ----------------
+
+    def open(self, call_id: str):
+        if self._thread is None:
+            return None
+        now = time.localtime()
+        name = f"{time.strftime('%H%M%S', now)}_{_UNSAFE.sub('_', call_id)[:80]}"
+        path = os.path.join(self.root, time.strftime("%Y-%m-%d", now), name)
+        rec = CallRecording(call_id, path, self._put)
+        self.recordings += 1
+        rec.event("call_started", call_id=call_id, conversation_uuid=conversation_var.get(),
+                  started=time.time(), rate=VONAGE_RATE, channels=["child", "santa"])
+        return rec
+
+    def _put(self, item) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "recordings": self.recordings,
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+            "mb_written": round(self.bytes_written / 1024 / 1024, 1),
+            "errors": self.errors,
+            "deleted": self.deleted,
+        }
+
+    # ---------------- writer thread ----------------
+
+    def _run(self) -> None:
+        self._sweep()
+        next_sweep = time.monotonic() + SWEEP_SECONDS
+        while True:
+            try:
+                rec, kind, t, payload = self._queue.get(timeout=SWEEP_SECONDS)
+            except queue.Empty:
+                rec = kind = None
+            else:
+                if rec is None:
+                    break
+                try:
+                    self._handle(rec, kind, t, payload)
+                except Exception as e:
+                    self.errors += 1
+                    log.warning("recording_error", call_id=rec.call_id, error=str(e))
+                    self._finish(rec)
+            if time.monotonic() >= next_sweep:
+                self._sweep()
+                next_sweep = time.monotonic() + SWEEP_SECONDS
+
+        for rec in list(self._open):
+            self._finish(rec)
+
+    def _handle(self, rec: CallRecording, kind: int, t: float, payload) -> None:
+        if rec._wav is None:
+            if kind == _CLOSE or rec.path is None:
+                return
+            self._begin(rec)
+
+        if kind == CHILD or kind == SANTA:
+            self._place(rec, kind, t, payload)
+        elif kind == _EVENT:
+            payload["t"] = round(t - rec.t0, 3)
+            rec._jsonl.write(json.dumps(payload, ensure_ascii=False, default=str) + "\n")
+        else:
+            self._finish(rec)
+
+    def _begin(self, rec: CallRecording) -> None:
+        os.makedirs(os.path.dirname(rec.path), exist_ok=True)
+        wav = wave.open(rec.path + ".wav", "wb")
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(VONAGE_RATE)
+        rec._wav = wav
+        rec._jsonl = open(rec.path + ".jsonl", "w", encoding="utf-8")
+        rec._buf = np.zeros((BUFFER_SECONDS * VONAGE_RATE, 2), dtype=np.int16)
+        self._open.add(rec)
+
+    def _place(self, rec: CallRecording, ch: int, t: float, frame) -> None:
+        pcm = np.frombuffer(frame, dtype=np.int16)
+        n = len(pcm)
+        # poziția din ora sosirii; jitter-ul mic nu lasă goluri între cadre
+        start = int((t - rec.t0) * VONAGE_RATE) - n
+        if start <= rec._pos[ch] + JITTER_SECONDS * VONAGE_RATE:
+            start = rec._pos[ch]
+        rec._pos[ch] = start + n
+
+        buf = rec._buf
+        cap = len(buf)
+        if start + n - rec._base > cap:
+            self._flush(rec, start + n - cap)
+        if start < rec._base:
+            # partea deja scrisă pe disc se pierde (canal întârziat peste LAG)
+            pcm = pcm[rec._base - start:]
+            start = rec._base
+        off = start - rec._base
+        buf[off : off + len(pcm), ch] = pcm
+
+        # scriem blocuri întregi, cât timp ambele canale (sau unul, dacă celălalt tace) le-au acoperit
+        ready = max(min(rec._pos), max(rec._pos) - LAG_SECONDS * VONAGE_RATE)
+        if ready - rec._base >= BLOCK_SECONDS * VONAGE_RATE:
+            self._flush(rec, ready)
+
+    def _flush(self, rec: CallRecording, upto: int) -> None:
+        buf = rec._buf
+        cap = len(buf)
+        while rec._base < upto:
+            k = min(upto - rec._base, cap)
+            rec._wav.writeframesraw(buf[:k])
+            self.bytes_written += k * 4
+            buf[: cap - k] = buf[k:]
+            buf[cap - k :] = 0
+            rec._base += k
+
+    def _finish(self, rec: CallRecording) -> None:
+        self._open.discard(rec)
+        try:
+            if rec._wav is not None:
+                self._flush(rec, max(rec._pos))
+                rec._wav.close()
+            if rec._jsonl is not None:
+                rec._jsonl.close()
+        except Exception as e:
+            self.errors += 1
+            log.warning("recording_close_failed", call_id=rec.call_id, error=str(e))
+        # cadrele care mai sosesc pentru apelul ăsta sunt ignorate
+        rec._wav = rec._jsonl = rec._buf = None
+        rec.path = None
+
+    # ---------------- retention ----------------
+
+    def _sweep(self) -> None:
+        busy = {rec.path for rec in self._open}
+        files = []
+        for day in _listdir(self.root):
+            d = os.path.join(self.root, day)
+            for name in _listdir(d):
+                p = os.path.join(d, name)
+                if os.path.splitext(p)[0] in busy:
+                    continue
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, p))
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        cutoff = time.time() - self.retention
+        for mtime, size, p in files:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(p)
+                self.deleted += 1
+            except OSError:
+                pass
+            total -= size
+
+        for day in _listdir(self.root):
+            try:
+                os.rmdir(os.path.join(self.root, day))  # doar dacă e gol
+            except OSError:
+                pass
+
+
+def _listdir(path: str) -> list:
+    try:
+        return sorted(os.listdir(path))
+    except OSError:
+        return []
@@ -0,0 +1,126 @@
+"""
+Streaming polyphase resampler for PCM16 mono.
+
+Vonage speaks l16 @ 16 kHz, the Realtime API pcm16 @ 24 kHz, so each call
+keeps one Resampler per direction (3/2 inbound, 2/3 outbound). Filter
+history and output phase carry over between frames, so chunk boundaries
+are seamless: feeding a signal in pieces gives the same output as feeding
+it all at once.
+"""
+
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from audio_dsp import INT16_MAX, INT16_MIN, PCM16, samples
+
+
+VONAGE_RATE = 16000
+OPENAI_RATE = 24000
+
+
+def design_lowpass(up: int, down: int, taps_per_phase: int, beta: float = 8.0) -> np.ndarray:
+    """Kaiser-windowed sinc prototype at the upsampled rate, split into phases."""
+    n = up * taps_per_phase
+    cutoff = 0.5 / max(up, down) * 0.92  # cycles / sample at up*fs_in
+    t = np.arange(n) - (n - 1) / 2.0
+    h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, beta)
+    h *= up / h.sum()  # unity DC gain after zero-stuffing
+
+    # phases[p][i] multiplies buf[n - (T-1) + i] -> coefficients reversed in time
+    phases = np.empty((up, taps_per_phase), dtype=np.float32)
+    for p in range(up):
+        phases[p] = h[p::up][::-1]
+    return phases
+
+
+class Resampler:
+    """
+    Rational up/down resampler. `process()` takes any number of PCM16 bytes
+    and returns the matching output bytes; internal buffers are reused and
+    only grow if a larger frame shows up.
+    """
+
+    __slots__ = (
+        "up", "down", "taps", "_phases", "_hist", "_u",
+        "_buf", "_out", "_out16",
+    )
+
+    def __init__(self, rate_in: int, rate_out: int, taps_per_phase: int = 24,
+                 max_frame: int = 4800):
+        g = gcd(rate_in, rate_out)
+        self.up = rate_out // g
+        self.down = rate_in // g
+        self.taps = taps_per_phase
+        self._phases = design_lowpass(self.up, self.down, taps_per_phase)
+        self._hist = taps_per_phase - 1
+        # upsampled time of the next output, relative to buffer start
+        self._u = self._hist * self.up
+        self._buf = np.zeros(self._hist + max_frame, dtype=np.float32)
+        self._out = np.empty(self.max_out(max_frame), dtype=np.float32)
+        self._out16 = np.empty(self._out.shape[0], dtype=PCM16)
+
+    def max_out(self, n_in: int) -> int:
+        return (n_in * self.up) // self.down + 2
+
+    def reset(self) -> None:
+        self._buf[: self._hist] = 0.0
+        self._u = self._hist * self.up
+
+    def _ensure(self, n_in: int) -> None:
+        if self._hist + n_in > self._buf.shape[0]:
+            buf = np.zeros(self._hist + n_in, dtype=np.float32)
+            buf[: self._hist] = self._buf[: self._hist]
+            self._buf = buf
+        need = self.max_out(n_in)
+        if need > self._out.shape[0]:
+            self._out = np.empty(need, dtype=np.float32)
+            self._out16 = np.empty(need, dtype=PCM16)
+
+    def process_array(self, x: np.ndarray) -> np.ndarray:
+        """Resample int16 samples; returns a view into an internal int16 buffer."""
+        n_in = x.shape[0]
+        if not n_in:
+            return self._out16[:0]
+        self._ensure(n_in)
+
+        H, L, M = self._hist, self.up, self.down
+        buf = self._buf
+        end = H + n_in
+        buf[H:end] = x
+
+        u0 = self._u
+        limit = end * L
+        count = max(0, -(-(limit - u0) // M))
+        out = self._out[:count]
+
+        if count:
+            windows = sliding_window_view(buf[:end], self.taps)
+            # outputs k = r, r+L, r+2L... share one filter phase and step M inputs
+            for r in range(min(L, count)):
+                u = u0 + r * M
+                n0 = u // L
+                p = u % L
+                k = len(range(r, count, L))
+                start = n0 - H
+                np.matmul(
+                    windows[start : start + (k - 1) * M + 1 : M],
+                    self._phases[p],
+                    out=out[r::L],
+                )
+
+        # slide history and carry the output phase
+        self._u = u0 + count * M - n_in * L
+        buf[:H] = buf[n_in:end]
+
+        np.rint(out, out=out)
+        np.clip(out, INT16_MIN, INT16_MAX, out=out)
+        out16 = self._out16[:count]
+        out16[:] = out
+        return out16
+
+    def process(self, pcm: bytes) -> bytes:
+        if len(pcm) < 2:
+            return b""
+        return self.process_array(samples(pcm)).tobytes()
@@ -0,0 +1,203 @@
+"""
+Cache of short Santa answers for the questions every child asks.
+
+Keyed on the child's turn as transcribed by the Realtime session
+(input_audio_transcription), normalized, plus a coarse language guess.
+A hit plays the stored answer (ready-to-send 20 ms frames, gain applied)
+straight into the call's pacer and only tells the model what Santa said;
+a miss asks the model as usual and, if the answer is short and was not
+interrupted, stores its audio for the next child.
+
+Answers depend on context, so a question is only cached once it has been
+asked in RESPONSE_CACHE_MIN_SEEN different turns (of the same call or of
+different calls), only with enough words to be a real question, and a
+call never gets the same cached answer twice.
+Entries expire after RESPONSE_CACHE_TTL and the least recently used ones
+are evicted above RESPONSE_CACHE_MAX_MB of audio.
+
+    RESPONSE_CACHE           1 enables it (default off)
+    RESPONSE_CACHE_TTL       seconds an answer stays valid (default 21600)
+    RESPONSE_CACHE_MAX_MB    audio memory cap per worker (default 64)
+    RESPONSE_CACHE_MIN_SEEN  turns that must ask a question before its answer is cached (default 2)
+"""
+
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+from pacer import FRAME_BYTES
+from resampler import VONAGE_RATE
+
+
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "21600"))
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", "64"))
+RESPONSE_CACHE_MIN_SEEN = int(os.getenv("RESPONSE_CACHE_MIN_SEEN", "2"))
+
+MIN_WORDS = 3
+MAX_ANSWER_SECONDS = 8.0
+MAX_ANSWER_BYTES = int(MAX_ANSWER_SECONDS * VONAGE_RATE * 2)
+
+# cuvinte de umplutură / adresare care nu schimbă întrebarea
+_FILLERS = {
+    "hm", "hmm", "uh", "um", "aa", "aaa", "ee", "pai", "deci", "ok", "okay",
+    "mos", "mosule", "craciun", "craciunule", "santa", "claus", "hey", "hei",
+}
+
+# câteva cuvinte foarte frecvente, suficiente ca să despărțim RO de EN
+_RO_WORDS = {
+    "ce", "si", "eu", "tu", "ma", "imi", "iti", "esti", "sunt", "cadou", "cadouri",
+    "unde", "cum", "de", "la", "pe", "nu", "da", "vrei", "aduci", "reni", "adevarat",
+}
+_EN_WORDS = {
+    "what", "where", "how", "are", "you", "is", "the", "do", "does", "my", "me",
+    "gift", "gifts", "present", "reindeer", "real", "live", "bring", "can", "i",
+}
+
+_PUNCT = re.compile(r"[^\w\s]+")
+
+
+def fold(text: str) -> str:
+    """Lowercase, no diacritics, punctuation as spaces (shared with call_memory)."""
+    # ș/ş, ț/ţ, ă, â, î -> litere simple; fără punctuație
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _PUNCT.sub(" ", text)
+
+
+def detect_language(text: str) -> str:
+    words = fold(text).split()
+    ro = sum(w in _RO_WORDS for w in words)
+    en = sum(w in _EN_WORDS for w in words)
+    if any(c in text.lower() for c in "ăâîșşțţ"):
+        ro += 2
+    return "en" if en > ro else "ro"
+
+
+def normalize(text: str) -> str:
+    return " ".join(w for w in fold(text).split() if w not in _FILLERS)
+
+
+def cache_key(transcript: str, scope: str = ""):
+    """(normalized question, language, scope), or None if the turn is too short to cache."""
+    norm = normalize(transcript)
+    if len(norm.split()) < MIN_WORDS:
+        return None
+    return norm, detect_language(transcript), scope
+
+
+class CachedAnswer:
+    __slots__ = ("frames", "text", "expires", "nbytes", "hits")
+
+    def __init__(self, frames, text: str, expires: float):
+        self.frames = frames
+        self.text = text
+        self.expires = expires
+        self.nbytes = len(frames) * FRAME_BYTES
+        self.hits = 0
+
+    @property
+    def duration(self) -> float:
+        return self.nbytes / 2 / VONAGE_RATE
+
+
+class ResponseCache:
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL,
+                 max_bytes: int = int(RESPONSE_CACHE_MAX_MB * 1024 * 1024),
+                 min_seen: int = RESPONSE_CACHE_MIN_SEEN):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.min_seen = min_seen
+        self._entries = OrderedDict()  # key -> CachedAnswer, LRU la început
+        self._seen = OrderedDict()     # key -> de câte ori a fost întrebat
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self.saved_seconds = 0.0
+        # media (EWMA) latenței unui răspuns de la model, din miss-uri
+        self.model_latency = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---------------- lookup / store ----------------
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires < time.monotonic():
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        entry.hits += 1
+        self.hits += 1
+        return entry
+
+    def seen(self, key) -> bool:
+        """Count one more ask of `key`; True once it is frequent enough to store."""
+        n = self._seen.pop(key, 0) + 1
+        self._seen[key] = n
+        while len(self._seen) > 10000:
+            self._seen.popitem(last=False)
+        return n >= self.min_seen
+
+    def put(self, key, pcm_16k: bytes, text: str) -> bool:
+        if not pcm_16k or len(pcm_16k) > MAX_ANSWER_BYTES:
+            return False
+        buf = bytes(pcm_16k)
+        if len(buf) % FRAME_BYTES:
+            buf += bytes(FRAME_BYTES - len(buf) % FRAME_BYTES)
+        frames = [buf[i : i + FRAME_BYTES] for i in range(0, len(buf), FRAME_BYTES)]
+
+        if key in self._entries:
+            self._drop(key)
+        entry = CachedAnswer(frames, text, time.monotonic() + self.ttl)
+        self._entries[key] = entry
+        self.bytes += entry.nbytes
+        self.stored += 1
+        while self.bytes > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+            self.evicted += 1
+        return True
+
+    def _drop(self, key) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.nbytes
+
+    # ---------------- latency accounting ----------------
+
+    def observe_model_latency(self, seconds: float) -> None:
+        if self.model_latency is None:
+            self.model_latency = seconds
+        else:
+            self.model_latency += 0.1 * (seconds - self.model_latency)
+
+    def observe_hit_latency(self, seconds: float) -> float:
+        saved = max(0.0, (self.model_latency or 0.0) - seconds)
+        self.saved_seconds += saved
+        return saved
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "mb": round(self.bytes / 1024 / 1024, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "model_latency_ms": (
+                round(self.model_latency * 1000) if self.model_latency is not None else None
+            ),
+            "saved_seconds": round(self.saved_seconds, 1),
+        }
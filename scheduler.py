@@ -0,0 +1,132 @@
+"""
+One deadline scheduler per worker for all call timers.
+
+Instead of every call keeping its own polling tasks (a silence watcher
+waking each second, a call timer parked in two long sleeps), calls
+register deadlines here. Pending timers live in a binary heap; the event
+loop holds a single TimerHandle for the earliest one, so an idle worker
+wakes only when some deadline is actually due, regardless of call count.
+
+    timers.call_later(7.0, on_silence, session)   -> Timer
+    timers.cancel(timer)
+
+Cancelled timers are left in the heap and skipped when popped (the heap
+is compacted when they outnumber the live ones). Callbacks are plain
+functions run on the event loop, in the contextvars context of the code
+that scheduled them; anything async they need is started with
+asyncio.create_task.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+
+from calllog import log
+
+
+class Timer:
+    __slots__ = ("when", "callback", "args", "cancelled", "context")
+
+    def __init__(self, when: float, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        # callback-ul rulează cu contextul apelului care l-a programat (call_id în loguri)
+        self.context = contextvars.copy_context()
+
+
+class TimerScheduler:
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._heap = []  # (when, seq, Timer)
+        self._seq = itertools.count()
+        self._handle = None
+        self._handle_when = None
+        self._cancelled = 0
+
+        self.fired = 0
+        self.wakeups = 0
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled
+
+    # ---------------- schedule / cancel ----------------
+
+    def call_at(self, when: float, callback, *args) -> Timer:
+        timer = Timer(when, callback, args)
+        heapq.heappush(self._heap, (when, next(self._seq), timer))
+        if self._handle_when is None or when < self._handle_when:
+            self._arm()
+        return timer
+
+    def call_later(self, delay: float, callback, *args) -> Timer:
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def cancel(self, timer) -> None:
+        if timer is not None and not timer.cancelled:
+            timer.cancelled = True
+            self._cancelled += 1
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._compact()
+
+    def _compact(self) -> None:
+        # pe loc: _run / _arm pot avea lista în mână când un callback face cancel()
+        self._heap[:] = [e for e in self._heap if not e[2].cancelled]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
+
+    # ---------------- event loop wakeup ----------------
+
+    def _arm(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+            self._handle_when = None
+        heap = self._heap
+        # nu trezim bucla pentru timere deja anulate
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+            self._cancelled -= 1
+        if not heap:
+            return
+        when = heap[0][0]
+        loop = asyncio.get_running_loop()
+        self._handle = loop.call_later(max(0.0, when - self.clock()), self._run)
+        self._handle_when = when
+
+    def _run(self) -> None:
+        self._handle = None
+        self._handle_when = None
+        self.wakeups += 1
+
+        heap = self._heap
+        now = self.clock()
+        while heap and heap[0][0] <= now:
+            _, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+            # marcat ca terminat: un cancel() ulterior nu mai contează
+            timer.cancelled = True
+            self.fired += 1
+            try:
+                timer.context.run(timer.callback, *timer.args)
+            except Exception:
+                log.exception("timer_callback_error", callback=getattr(timer.callback, "__name__", "?"))
+
+        if heap:
+            self._arm()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self),
+            "fired": self.fired,
+            "wakeups": self.wakeups,
+        }
+
+
+timers = TimerScheduler()
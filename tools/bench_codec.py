@@ -0,0 +1,71 @@
+"""
+Per-frame CPU of Realtime event encoding / decoding: old vs realtime_codec.
+
+    python -m tools.bench_codec [--frames 20000]
+
+Inbound: one 20 ms frame resampled to 24 kHz (960 bytes) per append.
+Outbound: a ~100 ms response.audio.delta (4800 bytes of PCM).
+"""
+
+import argparse
+import base64
+import json
+import os
+import timeit
+
+from realtime_codec import decode_event, encode_append, orjson
+
+
+def legacy_encode(pcm: bytes) -> str:
+    return json.dumps(
+        {
+            "type": "input_audio_buffer.append",
+            "audio": base64.b64encode(pcm).decode(),
+        }
+    )
+
+
+def legacy_decode(raw: str):
+    data = json.loads(raw)
+    if data.get("type") == "response.audio.delta":
+        return base64.b64decode(data["delta"])
+    return data
+
+
+def per_frame_us(fn, frames: int) -> float:
+    return min(timeit.repeat(fn, number=frames, repeat=3)) / frames * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=20000)
+    args = ap.parse_args()
+
+    inbound = os.urandom(960)
+    delta_pcm = os.urandom(4800)
+    delta_raw = json.dumps({
+        "type": "response.audio.delta",
+        "event_id": "event_123",
+        "response_id": "resp_123",
+        "item_id": "item_123",
+        "output_index": 0,
+        "content_index": 0,
+        "delta": base64.b64encode(delta_pcm).decode(),
+    }, separators=(",", ":"))
+
+    assert json.loads(encode_append(inbound)) == json.loads(legacy_encode(inbound))
+    assert decode_event(delta_raw).audio == legacy_decode(delta_raw) == delta_pcm
+
+    print(f"orjson: {'yes' if orjson is not None else 'no'}")
+    print(f"{'path':<26}{'legacy us':>12}{'codec us':>12}{'speedup':>10}")
+    for name, old, new in (
+        ("encode append (960 B)", lambda: legacy_encode(inbound), lambda: encode_append(inbound)),
+        ("decode delta (4800 B)", lambda: legacy_decode(delta_raw), lambda: decode_event(delta_raw)),
+    ):
+        old_us = per_frame_us(old, args.frames)
+        new_us = per_frame_us(new, args.frames)
+        print(f"{name:<26}{old_us:>12.2f}{new_us:>12.2f}{old_us / new_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
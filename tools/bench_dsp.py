@@ -0,0 +1,117 @@
+"""
+Micro-benchmark: per-frame cost of the old struct loops vs audio_dsp,
+the vectorized fixed gain that came in between, and the agc stages
+(AGC + look-ahead limiter) that replaced it.
+
+    python -m tools.bench_dsp [--frames 5000]
+
+Inbound frames are 20 ms @ 16 kHz (320 samples), outbound deltas are
+sized like typical Realtime response.audio.delta chunks (~100 ms @ 24 kHz).
+"""
+
+import argparse
+import random
+import struct
+import timeit
+
+import numpy as np
+
+from agc import child_agc, santa_agc
+from audio_dsp import INT16_MAX, INT16_MIN, FrameDSP, peak, samples
+
+
+# ----------------------------------------------------------
+# Old implementations (copied from app.py before the DSP module)
+# ----------------------------------------------------------
+
+def legacy_apply_gain(pcm_bytes: bytes, gain: float = 1.35) -> bytes:
+    if not pcm_bytes:
+        return pcm_bytes
+    num_samples = len(pcm_bytes) // 2
+    samples = struct.unpack("<" + "h" * num_samples, pcm_bytes)
+
+    boosted = []
+    for s in samples:
+        v = int(s * gain)
+        if v > 32767:
+            v = 32767
+        if v < -32768:
+            v = -32768
+        boosted.append(v)
+
+    return struct.pack("<" + "h" * len(boosted), *boosted)
+
+
+def legacy_peak(audio: bytes) -> int:
+    num_samples = len(audio) // 2
+    values = struct.unpack("<" + "h" * num_samples, audio)
+    return max(abs(s) for s in values)
+
+
+def fixed_gain(dsp: FrameDSP, pcm: bytes, gain: float = 1.35) -> bytes:
+    """The vectorized fixed gain + hard clip that ran before agc (was audio_dsp.apply_gain)."""
+    buf = bytearray(pcm)
+    s = samples(buf)
+    f = dsp.scratch(s.size)
+    np.multiply(s, gain, out=f, casting="unsafe")
+    np.clip(f, INT16_MIN, INT16_MAX, out=f)
+    # float -> int16 truncates toward zero, like int(s * gain)
+    s[:] = f
+    return bytes(buf)
+
+
+# ----------------------------------------------------------
+# Bench
+# ----------------------------------------------------------
+
+def make_frame(n_samples: int, seed: int = 1) -> bytes:
+    rnd = random.Random(seed)
+    return struct.pack(
+        "<" + "h" * n_samples,
+        *(rnd.randint(-20000, 20000) for _ in range(n_samples)),
+    )
+
+
+def per_frame_us(fn, frames: int) -> float:
+    total = min(timeit.repeat(fn, number=frames, repeat=3))
+    return total / frames * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=5000)
+    args = ap.parse_args()
+
+    inbound = make_frame(320)
+    outbound = make_frame(2400)
+    dsp = FrameDSP()
+    santa = santa_agc()
+    child = child_agc()
+
+    assert legacy_apply_gain(outbound) == fixed_gain(dsp, outbound)
+    assert legacy_peak(inbound) == peak(inbound)
+
+    rows = [
+        ("inbound peak (320 smp)", lambda: legacy_peak(inbound), lambda: peak(inbound)),
+        ("outbound gain (2400 smp)", lambda: legacy_apply_gain(outbound),
+         lambda: fixed_gain(dsp, outbound)),
+        ("inbound rms (320 smp)", None, lambda: dsp.rms(inbound)),
+        ("outbound agc+limit (2400)", lambda: legacy_apply_gain(outbound),
+         lambda: santa.process(outbound)),
+        ("outbound agc+limit (1600)", lambda: legacy_apply_gain(outbound[:3200]),
+         lambda: santa.process(outbound[:3200])),
+        ("inbound agc+limit (320 smp)", None, lambda: child.process(inbound)),
+    ]
+
+    print(f"{'path':<28}{'legacy us/frame':>18}{'dsp us/frame':>16}{'speedup':>10}")
+    for name, old, new in rows:
+        new_us = per_frame_us(new, args.frames)
+        if old is None:
+            print(f"{name:<28}{'-':>18}{new_us:>16.2f}{'-':>10}")
+            continue
+        old_us = per_frame_us(old, args.frames)
+        print(f"{name:<28}{old_us:>18.2f}{new_us:>16.2f}{old_us / new_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Per-frame latency / CPU of the streaming resamplers.
+
+    python -m tools.bench_resample [--seconds 30]
+
+Inbound: 20 ms Vonage frames (320 smp @ 16 kHz) -> 24 kHz.
+Outbound: 100 ms Realtime deltas (2400 smp @ 24 kHz) -> 16 kHz.
+CPU per call is processing time divided by the audio duration handled.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from resampler import OPENAI_RATE, VONAGE_RATE, Resampler
+
+
+def run(rate_in: int, rate_out: int, frame: int, seconds: float):
+    t = np.arange(int(rate_in * seconds)) / rate_in
+    x = (8000 * np.sin(2 * np.pi * 440 * t)).astype("<i2")
+    frames = [x[i : i + frame] for i in range(0, len(x) - frame + 1, frame)]
+
+    rs = Resampler(rate_in, rate_out)
+    costs = np.empty(len(frames))
+    for i, f in enumerate(frames):
+        t0 = time.perf_counter()
+        rs.process_array(f)
+        costs[i] = time.perf_counter() - t0
+
+    frame_s = frame / rate_in
+    return costs, frame_s
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=30.0)
+    args = ap.parse_args()
+
+    print(f"{'direction':<22}{'p50 us':>10}{'p99 us':>10}{'max us':>10}{'CPU/call':>11}")
+    for name, rin, rout, frame in (
+        ("inbound 16k->24k", VONAGE_RATE, OPENAI_RATE, 320),
+        ("outbound 24k->16k", OPENAI_RATE, VONAGE_RATE, 2400),
+    ):
+        costs, frame_s = run(rin, rout, frame, args.seconds)
+        p50, p99 = np.percentile(costs, [50, 99]) * 1e6
+        cpu = costs.sum() / (len(costs) * frame_s) * 100
+        print(f"{name:<22}{p50:>10.1f}{p99:>10.1f}{costs.max() * 1e6:>10.1f}{cpu:>10.3f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Idle event-loop wakeups of per-call timers: polling tasks vs the shared scheduler.
+
+    python -m tools.bench_timers [--calls 1000] [--seconds 20]
+
+Each simulated call has the silence deadline (7 s), the 4 minute wrap-up
+and the 5 minute hangup, with no audio flowing. "legacy" runs the old
+shape: one task sleeping 1 s in a loop plus one task parked in the long
+sleep, per call. "scheduler" registers the three deadlines with
+scheduler.TimerScheduler. Calls start at staggered times, so their
+deadlines are spread over the run.
+
+In the "talking" scenario every call has just heard the child when the
+run starts, and one driver task refreshes each call's last activity once
+a second (as VAD frames would), so no silence prompt is ever due: the
+prompts column reads 0 for both modes. In "quiet" every call prompts
+each 7 s.
+"""
+
+import argparse
+import asyncio
+import time
+
+from scheduler import TimerScheduler
+
+
+SILENCE_SECONDS = 7
+WRAP_UP_SECONDS = 240
+HANGUP_SECONDS = 300
+
+
+class FakeCall:
+    __slots__ = ("start", "last_activity", "prompts", "closed", "silence_timer")
+
+    def __init__(self, offset: float = 0.0, talking: bool = False):
+        # apelurile nu încep simultan: termenele sunt eșalonate
+        now = time.monotonic()
+        self.start = now - offset
+        # copilul vorbește: ultima activitate e acum, doar termenele rămân eșalonate
+        self.last_activity = now if talking else self.start
+        self.prompts = 0
+        self.closed = False
+        self.silence_timer = None
+
+
+# ----------------------------------------------------------
+# Legacy: per-call polling tasks
+# ----------------------------------------------------------
+
+async def legacy_silence(call: FakeCall, counter: list):
+    while not call.closed:
+        await asyncio.sleep(1)
+        counter[0] += 1
+        now = time.monotonic()
+        if now - call.last_activity > SILENCE_SECONDS:
+            call.prompts += 1
+            call.last_activity = now
+
+
+async def legacy_timer(call: FakeCall, counter: list):
+    await asyncio.sleep(call.start + WRAP_UP_SECONDS - time.monotonic())
+    counter[0] += 1
+    await asyncio.sleep(HANGUP_SECONDS - WRAP_UP_SECONDS)
+    counter[0] += 1
+    call.closed = True
+
+
+async def run_legacy(calls, seconds: float):
+    counter = [0]
+    tasks = []
+    for c in calls:
+        tasks.append(asyncio.create_task(legacy_silence(c, counter)))
+        tasks.append(asyncio.create_task(legacy_timer(c, counter)))
+    cpu = await measure(seconds)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return counter[0], cpu
+
+
+# ----------------------------------------------------------
+# Shared scheduler
+# ----------------------------------------------------------
+
+def on_silence(timers: TimerScheduler, call: FakeCall):
+    now = time.monotonic()
+    deadline = call.last_activity + SILENCE_SECONDS
+    if now < deadline:
+        call.silence_timer = timers.call_at(deadline, on_silence, timers, call)
+        return
+    call.prompts += 1
+    call.last_activity = now
+    call.silence_timer = timers.call_at(now + SILENCE_SECONDS, on_silence, timers, call)
+
+
+def on_hangup(call: FakeCall):
+    call.closed = True
+
+
+async def run_scheduler(calls, seconds: float):
+    timers = TimerScheduler()
+    for c in calls:
+        c.silence_timer = timers.call_at(c.start + SILENCE_SECONDS, on_silence, timers, c)
+        timers.call_at(c.start + WRAP_UP_SECONDS, lambda: None)
+        timers.call_at(c.start + HANGUP_SECONDS, on_hangup, c)
+    cpu = await measure(seconds)
+    return timers.wakeups, cpu
+
+
+# ----------------------------------------------------------
+# Driver
+# ----------------------------------------------------------
+
+async def measure(seconds: float) -> float:
+    t0 = time.process_time()
+    await asyncio.sleep(seconds)
+    return time.process_time() - t0
+
+
+async def talk(calls):
+    # câte o felie de apeluri la fiecare 20 ms: fiecare apel e atins o dată pe secundă
+    k = 0
+    while True:
+        now = time.monotonic()
+        for c in calls[k::50]:
+            c.last_activity = now
+        k = (k + 1) % 50
+        await asyncio.sleep(0.02)
+
+
+async def scenario(kind: str, n: int, seconds: float, talking: bool):
+    calls = [FakeCall(i / n * SILENCE_SECONDS, talking) for i in range(n)]
+    driver = asyncio.create_task(talk(calls)) if talking else None
+    run = run_legacy if kind == "legacy" else run_scheduler
+    wakeups, cpu = await run(calls, seconds)
+    if driver is not None:
+        driver.cancel()
+    prompts = sum(c.prompts for c in calls)
+    return wakeups / seconds, cpu / seconds * 100, prompts
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=1000)
+    ap.add_argument("--seconds", type=float, default=20.0)
+    args = ap.parse_args()
+
+    print(f"{args.calls} calls, {args.seconds:.0f} s per run")
+    print(f"{'scenario':>10} {'mode':>10} {'wakeups/s':>10} {'CPU %':>7} {'prompts':>8}")
+    for talking in (True, False):
+        name = "talking" if talking else "quiet"
+        for kind in ("legacy", "scheduler"):
+            rate, cpu, prompts = asyncio.run(scenario(kind, args.calls, args.seconds, talking))
+            print(f"{name:>10} {kind:>10} {rate:>10.1f} {cpu:>7.2f} {prompts:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Local stand-in for the OpenAI Realtime endpoint, for load tests.
+
+    python -m tools.fake_realtime [--port 9000] [--response-ms 2000]
+
+Point the app at it with OPENAI_REALTIME_URL=ws://127.0.0.1:9000 (any
+OPENAI_API_KEY works). The server understands the events app.py sends:
+
+- session.update                -> session.updated
+- input_audio_buffer.append     -> energy-based turn detection (off when
+                                   turn_detection is null); after
+                                   --vad-silence-ms of quiet following
+                                   speech it starts a response (server_vad,
+                                   unless create_response is false) and, if
+                                   input_audio_transcription is set, sends
+                                   the next of --transcripts after
+                                   --transcribe-ms (every Nth one fails
+                                   with --transcribe-fail-every N)
+- input_audio_buffer.commit     -> input_audio_buffer.committed; child
+                                   input heard since the last turn becomes
+                                   unanswered (and is transcribed)
+- response.create               -> a response, if it carries instructions
+                                   or there is unanswered child input; an
+                                   error while another response is active
+- response.cancel               -> stops audio, response.done (cancelled)
+- conversation.item.create      -> accepted and ignored
+- anything else                 -> an invalid_request_error, as the API does
+
+With --drop-after-ms the server aborts every session (close code 1011)
+that long after its first audio append, to exercise reconnects; idle
+pooled sockets are left alone.
+
+Only events the real API sends come back. A response is scripted:
+response.created, 100 ms response.audio.delta chunks of a 24 kHz tone
+sent at 2x real time, response.audio_transcript.done,
+response.audio.done, response.done (status completed, with usage).
+"""
+
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+
+import numpy as np
+import websockets
+
+
+RATE = 24000
+CHUNK_MS = 100
+
+_ids = itertools.count(1)
+
+
+def tone_chunks(duration_ms: int, freq: float = 220.0, amp: int = 8000):
+    n = RATE * CHUNK_MS // 1000
+    total = RATE * duration_ms // 1000
+    t = np.arange(total) / RATE
+    pcm = (amp * np.sin(2 * np.pi * freq * t)).astype("<i2")
+    return [
+        base64.b64encode(pcm[i : i + n].tobytes()).decode()
+        for i in range(0, total, n)
+    ]
+
+
+class FakeSession:
+
+    def __init__(self, ws, args, chunks):
+        self.ws = ws
+        self.args = args
+        self.chunks = chunks
+        self.response_task = None
+        self.in_speech = False
+        self.quiet_ms = 0.0
+        self.unanswered = False
+        self.heard = False  # vorbire de la ultimul turn închis
+        self.server_turns = True  # turn_detection: null -> turul îl închide clientul cu commit
+        self.transcribe = False
+        self.transcripts = itertools.cycle(args.transcripts.split("|"))
+        self.turns = itertools.count(1)
+        self.drop_task = None
+
+    async def send(self, event: dict) -> None:
+        event.setdefault("event_id", f"event_{next(_ids)}")
+        # compact, ca API-ul real: decode_event are o cale rapidă pentru `"type":"`
+        await self.ws.send(json.dumps(event, separators=(",", ":")))
+
+    async def error(self, code: str, message: str) -> None:
+        await self.send({
+            "type": "error",
+            "error": {"type": "invalid_request_error", "code": code, "message": message},
+        })
+
+    # ---------------- responses ----------------
+
+    def start_response(self) -> None:
+        if self.response_task is not None and not self.response_task.done():
+            return
+        self.unanswered = False
+        self.response_task = asyncio.create_task(self.respond())
+
+    async def respond(self) -> None:
+        rid = f"resp_{next(_ids)}"
+        try:
+            await asyncio.sleep(self.args.think_ms / 1000)
+            await self.send({"type": "response.created", "response": {"id": rid, "status": "in_progress"}})
+            for delta in self.chunks:
+                await self.send({
+                    "type": "response.audio.delta",
+                    "response_id": rid,
+                    "item_id": f"item_{rid}",
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": delta,
+                })
+                await asyncio.sleep(CHUNK_MS / 1000 / self.args.speed)
+            await self.send({
+                "type": "response.audio_transcript.done",
+                "response_id": rid,
+                "transcript": "Ho-ho-ho! Sigur, puișor!",
+            })
+            await self.send({"type": "response.audio.done", "response_id": rid})
+            await self.send({
+                "type": "response.done",
+                "response": {
+                    "id": rid,
+                    "status": "completed",
+                    "usage": {
+                        "input_tokens": 100, "output_tokens": 50, "total_tokens": 150,
+                        "input_token_details": {"text_tokens": 80, "audio_tokens": 20, "cached_tokens": 64},
+                        "output_token_details": {"text_tokens": 10, "audio_tokens": 40},
+                    },
+                },
+            })
+        except asyncio.CancelledError:
+            try:
+                await self.send({
+                    "type": "response.done",
+                    "response": {"id": rid, "status": "cancelled"},
+                })
+            except websockets.ConnectionClosed:
+                pass
+            raise
+        except websockets.ConnectionClosed:
+            pass
+
+    def cancel_response(self) -> None:
+        if self.response_task is not None and not self.response_task.done():
+            self.response_task.cancel()
+
+    # ---------------- input turn detection ----------------
+
+    async def on_audio(self, b64: str) -> None:
+        pcm = np.frombuffer(base64.b64decode(b64), dtype="<i2")
+        if not pcm.size:
+            return
+        rms = float(np.sqrt(np.mean(pcm.astype(np.float32) ** 2)))
+        ms = pcm.size * 1000 / RATE
+
+        if rms >= self.args.vad_rms:
+            if not self.in_speech:
+                self.in_speech = True
+                self.heard = True
+                await self.send({"type": "input_audio_buffer.speech_started"})
+            self.quiet_ms = 0.0
+            return
+
+        if self.in_speech:
+            self.quiet_ms += ms
+            if self.quiet_ms >= self.args.vad_silence_ms:
+                self.in_speech = False
+                await self.send({"type": "input_audio_buffer.speech_stopped"})
+                if self.server_turns:
+                    self.end_turn()
+                if self.args.server_vad:
+                    self.start_response()
+
+    def end_turn(self) -> None:
+        self.heard = False
+        self.unanswered = True
+        if self.transcribe:
+            asyncio.create_task(self.send_transcript(next(self.transcripts)))
+
+    async def send_transcript(self, text: str) -> None:
+        try:
+            await asyncio.sleep(self.args.transcribe_ms / 1000)
+            fail = self.args.transcribe_fail_every
+            if fail and next(self.turns) % fail == 0:
+                await self.send({
+                    "type": "conversation.item.input_audio_transcription.failed",
+                    "item_id": f"item_{next(_ids)}",
+                    "content_index": 0,
+                    "error": {"type": "transcription_error", "code": "audio_unintelligible",
+                              "message": "fake failure"},
+                })
+                return
+            await self.send({
+                "type": "conversation.item.input_audio_transcription.completed",
+                "item_id": f"item_{next(_ids)}",
+                "content_index": 0,
+                "transcript": text,
+            })
+        except websockets.ConnectionClosed:
+            pass
+
+    async def drop_later(self) -> None:
+        await asyncio.sleep(self.args.drop_after_ms / 1000)
+        self.cancel_response()
+        await self.ws.close(code=1011, reason="fake drop")
+
+    # ---------------- main loop ----------------
+
+    async def run(self) -> None:
+        await self.send({"type": "session.created", "session": {"id": f"sess_{next(_ids)}"}})
+        try:
+            async for raw in self.ws:
+                data = json.loads(raw)
+                t = data.get("type")
+                if t == "input_audio_buffer.append":
+                    if self.args.drop_after_ms and self.drop_task is None:
+                        self.drop_task = asyncio.create_task(self.drop_later())
+                    await self.on_audio(data.get("audio", ""))
+                elif t == "session.update":
+                    session = data.get("session", {})
+                    # turn_detection: null -> the client commits turns itself
+                    td = session.get("turn_detection", {"type": "server_vad"})
+                    self.server_turns = bool(td)
+                    self.args.server_vad = self.server_turns and td.get("create_response", True)
+                    self.transcribe = bool(session.get("input_audio_transcription"))
+                    await self.send({"type": "session.updated", "session": session})
+                elif t == "input_audio_buffer.commit":
+                    await self.send({"type": "input_audio_buffer.committed"})
+                    if self.heard:
+                        self.in_speech = False
+                        self.quiet_ms = 0.0
+                        self.end_turn()
+                elif t == "response.create":
+                    response = data.get("response", {})
+                    if self.response_task is not None and not self.response_task.done():
+                        await self.error("conversation_already_has_active_response",
+                                         "Conversation already has an active response")
+                    elif response.get("instructions") or self.unanswered:
+                        self.start_response()
+                elif t == "response.cancel":
+                    self.cancel_response()
+                elif t != "conversation.item.create":
+                    await self.error("invalid_value", f"Invalid value: '{t}'")
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.cancel_response()
+            if self.drop_task is not None:
+                self.drop_task.cancel()
+
+
+async def main_async(args) -> None:
+    chunks = tone_chunks(args.response_ms)
+
+    async def handler(ws, path=None):
+        session_args = argparse.Namespace(**vars(args))
+        await FakeSession(ws, session_args, chunks).run()
+
+    async with websockets.serve(handler, args.host, args.port, max_size=None):
+        print(f"Fake Realtime listening on ws://{args.host}:{args.port}", flush=True)
+        await asyncio.Future()
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9000)
+    ap.add_argument("--response-ms", type=int, default=2000)
+    ap.add_argument("--think-ms", type=int, default=150, help="delay before first delta")
+    ap.add_argument("--speed", type=float, default=2.0, help="delta pacing vs real time")
+    ap.add_argument("--vad-rms", type=float, default=500.0)
+    ap.add_argument("--vad-silence-ms", type=int, default=300)
+    ap.add_argument("--transcribe-ms", type=int, default=250, help="delay of input transcripts")
+    ap.add_argument(
+        "--transcripts",
+        default="Ce cadou îmi aduci?|Where do reindeer live?|Ești adevărat, Moșule?",
+        help="child turns returned by input transcription, '|' separated, cycled",
+    )
+    ap.add_argument("--transcribe-fail-every", type=int, default=0,
+                    help="every Nth input transcription fails (0 = never)")
+    ap.add_argument("--drop-after-ms", type=int, default=0,
+                    help="abort each session this long after its first audio (0 = never)")
+    args = ap.parse_args(argv)
+    args.server_vad = True
+    return args
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main_async(parse_args()))
+    except KeyboardInterrupt:
+        pass
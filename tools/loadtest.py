@@ -0,0 +1,325 @@
+"""
+Load generator: N fake Vonage callers against /ws.
+
+    # everything local: spawns tools.fake_realtime + uvicorn app:app
+    python -m tools.loadtest --spawn --calls 20 --duration 30
+    python -m tools.loadtest --spawn --ramp 10,25,50,100 --duration 20
+
+    # against an already running app (pointed at a fake or real Realtime)
+    python -m tools.loadtest --url ws://127.0.0.1:8000/ws --calls 20
+
+Each caller streams 20 ms l16 @ 16 kHz frames on a monotonic clock:
+silence during the greeting, then turns of "speech" (loops of
+audio/background.wav) followed by silence, and every third turn it barges
+in while Santa is talking. Received frames louder than --voice-rms count
+as Santa's voice (the ambience bed stays well below it).
+
+Reported per step:
+  mouth-to-ear   end of the child's utterance -> first voice frame back
+                 (includes the turn-end wait, i.e. the fake server's
+                 --vad-silence-ms or, with TURN_DETECTION=local, the app's
+                 TURN_HANGOVER_MS, and --think-ms)
+  barge-in       start of the interruption -> last voice frame received
+  late frames    inter-arrival gap > 30 ms while a stream is playing
+  CPU / call     app process CPU (--spawn only, from /proc) / calls
+The first step with more than 1% late frames is reported as the knee.
+The generator itself is Python too and reports its own CPU ("gen CPU");
+when that nears 100% the late frames are the generator's, not the app's,
+so run it on another machine or in several processes.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+import websockets
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPEECH_WAV = os.path.join(ROOT, "audio", "background.wav")
+
+FRAME_SAMPLES = 320
+FRAME_BYTES = FRAME_SAMPLES * 2
+FRAME_SECONDS = 0.02
+LATE_GAP = 0.03
+
+
+def load_speech(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as w:
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+    n = len(pcm) // FRAME_SAMPLES * FRAME_SAMPLES
+    return pcm[:n].reshape(-1, FRAME_SAMPLES)
+
+
+# ----------------------------------------------------------
+# One fake caller
+# ----------------------------------------------------------
+
+class Caller:
+
+    def __init__(self, idx: int, speech: np.ndarray, args):
+        self.idx = idx
+        self.speech = speech
+        self.args = args
+        self.pos = (idx * 97) % len(speech)
+
+        self.last_voice = 0.0
+        self.last_frame = 0.0
+        self.waiting_reply_since = None
+
+        self.mouth_to_ear = []
+        self.barge_in = []
+        self.frames = 0
+        self.late = 0
+        self.error = None
+
+    def santa_speaking(self, now: float) -> bool:
+        return now - self.last_voice < 0.1
+
+    # ---------------- receive ----------------
+
+    async def receive(self, ws) -> None:
+        async for msg in ws:
+            if not isinstance(msg, bytes):
+                continue
+            now = time.monotonic()
+            gap = now - self.last_frame
+            if self.last_frame and LATE_GAP < gap < 0.5:
+                self.late += 1
+            self.last_frame = now
+            self.frames += 1
+
+            pcm = np.frombuffer(msg, dtype="<i2").astype(np.float32)
+            if pcm.size and np.sqrt(np.dot(pcm, pcm) / pcm.size) > self.args.voice_rms:
+                if self.waiting_reply_since is not None:
+                    self.mouth_to_ear.append(now - self.waiting_reply_since)
+                    self.waiting_reply_since = None
+                self.last_voice = now
+
+    # ---------------- send ----------------
+
+    async def send_frames(self, ws, n: int, speech: bool) -> None:
+        silence = bytes(FRAME_BYTES)
+        for _ in range(n):
+            if speech:
+                frame = self.speech[self.pos].tobytes()
+                self.pos = (self.pos + 1) % len(self.speech)
+            else:
+                frame = silence
+            await ws.send(frame)
+            self.deadline += FRAME_SECONDS
+            delay = self.deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def wait_while(self, ws, cond, timeout: float) -> None:
+        end = time.monotonic() + timeout
+        while cond() and time.monotonic() < end:
+            await self.send_frames(ws, 1, speech=False)
+
+    async def script(self, ws, until: float) -> None:
+        self.deadline = time.monotonic()
+        await self.send_frames(ws, 100, speech=False)  # greeting
+        turn = 0
+        while time.monotonic() < until:
+            turn += 1
+            if turn % 3 == 0:
+                # barge-in: wait for Santa to talk, interrupt him mid-sentence
+                await self.wait_while(ws, lambda: not self.santa_speaking(time.monotonic()), 5.0)
+                if self.santa_speaking(time.monotonic()):
+                    await self.send_frames(ws, 15, speech=False)
+                    t0 = time.monotonic()
+                    await self.send_frames(ws, 40, speech=True)
+                    if self.last_voice > t0:
+                        self.barge_in.append(self.last_voice - t0)
+                    self.waiting_reply_since = time.monotonic()
+                    await self.send_frames(ws, 50, speech=False)
+                continue
+
+            # wait for Santa to finish, then a normal utterance
+            await self.wait_while(ws, lambda: self.santa_speaking(time.monotonic()), 10.0)
+            await self.send_frames(ws, 25, speech=False)
+            await self.send_frames(ws, 60, speech=True)
+            self.waiting_reply_since = time.monotonic()
+            await self.send_frames(ws, 100, speech=False)
+
+    async def run(self, url: str, duration: float) -> None:
+        sep = "&" if "?" in url else "?"
+        try:
+            async with websockets.connect(f"{url}{sep}call_id=load-{self.idx}", max_size=None) as ws:
+                recv = asyncio.create_task(self.receive(ws))
+                try:
+                    await self.script(ws, time.monotonic() + duration)
+                finally:
+                    recv.cancel()
+        except Exception as e:
+            self.error = repr(e)
+
+
+# ----------------------------------------------------------
+# Spawned servers + CPU accounting
+# ----------------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_port(port: int, timeout: float = 20.0) -> None:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"port {port} did not open")
+
+
+def cpu_seconds(pid: int):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def spawn(args):
+    tmp = tempfile.mkdtemp(prefix="loadtest-")
+    fake_port, app_port = free_port(), free_port()
+    log = open(os.path.join(tmp, "servers.log"), "w")
+
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "tools.fake_realtime", "--port", str(fake_port), *args.fake_args.split()],
+        cwd=ROOT, stdout=log, stderr=subprocess.STDOUT,
+    )
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="loadtest",
+        OPENAI_REALTIME_URL=f"ws://127.0.0.1:{fake_port}",
+        GREETING_DIR=tmp,
+        CAPACITY_DB=os.path.join(tmp, "capacity.sqlite3"),
+        VONAGE_EVENTS_DB=os.path.join(tmp, "vonage_events.sqlite3"),
+        MAX_CALLS_PER_WORKER="100000",
+        MAX_CALLS_TOTAL="100000",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(app_port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    wait_port(fake_port)
+    wait_port(app_port)
+    print(f"spawned fake Realtime :{fake_port}, app :{app_port} (logs in {tmp})")
+    return [fake, server], f"ws://127.0.0.1:{app_port}/ws", server.pid
+
+
+# ----------------------------------------------------------
+# Steps / report
+# ----------------------------------------------------------
+
+def pct(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+
+async def run_step(url: str, calls: int, speech: np.ndarray, args, app_pid):
+    callers = [Caller(i, speech, args) for i in range(calls)]
+    cpu0 = cpu_seconds(app_pid) if app_pid else None
+    gen0 = time.process_time()
+    t0 = time.monotonic()
+
+    async def start(c, delay):
+        await asyncio.sleep(delay)
+        await c.run(url, args.duration)
+
+    # pornire eșalonată pe --ramp-up secunde
+    await asyncio.gather(*(start(c, i * args.ramp_up / calls) for i, c in enumerate(callers)))
+
+    wall = time.monotonic() - t0
+    cpu1 = cpu_seconds(app_pid) if app_pid else None
+    gen_cpu = (time.process_time() - gen0) / wall * 100
+
+    m2e = [x for c in callers for x in c.mouth_to_ear]
+    barge = [x for c in callers for x in c.barge_in]
+    frames = sum(c.frames for c in callers)
+    late = sum(c.late for c in callers)
+    errors = [c.error for c in callers if c.error]
+
+    row = {
+        "calls": calls,
+        "m2e_p50": pct(m2e, 50),
+        "m2e_p99": pct(m2e, 99),
+        "barge_p50": pct(barge, 50),
+        "barge_p99": pct(barge, 99),
+        "late_pct": late / frames * 100 if frames else 0.0,
+        "cpu_call": (
+            (cpu1 - cpu0) / wall / calls * 100
+            if cpu0 is not None and cpu1 is not None else float("nan")
+        ),
+        "errors": len(errors),
+        "gen_cpu": gen_cpu,
+    }
+    if errors:
+        print("  first error:", errors[0])
+    return row
+
+
+def print_row(r) -> None:
+    print(
+        f"{r['calls']:>6}{r['m2e_p50']:>10.0f}{r['m2e_p99']:>10.0f}"
+        f"{r['barge_p50']:>10.0f}{r['barge_p99']:>10.0f}"
+        f"{r['late_pct']:>9.2f}%{r['cpu_call']:>10.2f}%{r['errors']:>8}"
+        f"{r['gen_cpu']:>9.0f}%"
+    )
+
+
+async def main_async(args) -> None:
+    procs, url, app_pid = ([], args.url, None)
+    if args.spawn:
+        procs, url, app_pid = spawn(args)
+
+    steps = [int(x) for x in args.ramp.split(",")] if args.ramp else [args.calls]
+    speech = load_speech(args.speech)
+
+    try:
+        print(f"{'calls':>6}{'m2e p50':>10}{'m2e p99':>10}{'barge p50':>10}"
+              f"{'barge p99':>10}{'late':>10}{'CPU/call':>11}{'errors':>8}{'gen CPU':>10}")
+        knee = None
+        for n in steps:
+            row = await run_step(url, n, speech, args, app_pid)
+            print_row(row)
+            if knee is None and row["late_pct"] > 1.0:
+                knee = n
+        print("late frames start at:", f"{knee} calls" if knee else "not reached")
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="ws://127.0.0.1:8000/ws")
+    ap.add_argument("--spawn", action="store_true", help="start fake Realtime + app locally")
+    ap.add_argument("--calls", type=int, default=10)
+    ap.add_argument("--ramp", default=None, help="comma-separated call counts, e.g. 10,25,50")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds per call")
+    ap.add_argument("--ramp-up", type=float, default=2.0, help="seconds to stagger call starts")
+    ap.add_argument("--voice-rms", type=float, default=2000.0)
+    ap.add_argument("--speech", default=SPEECH_WAV)
+    ap.add_argument("--fake-args", default="", help="extra tools.fake_realtime options (--spawn only)")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
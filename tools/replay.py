@@ -0,0 +1,500 @@
+"""
+Offline replay: run one call through the app's own pipeline, faster than
+real time, against an in-memory Realtime mock.
+
+    python -m tools.replay recordings/2026-10-17/120000_CALL.wav
+    python -m tools.replay --synthetic 60
+    python -m tools.replay --synthetic 60 --set SILENCE_SECONDS=5 --set SANTA_GAIN=1.2
+    python -m tools.replay child.wav --vad hangover_ms=300 --vad margin_db=12 --json run.json
+
+The input is the child's leg: a WAV of any rate (for stereo files from
+recorder.py, the left channel), or with --synthetic a scripted call of
+turns, one barge-in and one long silence, looped from audio/background.wav.
+Frames are fed into app.run_call exactly as Vonage would send them, so
+vonage_to_openai / openai_to_vonage, the VAD, resamplers, gain, pacer
+and call timers all run unchanged. The Realtime side is the turn logic of
+tools.fake_realtime over an in-memory pipe.
+
+The event loop runs on a virtual clock: whenever nothing is ready, time
+jumps to the next timer instead of sleeping, and time.monotonic follows
+it. A five minute call replays in about three seconds.
+
+Output: a timeline of the app's log events (barge_in, silence_prompt,
+call_wrap_up...), the app VAD's speech segments, what the model was
+asked, and when Santa's audio went out to the phone; then the cost per
+inbound frame (Vonage leg) and per Realtime event (OpenAI leg), measured
+in real CPU time. --json writes both for comparing runs.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import selectors
+import time
+
+import numpy as np
+
+import app
+from realtime_pool import RealtimePool
+from resampler import VONAGE_RATE
+from scheduler import timers
+from tools import fake_realtime
+from tools.vad_eval import load_pcm16
+from vad import SPEECH_END, SPEECH_START, make_vad
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPEECH_WAV = os.path.join(ROOT, "audio", "background.wav")
+
+FRAME_SAMPLES = VONAGE_RATE // 50
+FRAME_SECONDS = 0.02
+
+
+# ----------------------------------------------------------
+# Virtual time
+# ----------------------------------------------------------
+
+class VirtualClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FastForwardSelector(selectors.DefaultSelector):
+    """Never sleeps: an empty poll advances the clock by the loop's timeout."""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if not events:
+            if timeout is None:
+                raise RuntimeError("replay stalled: nothing scheduled")
+            self.clock.now += timeout
+        return events
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__(_FastForwardSelector(clock))
+        self.clock = clock
+
+    def time(self) -> float:
+        return self.clock.now
+
+
+# ----------------------------------------------------------
+# Timeline
+# ----------------------------------------------------------
+
+class Timeline:
+
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+        self.t0 = 0.0
+        self.entries = []
+
+    def add(self, source: str, event: str, /, **fields) -> None:
+        self.entries.append((round(self.clock.now - self.t0, 3), source, event, fields))
+
+    def count(self, source: str, event: str) -> int:
+        return sum(1 for _, s, e, _ in self.entries if s == source and e == event)
+
+
+class _TimelineHandler(logging.Handler):
+    """App log events (barge_in, silence_prompt, ...) at virtual time."""
+
+    def __init__(self, timeline: Timeline):
+        super().__init__()
+        self.timeline = timeline
+
+    def emit(self, record) -> None:
+        fields = getattr(record, "fields", None) or {}
+        # statisticile de la call_ended sunt mari: păstrăm doar motivul
+        if record.getMessage() == "call_ended":
+            fields = {"reason": fields.get("reason")}
+        self.timeline.add("app", record.getMessage(), **fields)
+
+
+class TracedVad:
+    """Wraps the call's VAD to put its speech segments on the timeline."""
+
+    def __init__(self, vad, timeline: Timeline):
+        self._vad = vad
+        self.timeline = timeline
+
+    @property
+    def speaking(self) -> bool:
+        return self._vad.speaking
+
+    def __getattr__(self, name):
+        return getattr(self._vad, name)
+
+    def process(self, frame, santa_speaking: bool = False):
+        ev = self._vad.process(frame, santa_speaking=santa_speaking)
+        if ev == SPEECH_START:
+            self.timeline.add("vad", "child_speech_start", santa_speaking=santa_speaking)
+        elif ev == SPEECH_END:
+            self.timeline.add("vad", "child_speech_end")
+        return ev
+
+
+# ----------------------------------------------------------
+# In-memory sockets
+# ----------------------------------------------------------
+
+class MemorySocket:
+    """One end of an in-memory websocket: send() into the peer, iterate own inbox."""
+
+    def __init__(self, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        self._inbox = inbox
+        self._outbox = outbox
+        self.open = True
+        self.on_send = None
+        self.costs = None  # dict event type -> [seconds], pentru capătul aplicației
+        self._returned = None
+        self._last_type = None
+
+    async def send(self, data) -> None:
+        if self.open:
+            if self.on_send is not None:
+                self.on_send(data)
+            self._outbox.put_nowait(data)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._returned is not None and self.costs is not None:
+            # tot ce a rulat de la ultimul eveniment până aici e costul lui (fără await între)
+            self.costs.setdefault(self._last_type, []).append(time.perf_counter() - self._returned)
+        raw = await self._inbox.get()
+        if raw is None:
+            self.open = False
+            raise StopAsyncIteration
+        if self.costs is not None:
+            self._last_type = _event_type(raw)
+            self._returned = time.perf_counter()
+        return raw
+
+    async def close(self) -> None:
+        if self.open:
+            self.open = False
+            self._outbox.put_nowait(None)
+            self._inbox.put_nowait(None)
+
+
+def _event_type(raw: str) -> str:
+    i = raw.find('"type"')
+    if i < 0:
+        return "?"
+    start = raw.find('"', raw.find(":", i) + 1) + 1
+    return raw[start : raw.find('"', start)]
+
+
+class ReplayVonage:
+    """The Vonage side of /ws: feeds the child's frames on the 20 ms clock."""
+
+    query_params = {}
+
+    def __init__(self, frames, clock: VirtualClock, timeline: Timeline, voice_rms: float):
+        self.frames = frames
+        self.clock = clock
+        self.timeline = timeline
+        self.voice_rms = voice_rms
+        self.session = None
+        self.costs = []
+        self.i = 0
+        self._returned = None
+        self._last_voice = None
+        self._voice_start = None
+
+    async def accept(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        self._end_voice()
+
+    async def receive(self) -> dict:
+        if self._returned is not None:
+            self.costs.append(time.perf_counter() - self._returned)
+        if self.session is None:
+            self.session = app.calls.get("replay")
+            self.session.vad = TracedVad(self.session.vad, self.timeline)
+
+        if self.i >= len(self.frames):
+            return {"type": "websocket.disconnect"}
+        due = self.timeline.t0 + self.i * FRAME_SECONDS
+        if due > self.clock.now:
+            await asyncio.sleep(due - self.clock.now)
+        frame = self.frames[self.i]
+        self.i += 1
+        self._returned = time.perf_counter()
+        return {"type": "websocket.bytes", "bytes": frame}
+
+    async def send_bytes(self, frame: bytes) -> None:
+        pcm = np.frombuffer(frame, dtype="<i2").astype(np.float32)
+        now = self.clock.now
+        if pcm.size and np.sqrt(np.dot(pcm, pcm) / pcm.size) > self.voice_rms:
+            if self._voice_start is None or now - self._last_voice > 3 * FRAME_SECONDS:
+                self._end_voice()
+                self._voice_start = now
+                self.timeline.add("phone", "santa_audio_start")
+            self._last_voice = now
+        elif self._voice_start is not None and now - self._last_voice > 3 * FRAME_SECONDS:
+            self._end_voice()
+
+    def _end_voice(self) -> None:
+        if self._voice_start is not None:
+            seconds = self._last_voice + FRAME_SECONDS - self._voice_start
+            self.timeline.entries.append((
+                round(self._last_voice + FRAME_SECONDS - self.timeline.t0, 3),
+                "phone", "santa_audio_end", {"seconds": round(seconds, 2)},
+            ))
+            self._voice_start = None
+
+    @property
+    def santa_seconds(self) -> float:
+        return sum(f["seconds"] for _, s, e, f in self.timeline.entries if e == "santa_audio_end")
+
+
+# ----------------------------------------------------------
+# Input
+# ----------------------------------------------------------
+
+def synthetic_call(seconds: float, speech_path: str = SPEECH_WAV) -> np.ndarray:
+    """Greeting silence, then loops of: a turn, a turn + barge-in, a long silence."""
+    speech = load_pcm16(speech_path)
+    pos = 0
+    parts = []
+
+    def say(s: float):
+        nonlocal pos
+        n = int(s * VONAGE_RATE)
+        idx = (pos + np.arange(n)) % len(speech)
+        pos += n
+        parts.append(speech[idx])
+
+    def quiet(s: float):
+        parts.append(np.zeros(int(s * VONAGE_RATE), dtype=np.int16))
+
+    quiet(3.0)  # salutul
+    while sum(len(p) for p in parts) < seconds * VONAGE_RATE:
+        say(1.2); quiet(4.0)
+        say(1.2); quiet(1.0); say(0.8); quiet(4.0)  # vorbește peste răspunsul Moșului
+        quiet(9.0)                                  # tăcere: Moșul întreabă ceva
+    return np.concatenate(parts)[: int(seconds * VONAGE_RATE)]
+
+
+def to_frames(pcm: np.ndarray) -> list:
+    n = len(pcm) // FRAME_SAMPLES * FRAME_SAMPLES
+    pcm = pcm[:n].astype("<i2")
+    return [pcm[i : i + FRAME_SAMPLES].tobytes() for i in range(0, n, FRAME_SAMPLES)]
+
+
+# ----------------------------------------------------------
+# Replay
+# ----------------------------------------------------------
+
+def apply_overrides(pairs) -> dict:
+    applied = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        if not hasattr(app, name):
+            raise SystemExit(f"--set: app has no {name}")
+        current = getattr(app, name)
+        setattr(app, name, type(current)(value) if current is not None else value)
+        applied[name] = getattr(app, name)
+    return applied
+
+
+def parse_vad(pairs) -> dict:
+    kw = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        kw[name] = float(value) if "." in value else int(value)
+    return kw
+
+
+async def replay_call(frames, args, clock: VirtualClock, timeline: Timeline):
+    fake_args = fake_realtime.parse_args([
+        "--think-ms", str(args.think_ms),
+        "--response-ms", str(args.response_ms),
+        "--speed", str(args.speed),
+    ])
+    chunks = fake_realtime.tone_chunks(args.response_ms)
+    server_tasks = []
+    realtime_costs = {}
+
+    def on_app_send(data):
+        if '"response.cancel"' in data[:40]:
+            timeline.add("model", "response.cancel")
+        elif '"response.create"' in data[:40]:
+            response = json.loads(data).get("response", {})
+            instructions = response.get("instructions")
+            timeline.add("model", "response.create", prompt=" ".join(instructions.split())[:60] if instructions else None)
+
+    async def connect():
+        to_app, to_server = asyncio.Queue(), asyncio.Queue()
+        client = MemorySocket(to_app, to_server)
+        client.costs = realtime_costs
+        client.on_send = on_app_send
+        server = MemorySocket(to_server, to_app)
+        server_tasks.append(asyncio.create_task(
+            fake_realtime.FakeSession(server, fake_args, chunks).run()
+        ))
+        await client.send(app.personas.default.session_update)
+        return client
+
+    app.realtime_pool = RealtimePool(connect, size=0)
+    vonage = ReplayVonage(frames, clock, timeline, args.voice_rms)
+    timeline.t0 = clock.now
+
+    await app.run_call(vonage, "replay")
+    await vonage.close()
+    for t in server_tasks:
+        t.cancel()
+    await asyncio.gather(*server_tasks, return_exceptions=True)
+    return vonage, realtime_costs
+
+
+def run_replay(frames, args):
+    clock = VirtualClock()
+    timeline = Timeline(clock)
+    loop = VirtualTimeLoop(clock)
+
+    logger = logging.getLogger("santa")
+    saved_handlers = logger.handlers[:]
+    if not args.verbose:
+        logger.handlers = []
+    handler = _TimelineHandler(timeline)
+    logger.addHandler(handler)
+
+    real_monotonic = time.monotonic
+    time.monotonic = clock
+    timers.clock = clock
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    try:
+        vonage, realtime_costs = loop.run_until_complete(replay_call(frames, args, clock, timeline))
+    finally:
+        time.monotonic = real_monotonic
+        timers.clock = real_monotonic
+        logger.handlers = saved_handlers
+        loop.close()
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    timeline.entries.sort(key=lambda e: e[0])
+    return timeline, vonage, realtime_costs, wall, cpu
+
+
+# ----------------------------------------------------------
+# Report
+# ----------------------------------------------------------
+
+def cost_stats(values) -> dict:
+    if not values:
+        return {"n": 0}
+    us = np.asarray(values) * 1e6
+    return {
+        "n": len(us),
+        "p50_us": round(float(np.percentile(us, 50)), 1),
+        "p99_us": round(float(np.percentile(us, 99)), 1),
+        "max_us": round(float(us.max()), 1),
+        "total_ms": round(float(us.sum()) / 1000, 1),
+    }
+
+
+def summarize(timeline: Timeline, vonage: ReplayVonage, realtime_costs: dict,
+              call_seconds: float, wall: float, cpu: float, overrides: dict) -> dict:
+    deltas = realtime_costs.get("response.audio.delta", [])
+    others = [c for t, v in realtime_costs.items() if t != "response.audio.delta" for c in v]
+    return {
+        "call_seconds": round(call_seconds, 1),
+        "wall_seconds": round(wall, 2),
+        "cpu_seconds": round(cpu, 2),
+        "speedup": round(call_seconds / wall, 1) if wall else None,
+        "overrides": overrides,
+        "barge_ins": timeline.count("app", "barge_in"),
+        "silence_prompts": timeline.count("app", "silence_prompt"),
+        "child_turns": timeline.count("vad", "child_speech_start"),
+        "responses": timeline.count("phone", "santa_audio_start"),
+        "santa_seconds": round(vonage.santa_seconds, 1),
+        "cost_inbound_frame": cost_stats(vonage.costs),
+        "cost_audio_delta": cost_stats(deltas),
+        "cost_other_event": cost_stats(others),
+    }
+
+
+def print_report(timeline: Timeline, summary: dict) -> None:
+    for t, source, event, fields in timeline.entries:
+        extra = " ".join(f"{k}={v}" for k, v in fields.items() if v is not None)
+        print(f"{t:9.3f}  {source:<6} {event:<22} {extra}")
+    print()
+    print(
+        f"{summary['call_seconds']} s of call in {summary['wall_seconds']} s "
+        f"({summary['speedup']}x real time, {summary['cpu_seconds']} s CPU)"
+    )
+    for key in ("barge_ins", "silence_prompts", "child_turns", "responses", "santa_seconds"):
+        print(f"  {key:<16} {summary[key]}")
+    for key in ("cost_inbound_frame", "cost_audio_delta", "cost_other_event"):
+        c = summary[key]
+        if c["n"]:
+            print(f"  {key:<20} n={c['n']:<6} p50 {c['p50_us']:>7} us  p99 {c['p99_us']:>7} us  max {c['max_us']:>8} us")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("wav", nargs="?", help="child leg WAV (left channel of stereo recordings)")
+    ap.add_argument("--synthetic", type=float, default=None, metavar="SECONDS",
+                    help="scripted call instead of a WAV")
+    ap.add_argument("--speech", default=SPEECH_WAV, help="speech source for --synthetic")
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                    help="override an app constant, e.g. SILENCE_SECONDS=5, SANTA_GAIN=1.2")
+    ap.add_argument("--vad", action="append", default=[], metavar="KEY=VALUE",
+                    help="VAD parameter passed to make_vad, e.g. hangover_ms=300")
+    ap.add_argument("--vad-mode", default=None, help="energy / webrtc (default VAD_MODE)")
+    ap.add_argument("--ambience", action="store_true", help="mix the background bed as in production")
+    ap.add_argument("--response-ms", type=int, default=2000, help="length of each mock answer")
+    ap.add_argument("--think-ms", type=int, default=150)
+    ap.add_argument("--speed", type=float, default=2.0, help="mock delta pacing vs real time")
+    ap.add_argument("--voice-rms", type=float, default=2000.0, help="outbound frames above count as Santa")
+    ap.add_argument("--json", default=None, help="write timeline + summary here")
+    ap.add_argument("--verbose", action="store_true", help="also print the app's JSON logs")
+    args = ap.parse_args()
+
+    if args.synthetic is not None:
+        pcm = synthetic_call(args.synthetic, args.speech)
+    elif args.wav:
+        pcm = load_pcm16(args.wav)
+    else:
+        ap.error("give a WAV or --synthetic SECONDS")
+
+    overrides = apply_overrides(args.set)
+    vad_kw = parse_vad(args.vad)
+    if vad_kw or args.vad_mode:
+        app.make_vad = functools.partial(make_vad, args.vad_mode, **vad_kw)
+        overrides["vad"] = dict(vad_kw, mode=args.vad_mode)
+    if not args.ambience:
+        app.ambience_bed = None
+    app.personas.default.greeting.load(gain=app.SANTA_GAIN)
+
+    frames = to_frames(pcm)
+    timeline, vonage, realtime_costs, wall, cpu = run_replay(frames, args)
+    summary = summarize(timeline, vonage, realtime_costs, len(frames) * FRAME_SECONDS, wall, cpu, overrides)
+    print_report(timeline, summary)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "timeline": timeline.entries}, f, indent=1, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Offline VAD evaluation: replay WAV files through the detectors.
+
+    python -m tools.vad_eval audio/background.wav [more.wav ...] [--santa-speaking]
+    python -m tools.vad_eval --steady-noise
+
+Optional labels next to each file, `<name>.labels.json`, hold the real
+child speech segments as [[start_s, end_s], ...]. With labels the report
+shows detection latency per segment and false starts (events outside any
+segment). Without labels every speech start counts as false, which is the
+right reading for noise-only files such as the background ambience.
+
+--santa-speaking evaluates in barge-in mode (echo margin raised), i.e.
+every false start would have cancelled Santa mid-sentence.
+
+Every report also shows `stuck_s`, the longest stretch the VAD stayed in
+"speaking". --steady-noise is the regression case for it: steady sounds
+above the VAD's minimum level (mains hum, the ambience bed) must not keep
+the child "speaking"; it exits non-zero if any case stays voiced for
+longer than STEADY_MAX_S, since that would block the silence prompt and
+the end of local turns.
+"""
+
+import argparse
+import json
+import os
+import wave
+
+import numpy as np
+
+from audio_dsp import peak
+from resampler import VONAGE_RATE, Resampler
+from vad import FRAME_MS, SPEECH_END, SPEECH_START, Vad, make_vad
+
+
+FRAME_SAMPLES = VONAGE_RATE * FRAME_MS // 1000
+STEADY_SECONDS = 20
+STEADY_MAX_S = 3.0
+
+
+class PeakVad(Vad):
+    """The old rule from app.py: any frame peak above AMP_BARGE_IN (300)."""
+
+    def __init__(self, threshold: int = 300):
+        super().__init__(min_speech_ms=FRAME_MS, hangover_ms=FRAME_MS)
+        self.threshold = threshold
+
+    def is_voiced(self, frame, santa_speaking: bool) -> bool:
+        return peak(frame) > self.threshold
+
+
+BED_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "audio", "background.wav")
+
+
+def load_pcm16(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        rate, channels = w.getframerate(), w.getnchannels()
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels)[:, 0].copy()
+    if rate != VONAGE_RATE:
+        pcm = Resampler(rate, VONAGE_RATE).process_array(pcm).copy()
+    return pcm
+
+
+def load_labels(path: str):
+    label_path = os.path.splitext(path)[0] + ".labels.json"
+    if not os.path.exists(label_path):
+        return None
+    with open(label_path) as f:
+        return [tuple(seg) for seg in json.load(f)]
+
+
+def replay(vad: Vad, pcm: np.ndarray, santa_speaking: bool):
+    """Speech start times and the longest time spent "speaking" (s)."""
+    starts, stuck, since = [], 0.0, None
+    end = 0.0
+    for i in range(0, len(pcm) - FRAME_SAMPLES + 1, FRAME_SAMPLES):
+        ev = vad.process(pcm[i : i + FRAME_SAMPLES], santa_speaking=santa_speaking)
+        # timestamp = end of the frame that produced the event
+        end = (i + FRAME_SAMPLES) / VONAGE_RATE
+        if ev == SPEECH_START:
+            starts.append(end)
+            since = end
+        elif ev == SPEECH_END:
+            stuck = max(stuck, end - since)
+            since = None
+    if since is not None:
+        stuck = max(stuck, end - since)
+    return starts, stuck
+
+
+def score(starts, labels, stuck: float = 0.0, tolerance: float = 0.5):
+    if labels is None:
+        return {"starts": len(starts), "false_starts": len(starts), "stuck_s": round(stuck, 1)}
+
+    false_starts = [
+        t for t in starts
+        if not any(a <= t <= b + tolerance for a, b in labels)
+    ]
+    latencies, missed = [], 0
+    for a, b in labels:
+        hits = [t for t in starts if a <= t <= b + tolerance]
+        if hits:
+            latencies.append(hits[0] - a)
+        else:
+            missed += 1
+
+    out = {
+        "starts": len(starts),
+        "false_starts": len(false_starts),
+        "segments": len(labels),
+        "missed": missed,
+        "stuck_s": round(stuck, 1),
+    }
+    if latencies:
+        out["latency_ms_mean"] = round(float(np.mean(latencies)) * 1000, 1)
+        out["latency_ms_max"] = round(float(np.max(latencies)) * 1000, 1)
+    return out
+
+
+def steady_noise_cases():
+    """Steady sounds louder than the VAD's min_rms, none of them speech."""
+    t = np.arange(STEADY_SECONDS * VONAGE_RATE) / VONAGE_RATE
+    rng = np.random.default_rng(0)
+    cases = []
+    for rms in (300, 1000, 3000):
+        # zumzet de rețea: 150 Hz cu armonici
+        hum = np.sin(2 * np.pi * 150 * t) + 0.3 * np.sin(2 * np.pi * 300 * t)
+        cases.append((f"hum 150 Hz rms {rms}", hum * rms / np.sqrt(np.mean(hum ** 2))))
+    brown = np.cumsum(rng.standard_normal(t.size))
+    brown -= np.convolve(brown, np.ones(800) / 800, mode="same")  # fără derivă DC
+    cases.append(("brown noise rms 800", brown * 800 / np.sqrt(np.mean(brown ** 2))))
+    if os.path.exists(BED_PATH):
+        bed = load_pcm16(BED_PATH).astype(np.float64)
+        cases.append(("ambience bed x4", np.resize(bed * 4, t.size)))
+    return [(name, np.clip(x, -32768, 32767).astype("<i2")) for name, x in cases]
+
+
+def steady_noise(mode, santa_speaking: bool) -> bool:
+    ok = True
+    for name, pcm in steady_noise_cases():
+        starts, stuck = replay(make_vad(mode), pcm, santa_speaking)
+        passed = stuck <= STEADY_MAX_S
+        ok &= passed
+        print(f"  {name:<22} {'ok  ' if passed else 'FAIL'}", score(starts, None, stuck))
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("wavs", nargs="*")
+    ap.add_argument("--mode", default=None, help="energy | webrtc (default VAD_MODE)")
+    ap.add_argument("--santa-speaking", action="store_true")
+    ap.add_argument("--steady-noise", action="store_true",
+                    help=f"regression: steady noise must not stay 'speaking' over {STEADY_MAX_S:g}s")
+    args = ap.parse_args()
+    if not args.wavs and not args.steady_noise:
+        ap.error("give WAV files and/or --steady-noise")
+
+    for path in args.wavs:
+        pcm = load_pcm16(path)
+        labels = load_labels(path)
+        print(f"{path}  ({len(pcm) / VONAGE_RATE:.1f}s, labels: {'yes' if labels else 'no'})")
+        for name, vad in (("legacy peak>300", PeakVad()), ("vad", make_vad(args.mode))):
+            starts, stuck = replay(vad, pcm, args.santa_speaking)
+            print(f"  {name:<16}", score(starts, labels, stuck))
+
+    if args.steady_noise:
+        print(f"steady noise ({STEADY_SECONDS}s each)")
+        if not steady_noise(args.mode, args.santa_speaking):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
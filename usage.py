@@ -0,0 +1,193 @@
+"""
+What each call costs: audio seconds, responses and Realtime tokens.
+
+Calls used to be limited only by wall time (the 4 / 5 minute timers),
+but the bill follows audio and model tokens. CallUsage counts, per call:
+
+- audio in: seconds of child audio received from Vonage;
+- audio out: seconds of Santa audio generated by the model (cancelled
+  responses included, they are billed too);
+- responses and tokens, from the `usage` of every Realtime
+  `response.done` (text / audio / cached input, text / audio output),
+  priced into an estimated cost in USD.
+
+Every update is a few integer adds on the event that carries it; the
+budgets are checked once per response.done. A call over one of its
+budgets is wrapped up early with Santa's short goodbye (app.py). When a
+call ends its counters are added to the worker's UsageLedger, shown on /.
+
+Budgets (0 = off):
+
+    CALL_MAX_TOKENS         Realtime tokens (input + output) per call
+    CALL_MAX_COST_USD       estimated cost per call
+    CALL_MAX_SANTA_SECONDS  seconds of audio generated for Santa per call
+    CALL_MAX_RESPONSES      model responses per call
+
+Prices, USD per 1M tokens (defaults: gpt-4o-realtime-preview):
+
+    REALTIME_PRICE_TEXT_IN (5)  REALTIME_PRICE_AUDIO_IN (40)  REALTIME_PRICE_CACHED_IN (2.5)
+    REALTIME_PRICE_TEXT_OUT (20)  REALTIME_PRICE_AUDIO_OUT (80)
+"""
+
+import os
+from collections import Counter
+
+import metrics
+from resampler import OPENAI_RATE, VONAGE_RATE
+
+
+CALL_MAX_TOKENS = int(os.getenv("CALL_MAX_TOKENS", "0"))
+CALL_MAX_COST_USD = float(os.getenv("CALL_MAX_COST_USD", "0"))
+CALL_MAX_SANTA_SECONDS = float(os.getenv("CALL_MAX_SANTA_SECONDS", "0"))
+CALL_MAX_RESPONSES = int(os.getenv("CALL_MAX_RESPONSES", "0"))
+
+_M = 1_000_000
+PRICE_TEXT_IN = float(os.getenv("REALTIME_PRICE_TEXT_IN", "5")) / _M
+PRICE_AUDIO_IN = float(os.getenv("REALTIME_PRICE_AUDIO_IN", "40")) / _M
+PRICE_CACHED_IN = float(os.getenv("REALTIME_PRICE_CACHED_IN", "2.5")) / _M
+PRICE_TEXT_OUT = float(os.getenv("REALTIME_PRICE_TEXT_OUT", "20")) / _M
+PRICE_AUDIO_OUT = float(os.getenv("REALTIME_PRICE_AUDIO_OUT", "80")) / _M
+
+# bugetele în unitățile contoarelor (bytes PCM16, nu secunde)
+_MAX_OUT_BYTES = int(CALL_MAX_SANTA_SECONDS * OPENAI_RATE * 2)
+
+
+def _int(d: dict, key: str) -> int:
+    v = d.get(key)
+    return v if isinstance(v, int) else 0
+
+
+class CallUsage:
+
+    __slots__ = (
+        "in_bytes", "out_bytes", "responses", "text_in", "audio_in", "cached_in",
+        "text_out", "audio_out", "cost", "exceeded",
+    )
+
+    def __init__(self):
+        self.in_bytes = 0    # l16 16 kHz de la Vonage
+        self.out_bytes = 0   # pcm16 24 kHz de la model
+        self.responses = 0
+        self.text_in = 0
+        self.audio_in = 0
+        self.cached_in = 0
+        self.text_out = 0
+        self.audio_out = 0
+        self.cost = 0.0
+        self.exceeded = None  # bugetul depășit (o singură dată pe apel)
+
+    # ---------------- events ----------------
+
+    def response_done(self, response) -> None:
+        """Add the usage of one Realtime response.done (`response` object of the event)."""
+        self.responses += 1
+        usage = response.get("usage") if isinstance(response, dict) else None
+        if not isinstance(usage, dict):
+            return
+        tokens_in, tokens_out = _int(usage, "input_tokens"), _int(usage, "output_tokens")
+        details_in = usage.get("input_token_details") or {}
+        details_out = usage.get("output_token_details") or {}
+
+        # fără detalii, tokenii se socotesc audio: estimarea rămâne acoperitoare
+        audio_in = _int(details_in, "audio_tokens") if "audio_tokens" in details_in else tokens_in
+        audio_out = _int(details_out, "audio_tokens") if "audio_tokens" in details_out else tokens_out
+        cached = min(_int(details_in, "cached_tokens"), tokens_in)
+        text_in, text_out = tokens_in - audio_in, tokens_out - audio_out
+
+        self.text_in += text_in
+        self.audio_in += audio_in
+        self.cached_in += cached
+        self.text_out += text_out
+        self.audio_out += audio_out
+
+        # tokenii din cache sunt incluși în input; fără defalcare, îi scădem din text întâi
+        split = details_in.get("cached_tokens_details") or {}
+        cached_audio = _int(split, "audio_tokens") if "audio_tokens" in split else cached - text_in
+        cached_audio = min(max(cached_audio, 0), audio_in, cached)
+        cost = (
+            (text_in - (cached - cached_audio)) * PRICE_TEXT_IN
+            + (audio_in - cached_audio) * PRICE_AUDIO_IN
+            + cached * PRICE_CACHED_IN
+            + text_out * PRICE_TEXT_OUT
+            + audio_out * PRICE_AUDIO_OUT
+        )
+        self.cost += cost
+
+        metrics.REALTIME_INPUT_TOKENS.inc(tokens_in)
+        metrics.REALTIME_OUTPUT_TOKENS.inc(tokens_out)
+        metrics.REALTIME_COST.inc(cost)
+
+    @property
+    def tokens(self) -> int:
+        return self.text_in + self.audio_in + self.text_out + self.audio_out
+
+    def over_budget(self):
+        """Name of the first budget this call has exceeded, or None."""
+        if CALL_MAX_TOKENS and self.tokens > CALL_MAX_TOKENS:
+            return "tokens"
+        if CALL_MAX_COST_USD and self.cost > CALL_MAX_COST_USD:
+            return "cost"
+        if _MAX_OUT_BYTES and self.out_bytes > _MAX_OUT_BYTES:
+            return "santa_seconds"
+        if CALL_MAX_RESPONSES and self.responses > CALL_MAX_RESPONSES:
+            return "responses"
+        return None
+
+    # ---------------- report ----------------
+
+    def stats(self) -> dict:
+        return {
+            "audio_in_s": round(self.in_bytes / 2 / VONAGE_RATE, 1),
+            "santa_audio_s": round(self.out_bytes / 2 / OPENAI_RATE, 1),
+            "responses": self.responses,
+            "tokens_in": {"text": self.text_in, "audio": self.audio_in, "cached": self.cached_in},
+            "tokens_out": {"text": self.text_out, "audio": self.audio_out},
+            "cost_usd": round(self.cost, 4),
+            "budget_exceeded": self.exceeded,
+        }
+
+
+class UsageLedger:
+    """Per-worker totals of the calls that ended here."""
+
+    def __init__(self):
+        self.calls = 0
+        self.in_bytes = 0
+        self.out_bytes = 0
+        self.responses = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.cost = 0.0
+        self.budget_stops = Counter()
+
+    def add(self, usage: CallUsage) -> None:
+        self.calls += 1
+        self.in_bytes += usage.in_bytes
+        self.out_bytes += usage.out_bytes
+        self.responses += usage.responses
+        self.tokens_in += usage.text_in + usage.audio_in
+        self.tokens_out += usage.text_out + usage.audio_out
+        self.cost += usage.cost
+        if usage.exceeded is not None:
+            self.budget_stops[usage.exceeded] += 1
+        metrics.CALL_COST.observe(usage.cost)
+
+    def stats(self) -> dict:
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "audio_in_s": round(self.in_bytes / 2 / VONAGE_RATE, 1),
+            "santa_audio_s": round(self.out_bytes / 2 / OPENAI_RATE, 1),
+            "responses": self.responses,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "cost_usd": round(self.cost, 4),
+            "avg_cost_usd": round(self.cost / calls, 4),
+            "budget_stops": dict(self.budget_stops),
+            "budgets": {
+                "tokens": CALL_MAX_TOKENS or None,
+                "cost_usd": CALL_MAX_COST_USD or None,
+                "santa_seconds": CALL_MAX_SANTA_SECONDS or None,
+                "responses": CALL_MAX_RESPONSES or None,
+            },
+        }
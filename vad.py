@@ -0,0 +1,176 @@
+"""
+Voice-activity detection for the child's leg (Vonage -> OpenAI).
+
+A VAD consumes one inbound frame at a time and returns SPEECH_START /
+SPEECH_END events (or None). Onset needs `min_speech_ms` of consecutive
+voiced frames, so a cough or a line click does not count as speech;
+offset waits `hangover_ms` so short pauses inside a sentence do not end it.
+
+    VAD_MODE=energy   (default) RMS over an adaptive noise floor + ZCR gate
+    VAD_MODE=webrtc   uses the optional `webrtcvad` package for the voiced
+                      decision, with the same onset / hangover logic
+"""
+
+import os
+
+import numpy as np
+
+from audio_dsp import FrameDSP, samples
+
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+
+FRAME_MS = 20
+
+
+# ----------------------------------------------------------
+# Onset / hangover state machine (shared by all detectors)
+# ----------------------------------------------------------
+
+class Vad:
+    """Base class: subclasses implement is_voiced(frame, santa_speaking)."""
+
+    def __init__(self, min_speech_ms: int = 60, hangover_ms: int = 400,
+                 frame_ms: int = FRAME_MS):
+        self.frame_ms = frame_ms
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.speaking = False
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    def is_voiced(self, frame, santa_speaking: bool) -> bool:
+        raise NotImplementedError
+
+    def process(self, frame, santa_speaking: bool = False):
+        voiced = self.is_voiced(frame, santa_speaking)
+
+        if voiced:
+            self._voiced_run += 1
+            self._silent_run = 0
+        else:
+            self._silent_run += 1
+            self._voiced_run = 0
+
+        if not self.speaking and self._voiced_run >= self.min_speech_frames:
+            self.speaking = True
+            return SPEECH_START
+
+        if self.speaking and self._silent_run >= self.hangover_frames:
+            self.speaking = False
+            return SPEECH_END
+
+        return None
+
+    def reset(self) -> None:
+        self.speaking = False
+        self._voiced_run = 0
+        self._silent_run = 0
+
+
+# ----------------------------------------------------------
+# Energy + zero-crossing detector
+# ----------------------------------------------------------
+
+class EnergyVad(Vad):
+    """
+    Voiced when RMS is `margin_db` above a slowly adapting noise floor (and
+    above `min_rms`), and the zero-crossing rate looks like voice rather
+    than hiss or clicks. While Santa is talking the margin is raised by
+    `echo_margin_db`, so his own echo on the line does not trigger barge-in.
+
+    Quiet frames pull the floor toward their level. Loud frames move it
+    too, but only once per `floor_window_ms`, toward the quietest frame of
+    that window: speech dips between syllables and barely moves it, while
+    a steady hum or background music above `min_rms` raises it within a
+    couple of windows and stops counting as speech.
+    """
+
+    def __init__(self, min_rms: float = 120.0, margin_db: float = 9.0,
+                 echo_margin_db: float = 6.0, zcr_max: float = 0.35,
+                 floor_alpha: float = 0.05, floor_window_ms: int = 1000, **kw):
+        super().__init__(**kw)
+        self.min_rms = min_rms
+        self.margin = 10 ** (margin_db / 20)
+        self.echo_margin = 10 ** (echo_margin_db / 20)
+        self.zcr_max = zcr_max
+        self.floor_alpha = floor_alpha
+        self.noise_floor = min_rms / self.margin
+        self.floor_window = max(1, floor_window_ms // self.frame_ms)
+        self._window_min = float("inf")
+        self._window_n = 0
+        self._dsp = FrameDSP(max_samples=640)
+
+    def is_voiced(self, frame, santa_speaking: bool) -> bool:
+        s = samples(frame)
+        if s.size < 2:
+            return False
+
+        level = self._dsp.rms(s)
+        threshold = max(self.min_rms, self.noise_floor * self.margin)
+        if santa_speaking:
+            threshold *= self.echo_margin
+
+        if level < threshold:
+            self.noise_floor += self.floor_alpha * (level - self.noise_floor)
+            self._window_min = float("inf")
+            self._window_n = 0
+            return False
+
+        # peste prag fără pauză: fondul urcă spre minimul ferestrei (zumzet, muzică)
+        if level < self._window_min:
+            self._window_min = level
+        self._window_n += 1
+        if self._window_n >= self.floor_window:
+            self.noise_floor += 0.5 * (self._window_min - self.noise_floor)
+            self._window_min = float("inf")
+            self._window_n = 0
+
+        sign = np.signbit(s)
+        zcr = np.count_nonzero(sign[1:] != sign[:-1]) / (s.size - 1)
+        return zcr <= self.zcr_max
+
+
+# ----------------------------------------------------------
+# Optional WebRTC VAD
+# ----------------------------------------------------------
+
+try:
+    import webrtcvad
+except ImportError:  # optional dependency
+    webrtcvad = None
+
+
+class WebRtcVad(Vad):
+
+    def __init__(self, aggressiveness: int = 2, sample_rate: int = 16000, **kw):
+        if webrtcvad is None:
+            raise RuntimeError("VAD_MODE=webrtc needs the 'webrtcvad' package")
+        super().__init__(**kw)
+        self.sample_rate = sample_rate
+        self._vad = webrtcvad.Vad(aggressiveness)
+        # santa_speaking: un mod mai agresiv pentru ecou
+        self._echo_vad = webrtcvad.Vad(3)
+
+    def is_voiced(self, frame, santa_speaking: bool) -> bool:
+        if len(frame) != self.sample_rate * self.frame_ms // 1000 * 2:
+            return False
+        vad = self._echo_vad if santa_speaking else self._vad
+        return vad.is_speech(bytes(frame), self.sample_rate)
+
+
+# ----------------------------------------------------------
+# Factory
+# ----------------------------------------------------------
+
+VAD_MODE = os.getenv("VAD_MODE", "energy")
+
+
+def make_vad(mode: str = None, **kw) -> Vad:
+    mode = mode or VAD_MODE
+    if mode == "webrtc":
+        return WebRtcVad(**kw)
+    if mode == "energy":
+        return EnergyVad(**kw)
+    raise ValueError(f"unknown VAD_MODE: {mode}")
@@ -0,0 +1,240 @@
+"""
+Vonage event webhooks, ingested off the request path.
+
+/webhooks/event only checks the payload is a JSON object, puts it on a
+bounded queue and answers 200 whatever happens: a full queue drops the
+event and counts it instead of making Vonage wait, anything that is not
+an object is counted as invalid and skipped. Events without a `status`
+(transfer and similar) are stored under their `type`. One consumer
+task per worker wakes every VONAGE_EVENTS_BATCH_SECONDS, takes what
+accumulated, links each event to the call it belongs to and appends the
+whole batch to a local SQLite file in one transaction, on a thread.
+
+Linking: the Vonage leg uuid is our call_id, so an event finds its live
+CallSession in the registry, or the outcome of a call that already ended
+on this worker (kept for a few minutes, since "completed" arrives after
+the WebSocket closes). Completed events feed per-worker stats: Vonage's
+billed duration and how the call ended (our close reason, or who
+disconnected according to Vonage).
+
+Rows are append-only and indexed by conversation_uuid; gunicorn workers
+share the file (WAL, one short transaction per batch).
+
+    VONAGE_EVENTS_DB             SQLite file (default vonage_events.sqlite3)
+    VONAGE_EVENTS_QUEUE          max events waiting to be written (default 10000)
+    VONAGE_EVENTS_BATCH_SECONDS  how often the consumer writes (default 0.5)
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from collections import Counter, OrderedDict
+
+from calllog import log
+import metrics
+
+
+VONAGE_EVENTS_DB = os.getenv("VONAGE_EVENTS_DB", "vonage_events.sqlite3")
+VONAGE_EVENTS_QUEUE = int(os.getenv("VONAGE_EVENTS_QUEUE", "10000"))
+VONAGE_EVENTS_BATCH_SECONDS = float(os.getenv("VONAGE_EVENTS_BATCH_SECONDS", "0.5"))
+
+BATCH_MAX = 500
+ENDED_KEEP = 2000  # apeluri terminate ținute minte pentru evenimentele întârziate
+ENDED_SECONDS = 600
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS events ("
+    " id INTEGER PRIMARY KEY,"
+    " received REAL NOT NULL,"
+    " conversation_uuid TEXT,"
+    " uuid TEXT,"
+    " status TEXT NOT NULL,"
+    " direction TEXT,"
+    " duration REAL,"
+    " call_state TEXT,"
+    " close_reason TEXT,"
+    " worker INTEGER,"
+    " payload TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS events_conversation ON events (conversation_uuid)",
+)
+_INSERT = (
+    "INSERT INTO events (received, conversation_uuid, uuid, status, direction, duration,"
+    " call_state, close_reason, worker, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _seconds(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class VonageEvents:
+
+    def __init__(self, path: str = VONAGE_EVENTS_DB, link=None, queue_size: int = VONAGE_EVENTS_QUEUE,
+                 batch_seconds: float = VONAGE_EVENTS_BATCH_SECONDS):
+        self.path = path
+        # link: callable(call_id) -> (state name, close reason) of a live call, or None
+        self._link = link
+        self.batch_seconds = batch_seconds
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._ended = OrderedDict()  # call_id -> (close reason, ended at)
+        self._db = None
+        self._task = None
+
+        self.received = 0
+        self.invalid = 0
+        self.dropped = 0
+        self.stored = 0
+        self.batches = 0
+        self.errors = 0
+        self.linked = 0
+        self.by_status = Counter()
+        self.hangups = Counter()
+        self.durations = 0
+        self.duration_total = 0.0
+
+    # ---------------- request path ----------------
+
+    def submit(self, params) -> bool:
+        """Enqueue one webhook payload. False = not stored (not an object, or queue full)."""
+        if not isinstance(params, dict):
+            self.invalid += 1
+            return False
+        self.received += 1
+        try:
+            self._queue.put_nowait((time.time(), params))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            metrics.VONAGE_EVENTS_DROPPED.inc()
+            return False
+        return True
+
+    def call_ended(self, call_id: str, reason) -> None:
+        """Remember how a call ended, for the events Vonage sends after teardown."""
+        self._ended[call_id] = (reason, time.monotonic())
+        while len(self._ended) > ENDED_KEEP:
+            self._ended.popitem(last=False)
+
+    # ---------------- consumer ----------------
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # ce a mai rămas în coadă se scrie înainte de oprire
+        while not self._queue.empty():
+            await self._write_batch([])
+        if self._db is not None:
+            await asyncio.to_thread(self._db.close)
+            self._db = None
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            try:
+                # lăsăm lotul să se strângă: un singur commit pentru toate
+                await asyncio.sleep(self.batch_seconds)
+            finally:
+                await self._write_batch([first])
+            while not self._queue.empty():
+                await self._write_batch([])
+
+    async def _write_batch(self, batch: list) -> None:
+        while len(batch) < BATCH_MAX and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        rows = [self._row(received, params) for received, params in batch]
+        try:
+            await asyncio.to_thread(self._insert, rows)
+        except Exception as e:
+            self.errors += 1
+            log.warning("vonage_events_store_error", events=len(rows), error=str(e))
+            return
+        self.stored += len(rows)
+        self.batches += 1
+
+    def _row(self, received: float, params: dict) -> tuple:
+        call_id = params.get("uuid")
+        conversation = params.get("conversation_uuid")
+        status = params.get("status")
+        if not isinstance(status, str):
+            # evenimente fără status (transfer etc.): le ținem după tip
+            status = str(params.get("type") or "unknown")
+        duration = _seconds(params.get("duration"))
+
+        state = reason = None
+        live = self._link(call_id) if self._link is not None and call_id else None
+        if live is not None:
+            state, reason = live
+        else:
+            ended = self._ended.get(call_id)
+            if ended is not None and time.monotonic() - ended[1] < ENDED_SECONDS:
+                state, reason = "closed", ended[0]
+        if state is not None:
+            self.linked += 1
+
+        self.by_status[status] += 1
+        metrics.VONAGE_EVENTS.inc()
+        if status == "completed":
+            # cine a închis: motivul nostru dacă apelul a trecut prin acest worker, altfel Vonage
+            self.hangups[reason or params.get("disconnected_by") or "unknown"] += 1
+            if duration is not None:
+                self.durations += 1
+                self.duration_total += duration
+                metrics.VONAGE_CALL_DURATION.observe(duration)
+            self._ended.pop(call_id, None)
+
+        log.info("vonage_event", call_id=call_id, conversation_uuid=conversation, status=status,
+                 direction=params.get("direction"), duration=duration, call_state=state)
+        return (
+            received, conversation, call_id, status, params.get("direction"), duration,
+            state, reason, os.getpid(), params,
+        )
+
+    # ---------------- store (worker thread) ----------------
+
+    def _insert(self, rows: list) -> None:
+        if self._db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            for stmt in _SCHEMA:
+                db.execute(stmt)
+            self._db = db
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            # payload-ul se serializează aici, nu pe event loop
+            self._db.executemany(
+                _INSERT, (row[:-1] + (json.dumps(row[-1], ensure_ascii=False, default=str),) for row in rows)
+            )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "queued": self._queue.qsize(),
+            "stored": self.stored,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "linked": self.linked,
+            "by_status": dict(self.by_status),
+            "hangups": dict(self.hangups),
+            "avg_duration_s": (
+                round(self.duration_total / self.durations, 1) if self.durations else None
+            ),
+        }